@@ -0,0 +1,112 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+from metrics import registry
+from rate_limit import TokenBucket
+
+in_flight = registry.gauge("sentinent_admission_in_flight", "Admitted requests currently running.")
+queue_depth = registry.gauge("sentinent_admission_queue_depth", "Requests waiting for a free slot.")
+wait_seconds = registry.histogram("sentinent_admission_wait_seconds", "Time admitted requests spent queued.")
+rejected = registry.counter(
+    "sentinent_admission_rejected_total",
+    "Requests turned away: user_rate (token bucket empty), queue_full or queue_timeout."
+)
+
+# Idle per-user buckets are dropped once this many users have been seen
+MAX_TRACKED_USERS = 10000
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; `retry_after` is a hint in whole seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class AdmissionController:
+    """
+    Bounds how much expensive work runs at once.
+
+    `check_user` applies a per-user token bucket (`user_burst` requests,
+    refilled at `user_rate_per_minute`). `slot()` admits at most
+    `max_concurrent` holders; up to `max_queue` more wait (for at most
+    `queue_timeout` seconds) and anything beyond that is rejected at once,
+    so an overload costs a fast 429 instead of a tied-up worker thread.
+    """
+
+    def __init__(self, max_concurrent=2, max_queue=8, queue_timeout=30.0, user_rate_per_minute=6, user_burst=3,
+                 name="default"):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate_per_minute / 60.0
+        self.user_burst = user_burst
+        self.name = name
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        # Smoothed slot hold time, used for the Retry-After hint
+        self._avg_hold = 10.0
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    def _bucket(self, user):
+        with self._buckets_lock:
+            bucket = self._buckets.get(user)
+            if bucket is None:
+                if len(self._buckets) >= MAX_TRACKED_USERS:
+                    self._buckets = {u: b for u, b in self._buckets.items() if not b.is_full()}
+                bucket = self._buckets[user] = TokenBucket(self.user_rate, self.user_burst)
+            return bucket
+
+    def check_user(self, user):
+        bucket = self._bucket(user)
+        if not bucket.try_acquire():
+            rejected.inc(controller=self.name, reason="user_rate")
+            raise Overloaded("user_rate", bucket.wait_time())
+
+    def _retry_after(self):
+        # Roughly how long until everyone ahead of a new request has finished
+        return self._avg_hold * (self._waiting + 1) / max(1, self.max_concurrent)
+
+    @contextmanager
+    def slot(self):
+        started = time.monotonic()
+        with self._cond:
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    rejected.inc(controller=self.name, reason="queue_full")
+                    raise Overloaded("queue_full", self._retry_after())
+                self._waiting += 1
+                queue_depth.set(self._waiting, controller=self.name)
+                try:
+                    admitted = self._cond.wait_for(lambda: self._active < self.max_concurrent, self.queue_timeout)
+                finally:
+                    self._waiting -= 1
+                    queue_depth.set(self._waiting, controller=self.name)
+                if not admitted:
+                    rejected.inc(controller=self.name, reason="queue_timeout")
+                    raise Overloaded("queue_timeout", self._retry_after())
+            self._active += 1
+            in_flight.set(self._active, controller=self.name)
+        admitted_at = time.monotonic()
+        wait_seconds.observe(admitted_at - started, controller=self.name)
+        try:
+            yield admitted_at - started
+        finally:
+            with self._cond:
+                self._active -= 1
+                in_flight.set(self._active, controller=self.name)
+                self._avg_hold = 0.8 * self._avg_hold + 0.2 * (time.monotonic() - admitted_at)
+                self._cond.notify()
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def waiting(self):
+        return self._waiting
@@ -1,22 +1,36 @@
-from flask import Flask, render_template, request, send_from_directory, redirect, url_for, session, flash
+from flask import Flask, Response, abort, jsonify, render_template, request, send_from_directory, redirect, url_for, session, flash
+from werkzeug.utils import safe_join
 from markupsafe import Markup
 import markdown
-import pandas as pd
 import logging
 import os
 import sqlite3
 import smtplib
 from email.mime.text import MIMEText
 from passlib.hash import pbkdf2_sha256
-from functools import wraps
-from data_collector import RedditDataCollector
+from functools import wraps, lru_cache
+from data_collector import RedditDataCollector, reddit_scheduler
 from sentiment_analyzer import SentimentAnalyzer
 from visualization_generator import VisualizationGenerator
 from report_generator import ReportGenerator
 from image_search_integration import ImageSearchIntegration
 from config import Config
+from pipeline import build_analysis_pipeline, PipelineError, NoDataError
+from metrics import registry as metrics_registry
+from profiling import StageProfiler, profile_dir_for
+from single_flight import SingleFlight
+from artifacts import RunDirectory, ArtifactJanitor, read_manifest
+from admission import AdmissionController, Overloaded
+from results_store import ResultsStore, SearchIndexer
+from results_io import export_csv, read_preview
+from job_queue import JobQueue
+from http_cache import ONE_YEAR, content_etag, precompress, send_cached
+from renderer import renderer_pool
+from progress import Progress, ProgressBroker, StreamLimiter, event_stream
 import random
 import string
+import importlib.util
+import threading
 from datetime import datetime, timedelta
 import traceback
 
@@ -27,6 +41,49 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 config = Config()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# CPU stages (scoring, charts) of every run share these pre-warmed processes;
+# started before the app's background threads so they fork from a quiet process
+render_pool = renderer_pool(config.PIPELINE_MAX_WORKERS) if config.PIPELINE_USE_PROCESSES else None
+
+# Coalesces concurrent /analyze requests for the same topic and settings
+analysis_flight = SingleFlight(freshness_seconds=config.ANALYSIS_FRESHNESS_SECONDS, name="analyze")
+
+# Caps how many pipelines run at once so a burst of submissions cannot starve
+# the login and signup pages of CPU
+analysis_admission = AdmissionController(
+    max_concurrent=config.ANALYZE_MAX_CONCURRENT,
+    max_queue=config.ANALYZE_MAX_QUEUE,
+    queue_timeout=config.ANALYZE_QUEUE_TIMEOUT_SECONDS,
+    user_rate_per_minute=config.ANALYZE_USER_RATE_PER_MINUTE,
+    user_burst=config.ANALYZE_USER_BURST,
+    name="analyze"
+)
+
+# Live progress of running analyses, by analysis key; only a few watchers
+# hold a connection open at a time, the rest poll
+progress_broker = ProgressBroker(linger_seconds=config.ANALYSIS_FRESHNESS_SECONDS)
+progress_streams = StreamLimiter(config.PROGRESS_MAX_STREAMS)
+
+# One request budget for the Reddit client ID, shared by every analysis
+reddit_requests = reddit_scheduler(config.REDDIT_REQUESTS_PER_MINUTE, config.REDDIT_REQUEST_BURST)
+
+# Every run's scored items, for the historical query API
+results_store = ResultsStore(config.RESULTS_DB)
+search_indexer = SearchIndexer(results_store, interval_seconds=config.SEARCH_INDEX_INTERVAL_SECONDS).start()
+
+# Worker mode: analyses run on worker.py processes that pull them from this
+# shared queue, so load spreads over every worker host
+job_queue = JobQueue(config.JOB_QUEUE_DB, lease_seconds=config.JOB_LEASE_SECONDS,
+                     max_attempts=config.JOB_MAX_ATTEMPTS) if config.JOB_QUEUE_DB else None
+
+# Keeps output/runs within its age and size quotas
+artifact_janitor = ArtifactJanitor(
+    config.RUNS_DIR,
+    max_age_seconds=config.ARTIFACT_MAX_AGE_HOURS * 3600,
+    max_total_bytes=config.ARTIFACT_MAX_TOTAL_MB * 1024 * 1024,
+    interval_seconds=config.JANITOR_INTERVAL_SECONDS
+).start()
+
 # Log session state before each request
 @app.before_request
 def log_session_state():
@@ -230,16 +287,15 @@ def index():
     logging.info(f"Rendering index.html for user: {session.get('email')}")
     return render_template('index.html', email=session.get('email'))
 
-@app.route('/analyze', methods=['POST'])
-@login_required
-def analyze():
-    logging.info(f"Analyze route accessed. Session: {session.get('email')}, Form data: {request.form}")
-    topic = request.form.get('topic')
-    if not topic:
-        logging.error("No topic provided in form submission")
-        flash('Please provide a topic.', 'error')
-        return redirect(url_for('index'))
+class AnalysisError(Exception):
+    """A pipeline failure with a message suitable for the results page."""
 
+def _output_name(path):
+    """Path of an artifact relative to OUTPUT_DIR, as served by /output/<path>."""
+    return os.path.relpath(path, config.OUTPUT_DIR).replace(os.sep, '/') if path else None
+
+def _run_analysis(topic, profile=False, progress=None):
+    """Run the full pipeline for `topic` and return the results.html context (minus per-user fields)."""
     # Initialize components
     try:
         data_collector = RedditDataCollector(
@@ -247,92 +303,75 @@ def analyze():
             client_secret=config.REDDIT_CLIENT_SECRET,
             user_agent=config.REDDIT_USER_AGENT,
             username=config.REDDIT_USERNAME,
-            password=config.REDDIT_PASSWORD
+            password=config.REDDIT_PASSWORD,
+            scheduler=reddit_requests,
+            max_concurrency=config.COLLECT_MAX_CONCURRENCY
         )
         sentiment_analyzer = SentimentAnalyzer()
         viz_generator = VisualizationGenerator()
         report_generator = ReportGenerator(output_dir=config.OUTPUT_DIR)
-        image_search = ImageSearchIntegration(output_dir=config.OUTPUT_DIR, api_key=config.PIXABAY_API_KEY)
+        image_search = ImageSearchIntegration(output_dir=config.OUTPUT_DIR, api_key=config.PIXABAY_API_KEY,
+                                              base_url=config.PIXABAY_API_URL)
     except Exception as e:
         logging.error(f"Initialization error: {e}\nTraceback: {traceback.format_exc()}")
-        return render_template('results.html', error=f"Initialization error: {e}")
-
-    # 1. Collect Data
-    logging.info(f"Collecting Reddit data for topic: {topic}")
-    try:
-        data = data_collector.collect_data(
-            topic,
-            subreddit_name=config.DEFAULT_SUBREDDIT,
-            post_limit=config.DEFAULT_POST_LIMIT,
-            comment_limit=config.DEFAULT_COMMENT_LIMIT
-        )
-    except Exception as e:
-        logging.error(f"Data collection error: {e}\nTraceback: {traceback.format_exc()}")
-        return render_template('results.html', error=f"Data collection error: {e}")
+        raise AnalysisError(f"Initialization error: {e}")
 
-    if not data:
-        logging.warning(f"No data found for topic '{topic}'. Try a different topic or check your API credentials.")
-        return render_template('results.html', error=f"No data found for topic '{topic}'.")
-
-    df = pd.DataFrame(data)
-
-    # 2. Perform Sentiment Analysis
-    logging.info("Performing sentiment analysis...")
-    try:
-        sentiment_results = sentiment_analyzer.analyze(data)
-        sentiment_df = pd.DataFrame(sentiment_results)
-    except Exception as e:
-        logging.error(f"Sentiment analysis error: {e}\nTraceback: {traceback.format_exc()}")
-        return render_template('results.html', error=f"Sentiment analysis error: {e}")
-
-    # Save raw sentiment results to CSV
-    output_csv_filename = f"{topic.replace(' ', '_')}_sentiment_results.csv"
-    output_csv_path = os.path.join(config.OUTPUT_DIR, output_csv_filename)
-    try:
-        sentiment_df.to_csv(output_csv_path, index=False)
-        logging.info(f"Sentiment results saved to {output_csv_path}")
-    except Exception as e:
-        logging.error(f"Error saving CSV: {e}\nTraceback: {traceback.format_exc()}")
-        return render_template('results.html', error=f"Error saving CSV: {e}")
-
-    # Read CSV data for display (up to 20 rows for scrollable table)
+    # Each run writes into its own directory, so concurrent runs never share files
+    run_dir = RunDirectory.create(config.RUNS_DIR, topic)
+    # Profiles are kept with the run, and cleaned up with it
+    profiler = StageProfiler(profile_dir_for(run_dir.path)) if profile else None
+    # Run the stage graph: image search overlaps collection, and the CSV,
+    # charts and word cloud all start as soon as the scored frame exists
+    pipeline = build_analysis_pipeline(
+        data_collector, sentiment_analyzer, viz_generator, report_generator, image_search, config,
+        profiler=profiler, process_pool=render_pool, results_store=results_store
+    )
+    logging.info(f"Running analysis pipeline for topic: {topic} in {run_dir.path}")
     try:
-        csv_data = pd.read_csv(output_csv_path).iloc[:20].to_dict(orient='records')
-        csv_columns = pd.read_csv(output_csv_path).columns.tolist()
-    except Exception as e:
-        logging.error(f"Error reading CSV data: {e}\nTraceback: {traceback.format_exc()}")
-        csv_data = []
-        csv_columns = []
+        result = pipeline.run(topic=topic, output_dir=run_dir.path, progress=progress or Progress())
+    except PipelineError as e:
+        if isinstance(e.error, NoDataError):
+            logging.warning(f"No data found for topic '{topic}'. Try a different topic or check your API credentials.")
+            raise AnalysisError(f"No data found for topic '{topic}'.")
+        logging.error(f"{e}\nTraceback: {traceback.format_exc()}")
+        raise AnalysisError(str(e))
+    finally:
+        if profiler:
+            logging.info(f"Profile for '{topic}':\n{profiler.format_report()}")
+    logging.info(f"Stage timings: {result.format_timings()}")
 
-    # 3. Generate Visualizations
-    logging.info("Generating visualizations...")
-    try:
-        plot_filenames = viz_generator.plot_sentiment_analysis(sentiment_df, topic, output_path=config.OUTPUT_DIR)
-        wordcloud_file = viz_generator.generate_wordcloud(sentiment_df["text"], topic, output_path=config.OUTPUT_DIR)
-        sentiment_counts_file = viz_generator.plot_sentiment_counts(sentiment_df, topic, output_path=config.OUTPUT_DIR)
-        heatmap_file = viz_generator.plot_sentiment_heatmap(sentiment_df, topic, output_path=config.OUTPUT_DIR)
-        pie_file = viz_generator.plot_sentiment_distribution_pie(sentiment_df, topic, output_path=config.OUTPUT_DIR)
-    except Exception as e:
-        logging.error(f"Visualization error: {e}\nTraceback: {traceback.format_exc()}")
-        return render_template('results.html', error=f"Visualization error: {e}")
+    # Artifacts named as in the run's manifest; PNG stages only exist when RENDER_CHART_PNGS is on
+    artifacts = {name: result.get(name) for name in ("results_path", "chart_data", "report", "topic_image",
+                                                     "wordcloud", "sentiment_counts", "heatmap", "pie")}
+    artifacts.update({f"plots.{name}": path for name, path in (result.get("plots") or {}).items()})
+    run_id = os.path.basename(os.path.dirname(result["manifest"]))
+    # Preview table (up to 20 rows) straight from the scored frame instead of
+    # parsing the results file that was just written
+    return _results_context(topic, run_id, artifacts, result["sentiment_df"].iloc[:20])
 
-    # 4. Fetch Topic Image
-    logging.info(f"Fetching image for topic: {topic}")
-    try:
-        image_path = image_search.search_and_download_image(topic)
-        topic_image_filename = os.path.basename(image_path) if image_path else None
-    except Exception as e:
-        logging.error(f"Image search error: {e}\nTraceback: {traceback.format_exc()}")
-        topic_image_filename = None
+def _queued_analysis(topic, progress):
+    """Queue the analysis for a worker and build the results.html context from the run it writes."""
+    job_id = job_queue.enqueue("analyze", {"topic": topic}, key=progress_key(topic))
+    progress.stage("queued", "Waiting for a worker", "started")
+    job = job_queue.wait(job_id, timeout=config.JOB_WAIT_SECONDS)
+    if job["status"] == "failed":
+        progress.stage("queued", "Waiting for a worker", "failed")
+        raise AnalysisError(job["error"])
+    if job["status"] != "done":
+        raise AnalysisError("The analysis is still running; please try again in a few minutes.")
+    progress.stage("queued", "Waiting for a worker", "finished")
+    run_id = job["result"]["run_id"]
+    run_path = os.path.join(config.RUNS_DIR, run_id)
+    artifacts = {name: os.path.join(run_path, entry["file"]) for name, entry in read_manifest(run_path)["artifacts"].items()}
+    return _results_context(topic, run_id, artifacts, read_preview(artifacts["results_path"]))
 
-    # 5. Generate Report
-    logging.info("Generating summary report...")
-    try:
-        # Pass the first plot filename for the report (e.g., distribution plot)
-        report_file = report_generator.generate_summary_report(sentiment_df, topic, plot_filenames['distribution'], wordcloud_file, sentiment_counts_file)
-    except Exception as e:
-        logging.error(f"Report generation error: {e}\nTraceback: {traceback.format_exc()}")
-        return render_template('results.html', error=f"Report generation error: {e}")
+def _results_context(topic, run_id, artifacts, preview):
+    """results.html context from a run's artifact paths (named as in its manifest) and its first rows."""
+    results_filename = _output_name(artifacts.get("results_path"))
+    report_file = artifacts["report"]
+    topic_image_filename = _output_name(artifacts.get("topic_image"))
+    csv_data = preview.to_dict(orient='records')
+    csv_columns = preview.columns.tolist()
 
     # Prepare data for rendering in template
     try:
@@ -342,20 +381,19 @@ def analyze():
         report_content = Markup(report_html)
     except Exception as e:
         logging.error(f"Error reading report: {e}\nTraceback: {traceback.format_exc()}")
-        return render_template('results.html', error=f"Error generating report: {e}")
+        raise AnalysisError(f"Error generating report: {e}")
 
     # Get paths for images
-    distribution_filename = os.path.basename(plot_filenames['distribution']) if plot_filenames.get('distribution') else None
-    subreddit_filename = os.path.basename(plot_filenames['subreddit']) if plot_filenames.get('subreddit') else None
-    trend_filename = os.path.basename(plot_filenames['trend']) if plot_filenames.get('trend') else None
-    type_filename = os.path.basename(plot_filenames['type']) if plot_filenames.get('type') else None
-    wordcloud_filename = os.path.basename(wordcloud_file) if wordcloud_file else None
-    sentiment_counts_filename = os.path.basename(sentiment_counts_file) if sentiment_counts_file else None
-    heatmap_filename = os.path.basename(heatmap_file) if heatmap_file else None
-    pie_filename = os.path.basename(pie_file) if pie_file else None
-
-    return render_template(
-        'results.html',
+    distribution_filename = _output_name(artifacts.get('plots.distribution'))
+    subreddit_filename = _output_name(artifacts.get('plots.subreddit'))
+    trend_filename = _output_name(artifacts.get('plots.trend'))
+    type_filename = _output_name(artifacts.get('plots.type'))
+    wordcloud_filename = _output_name(artifacts.get('wordcloud'))
+    sentiment_counts_filename = _output_name(artifacts.get('sentiment_counts'))
+    heatmap_filename = _output_name(artifacts.get('heatmap'))
+    pie_filename = _output_name(artifacts.get('pie'))
+
+    return dict(
         topic=topic,
         report_content=report_content,
         distribution_image=distribution_filename,
@@ -367,16 +405,229 @@ def analyze():
         heatmap_image=heatmap_filename,
         pie_image=pie_filename,
         topic_image=topic_image_filename,
-        csv_file=output_csv_filename,
+        results_file=results_filename,
+        chart_run_id=run_id if artifacts.get("chart_data") else None,
         csv_data=csv_data,
         csv_columns=csv_columns,
-        email=session.get('email')
     )
 
-@app.route('/output/<filename>')
+def _admitted_analysis(topic, profile=False):
+    progress = progress_broker.reporter(progress_key(topic))
+    try:
+        if job_queue is not None and not profile:
+            # Workers bound how many analyses run, so no local slot is taken
+            context = _queued_analysis(topic, progress)
+            progress.finish()
+            return context
+        with analysis_admission.slot() as waited:
+            if waited:
+                logging.info(f"Analysis for '{topic}' waited {waited:.2f}s for a free slot")
+            context = _run_analysis(topic, profile, progress=progress)
+    except (AnalysisError, Overloaded) as e:
+        progress.finish(error=str(e))
+        raise
+    except Exception:
+        progress.finish(error="Analysis failed.")
+        raise
+    progress.finish()
+    return context
+
+def _overloaded_response(e):
+    if e.reason == "user_rate":
+        message = f"You are submitting analyses too quickly. Please try again in {e.retry_after} seconds."
+    else:
+        message = f"The server is busy with other analyses. Please try again in {e.retry_after} seconds."
+    return render_template('results.html', error=message), 429, {'Retry-After': str(e.retry_after)}
+
+def analysis_key(topic):
+    """Requests with the same key can share one pipeline run and its artifacts."""
+    return (topic.strip().lower(), config.DEFAULT_SUBREDDIT, config.DEFAULT_POST_LIMIT, config.DEFAULT_COMMENT_LIMIT)
+
+def progress_key(topic):
+    return "|".join(str(part) for part in analysis_key(topic))
+
+@app.route('/analyze', methods=['POST'])
+@login_required
+def analyze():
+    logging.info(f"Analyze route accessed. Session: {session.get('email')}, Form data: {request.form}")
+    topic = request.form.get('topic')
+    if not topic:
+        logging.error("No topic provided in form submission")
+        flash('Please provide a topic.', 'error')
+        return redirect(url_for('index'))
+
+    # Profiled runs are slower (stages run one at a time), so only admins may ask for one
+    profile = False
+    if request.form.get('profile'):
+        if session['email'] in config.ADMIN_EMAILS:
+            profile = True
+        else:
+            logging.warning(f"Ignoring profile request from non-admin user {session['email']}")
+
+    try:
+        analysis_admission.check_user(session['email'])
+        if profile:
+            # A profile must measure a run of its own, so it never joins another request
+            context = _admitted_analysis(topic, profile=True)
+        else:
+            # Identical concurrent submissions share one pipeline run (and its
+            # output files); recent results are served without re-running.
+            # Only the leader takes an admission slot.
+            context, outcome = analysis_flight.do(analysis_key(topic), lambda: _admitted_analysis(topic))
+            logging.info(f"Analysis for '{topic}' served as {outcome}")
+    except Overloaded as e:
+        logging.warning(f"Rejected analysis for '{topic}' from {session['email']}: {e.reason}")
+        return _overloaded_response(e)
+    except AnalysisError as e:
+        return render_template('results.html', error=str(e))
+
+    return render_template('results.html', **context, email=session.get('email'))
+
+@app.route('/api/progress')
+@login_required
+def api_progress():
+    # Server-Sent Events for a running /analyze, e.g. /api/progress?topic=python:
+    # stage changes, items collected/scored so far and the running mean score
+    topic = request.args.get('topic', '').strip()
+    if not topic:
+        return jsonify(error="Missing 'topic'."), 400
+    last_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id', 0))
+    try:
+        last_id = int(last_id)
+    except ValueError:
+        last_id = 0
+    stream = event_stream(
+        progress_broker.channel(progress_key(topic)), last_id, progress_streams,
+        hold_seconds=config.PROGRESS_STREAM_SECONDS, retry_ms=config.PROGRESS_RETRY_MS
+    )
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text exposition; left unauthenticated so scrapers can reach it
+    return Response(metrics_registry.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/aggregates')
+@login_required
+def api_aggregates():
+    # e.g. /api/aggregates?topic=python&group_by=subreddit&start=2024-01-01&end=2024-01-31
+    args = request.args
+    try:
+        rows = results_store.aggregate(
+            topic=args.get('topic'),
+            group_by=args.get('group_by', 'subreddit') or None,
+            start=args.get('start'),
+            end=args.get('end'),
+            subreddit=args.get('subreddit'),
+            type=args.get('type'),
+            run_id=args.get('run_id')
+        )
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(results=rows)
+
+@app.route('/api/runs')
+@login_required
+def api_runs():
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify(runs=results_store.runs(topic=request.args.get('topic'), limit=limit))
+
+@app.route('/api/runs/<run_id>/charts')
+@login_required
+def api_run_charts(run_id):
+    # Pre-aggregated chart data for one run, drawn client-side by results.html
+    run_path = safe_join(config.RUNS_DIR, run_id)
+    try:
+        chart_file = read_manifest(run_path)["artifacts"]["chart_data"]["file"]
+    except (TypeError, OSError, ValueError, KeyError):
+        abort(404)
+    # A finished run's files never change
+    return send_cached(run_path, chart_file, max_age=ONE_YEAR, immutable=True, mimetype='application/json')
+
+@lru_cache(maxsize=None)
+def _plotly_dir():
+    spec = importlib.util.find_spec('plotly')
+    return os.path.join(os.path.dirname(spec.origin), 'package_data') if spec else None
+
+def _fingerprinted_path(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        return os.path.join(app.static_folder, values['filename'])
+    if endpoint == 'plotly_js' and _plotly_dir():
+        return os.path.join(_plotly_dir(), 'plotly.min.js')
+    return None
+
+@app.url_defaults
+def fingerprint_assets(endpoint, values):
+    # url_for('static', ...) -> /static/script.js?v=<content hash>: a changed
+    # file gets a new URL, so every version can be cached for good
+    path = _fingerprinted_path(endpoint, values)
+    if path and 'v' not in values and os.path.isfile(path):
+        values['v'] = content_etag(path)[:12]
+
+def _send_asset(directory, filename, **kwargs):
+    path = os.path.join(directory, filename)
+    fingerprinted = os.path.isfile(path) and request.args.get('v') == content_etag(path)[:12]
+    return send_cached(directory, filename, max_age=ONE_YEAR if fingerprinted else 0, immutable=fingerprinted,
+                       private=False, variant_dir=config.ASSET_CACHE_DIR, **kwargs)
+
+def static_file(filename):
+    return _send_asset(app.static_folder, filename)
+
+app.view_functions['static'] = static_file
+
+def _precompress_assets():
+    paths = [os.path.join(app.static_folder, name) for name in os.listdir(app.static_folder)]
+    if _plotly_dir():
+        paths.append(os.path.join(_plotly_dir(), 'plotly.min.js'))
+    precompress(paths, variant_dir=config.ASSET_CACHE_DIR)
+
+# Brotli at its best level takes a few seconds on plotly.min.js; pay it once, off the request path
+threading.Thread(target=_precompress_assets, name="precompress-assets", daemon=True).start()
+
+@app.route('/vendor/plotly.min.js')
+def plotly_js():
+    # Served from the plotly package so the page needs no CDN
+    if _plotly_dir() is None:
+        abort(404)
+    return _send_asset(_plotly_dir(), 'plotly.min.js', mimetype='text/javascript')
+
+@app.route('/api/search')
+@login_required
+def api_search():
+    # e.g. /api/search?q=battery+fire&topic=tesla&page=2
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify(error="Missing search query 'q'."), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    rows, has_more = results_store.search(
+        query,
+        topic=request.args.get('topic'),
+        run_id=request.args.get('run_id'),
+        limit=per_page,
+        offset=(page - 1) * per_page
+    )
+    return jsonify(results=rows, page=page, per_page=per_page, has_more=has_more)
+
+@app.route('/export/csv/<path:filename>')
+@login_required
+def export_results_csv(filename):
+    # CSV is generated from the Parquet results file on first download
+    path = safe_join(config.OUTPUT_DIR, filename)
+    if path is None or not filename.endswith('.parquet') or not os.path.isfile(path):
+        abort(404)
+    csv_path = export_csv(path)
+    return send_from_directory(os.path.dirname(csv_path), os.path.basename(csv_path), as_attachment=True)
+
+@app.route('/output/<path:filename>')
 @login_required
 def output_file(filename):
-    return send_from_directory(config.OUTPUT_DIR, filename)
+    # Files inside a run directory never change once written; anything else is revalidated by ETag
+    path = safe_join(config.OUTPUT_DIR, filename)
+    relative = os.path.relpath(path, config.RUNS_DIR) if path else os.pardir
+    in_run = not relative.startswith(os.pardir) and os.sep in relative
+    return send_cached(config.OUTPUT_DIR, filename, max_age=ONE_YEAR if in_run else 0, immutable=in_run)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
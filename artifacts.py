@@ -0,0 +1,196 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _temp_path(path):
+    # Keep the extension last: matplotlib and wordcloud pick the format from it
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.{uuid.uuid4().hex[:8]}.tmp{ext}")
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a temporary filename next to `path` for code that writes by
+    filename (savefig, to_csv, ...); it is renamed over `path` only if the
+    block succeeds, so readers never see a half-written artifact.
+    """
+    tmp = _temp_path(path)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+@contextmanager
+def atomic_write(path, mode="w", encoding=None):
+    """Like open(path, mode) but the file only appears under `path` once fully written."""
+    with atomic_path(path) as tmp:
+        with open(tmp, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def new_run_id(topic):
+    topic_clean = re.sub(r"[^\w\-]+", "_", topic.strip())[:60] or "topic"
+    return f"{topic_clean}_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+class RunDirectory:
+    """One analysis run's private output directory under `runs_dir`."""
+
+    def __init__(self, runs_dir, run_id):
+        self.runs_dir = runs_dir
+        self.run_id = run_id
+        self.path = os.path.join(runs_dir, run_id)
+
+    @classmethod
+    def create(cls, runs_dir, topic):
+        run = cls(runs_dir, new_run_id(topic))
+        os.makedirs(run.path, exist_ok=False)
+        return run
+
+    def file(self, filename):
+        return os.path.join(self.path, filename)
+
+
+def write_manifest(output_dir, topic, artifacts, **metadata):
+    """
+    Record the run's artifacts in manifest.json. `artifacts` maps a name to a
+    path (or a dict of names to paths); missing/None entries are skipped.
+    Written last, so a manifest marks the run as complete.
+    """
+    files = {}
+
+    def add(name, path):
+        if path and os.path.exists(path):
+            files[name] = {"file": os.path.relpath(path, output_dir), "bytes": os.path.getsize(path)}
+
+    for name, value in artifacts.items():
+        if isinstance(value, dict):
+            for sub_name, path in value.items():
+                add(f"{name}.{sub_name}", path)
+        else:
+            add(name, value)
+
+    manifest = {
+        "run_id": os.path.basename(output_dir),
+        "topic": topic,
+        "completed_at": datetime.now().isoformat(timespec="seconds"),
+        "artifacts": files,
+        **metadata,
+    }
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+def read_manifest(run_path):
+    with open(os.path.join(run_path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ArtifactJanitor:
+    """
+    Enforces age and total-size quotas on `runs_dir`. Runs older than
+    `max_age_seconds` are deleted; then, while the directory exceeds
+    `max_total_bytes`, the oldest completed runs (those with a manifest) are
+    evicted. Runs still being written have no manifest and are only removed
+    once they exceed the age limit, i.e. after they were abandoned.
+    """
+
+    def __init__(self, runs_dir, max_age_seconds=7 * 24 * 3600, max_total_bytes=2 * 1024 ** 3, interval_seconds=600):
+        self.runs_dir = runs_dir
+        self.max_age_seconds = max_age_seconds
+        self.max_total_bytes = max_total_bytes
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _runs(self):
+        runs = []
+        if not os.path.isdir(self.runs_dir):
+            return runs
+        for name in os.listdir(self.runs_dir):
+            path = os.path.join(self.runs_dir, name)
+            if not os.path.isdir(path):
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            complete = os.path.exists(os.path.join(path, MANIFEST_NAME))
+            runs.append({"path": path, "mtime": mtime, "bytes": _dir_size(path), "complete": complete})
+        runs.sort(key=lambda r: r["mtime"])
+        return runs
+
+    def _remove(self, run, reason):
+        shutil.rmtree(run["path"], ignore_errors=True)
+        logging.info(f"Janitor removed {run['path']} ({reason}, {run['bytes']} bytes)")
+
+    def sweep(self, now=None):
+        """Apply both quotas once; returns the removed run paths."""
+        now = now if now is not None else time.time()
+        removed = []
+        kept = []
+        for run in self._runs():
+            if now - run["mtime"] > self.max_age_seconds:
+                self._remove(run, "expired")
+                removed.append(run["path"])
+            else:
+                kept.append(run)
+
+        total = sum(r["bytes"] for r in kept)
+        for run in kept:
+            if total <= self.max_total_bytes:
+                break
+            if not run["complete"]:
+                continue
+            self._remove(run, "over size quota")
+            removed.append(run["path"])
+            total -= run["bytes"]
+        return removed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                logging.error(f"Artifact janitor sweep failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="artifact-janitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,233 @@
+"""
+ASGI entry point for the analysis API: `uvicorn asgi_app:app`.
+
+The Flask app (app.py) holds a thread for every request while it waits on
+Reddit, Pixabay and SMTP. Here those waits happen on the event loop: the
+topic image and notification emails use non-blocking HTTP/SMTP, PRAW calls
+run on a bounded thread pool and scoring/rendering on a shared process
+pool (see async_pipeline.AsyncAnalysisRunner).
+"""
+import os
+import re
+import hmac
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from werkzeug.utils import safe_join
+from config import Config
+from data_collector import RedditDataCollector, reddit_scheduler
+from sentiment_analyzer import SentimentAnalyzer
+from visualization_generator import VisualizationGenerator
+from report_generator import ReportGenerator
+from image_search_integration import ImageSearchIntegration
+from async_pipeline import AsyncAnalysisRunner
+from pipeline import PipelineError, NoDataError
+from admission import AdmissionController, Overloaded
+from single_flight import AsyncSingleFlight
+from progress import ProgressBroker
+from artifacts import read_manifest
+from http_cache import ONE_YEAR
+from results_store import ResultsStore
+from batch import summarize_run
+from notifications import analysis_email, send_email_async
+from metrics import registry as metrics_registry
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+config = Config()
+analysis_flight = AsyncSingleFlight(freshness_seconds=config.ANALYSIS_FRESHNESS_SECONDS, name="asgi_analyze")
+progress_broker = ProgressBroker(linger_seconds=config.ANALYSIS_FRESHNESS_SECONDS)
+# Only the per-client request budget is used here; the runner bounds the work itself
+client_limits = AdmissionController(user_rate_per_minute=config.ANALYZE_USER_RATE_PER_MINUTE,
+                                    user_burst=config.ANALYZE_USER_BURST, name="asgi_analyze")
+# How often an open progress stream checks for new events
+PROGRESS_POLL_SECONDS = 0.5
+# One address, no display name, nothing that could end an SMTP header
+EMAIL_ADDRESS = re.compile(r"[^@\s<>,;\"]+@[^@\s<>,;\"]+\.[^@\s<>,;\".]+")
+
+
+def create_runner(config):
+    data_collector = RedditDataCollector(
+        client_id=config.REDDIT_CLIENT_ID,
+        client_secret=config.REDDIT_CLIENT_SECRET,
+        user_agent=config.REDDIT_USER_AGENT,
+        username=config.REDDIT_USERNAME,
+        password=config.REDDIT_PASSWORD,
+        scheduler=reddit_scheduler(config.REDDIT_REQUESTS_PER_MINUTE, config.REDDIT_REQUEST_BURST),
+        max_concurrency=config.COLLECT_MAX_CONCURRENCY
+    )
+    return AsyncAnalysisRunner(
+        data_collector, SentimentAnalyzer(), VisualizationGenerator(), ReportGenerator(output_dir=config.OUTPUT_DIR),
+        ImageSearchIntegration(output_dir=config.OUTPUT_DIR, api_key=config.PIXABAY_API_KEY,
+                               base_url=config.PIXABAY_API_URL),
+        config,
+        results_store=ResultsStore(config.RESULTS_DB),
+        praw_threads=config.ASGI_PRAW_THREADS,
+        max_concurrent=config.ANALYZE_MAX_CONCURRENT,
+        max_in_flight=config.ASGI_MAX_IN_FLIGHT
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Tests (and the load test) may install their own runner first
+    if getattr(app.state, "runner", None) is None:
+        app.state.runner = create_runner(config)
+    runner = app.state.runner.start()
+    if not config.API_TOKEN:
+        logging.warning("API_TOKEN is not set; the analysis API accepts unauthenticated requests")
+    try:
+        yield
+    finally:
+        await runner.aclose()
+        app.state.runner = None
+
+
+app = FastAPI(title="Sentinent analysis API", lifespan=lifespan)
+
+
+class AnalyzeRequest(BaseModel):
+    topic: str = Field(min_length=1, max_length=200)
+    # Emailed a summary when the analysis finishes
+    notify_email: Optional[str] = Field(default=None, max_length=254)
+
+    @field_validator("notify_email")
+    @classmethod
+    def _valid_address(cls, value):
+        if value is not None and not EMAIL_ADDRESS.fullmatch(value.strip()):
+            raise ValueError("not a valid email address")
+        return value.strip() if value is not None else None
+
+
+async def client_id(request: Request):
+    """
+    Checks the bearer token (when API_TOKEN is set); returns the address
+    the client budget is charged to. Declared async so FastAPI runs it on
+    the event loop instead of its thread pool.
+    """
+    if config.API_TOKEN:
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(token.encode(), config.API_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Invalid or missing API token.",
+                                headers={"WWW-Authenticate": "Bearer"})
+    return request.client.host if request.client else "unknown"
+
+
+def may_notify(address):
+    """
+    Notification emails go to any address for callers holding the API
+    token, otherwise only to the NOTIFY_EMAIL_ALLOWLIST addresses, so an
+    open API cannot be used to send mail to strangers.
+    """
+    return bool(config.API_TOKEN) or address.lower() in config.NOTIFY_EMAIL_ALLOWLIST
+
+
+def analysis_key(topic):
+    return (topic.strip().lower(), config.DEFAULT_SUBREDDIT, config.DEFAULT_POST_LIMIT, config.DEFAULT_COMMENT_LIMIT)
+
+
+def progress_key(topic):
+    return "|".join(str(part) for part in analysis_key(topic))
+
+
+def _overloaded(e):
+    return JSONResponse({"error": f"Too many analyses ({e.reason}); try again later."}, status_code=429,
+                        headers={"Retry-After": str(e.retry_after)})
+
+
+async def _analysis(runner, topic):
+    progress = progress_broker.reporter(progress_key(topic))
+    started = time.perf_counter()
+    try:
+        result = await runner.run(topic, progress)
+    except Exception as e:
+        progress.finish(error=str(e))
+        raise
+    progress.finish()
+    summary = summarize_run(topic, result, time.perf_counter() - started)
+    summary.update(
+        run_id=os.path.basename(summary.pop("run_dir")),
+        partial=result["collection"]["partial"],
+        timings={name: round(seconds, 3) for name, seconds in result.timings.items()},
+    )
+    return summary
+
+
+@app.post("/api/analyze")
+async def analyze(body: AnalyzeRequest, background: BackgroundTasks, request: Request, client=Depends(client_id)):
+    topic = body.topic.strip()
+    if body.notify_email and not may_notify(body.notify_email):
+        return JSONResponse({"error": "notify_email requires an API token or an allow-listed address."},
+                            status_code=403)
+    try:
+        client_limits.check_user(client)
+        if body.notify_email:
+            # Each email is charged to the client like another request, shared run or not
+            client_limits.check_user(client)
+        # Identical concurrent requests share one run, as in the Flask app
+        summary, outcome = await analysis_flight.do(analysis_key(topic),
+                                                    lambda: _analysis(request.app.state.runner, topic))
+    except Overloaded as e:
+        return _overloaded(e)
+    except PipelineError as e:
+        if isinstance(e.error, NoDataError):
+            return JSONResponse({"error": f"No data found for topic '{topic}'."}, status_code=404)
+        logging.error(f"Analysis for '{topic}' failed: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+    if body.notify_email:
+        message = analysis_email(config.SMTP_USERNAME, body.notify_email, topic, summary)
+        background.add_task(send_email_async, config, message)
+    return {**summary, "served_as": outcome, "charts": f"/api/runs/{summary['run_id']}/charts"}
+
+
+async def _progress_events(channel, last_id):
+    # Checking the channel without blocking keeps an open stream down to a
+    # coroutine: no thread is held however many clients watch
+    yield "retry: 2000\n\n"
+    if channel is None:
+        return
+    idle = 0.0
+    while True:
+        frames, last_id, closed = channel.events_after(last_id)
+        if frames:
+            yield "".join(frames)
+            idle = 0.0
+        if closed:
+            return
+        await asyncio.sleep(PROGRESS_POLL_SECONDS)
+        idle += PROGRESS_POLL_SECONDS
+        if idle >= 10:
+            yield ": keepalive\n\n"
+            idle = 0.0
+
+
+@app.get("/api/progress")
+async def progress(topic: str, request: Request, client=Depends(client_id)):
+    try:
+        last_id = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        last_id = 0
+    return StreamingResponse(_progress_events(progress_broker.channel(progress_key(topic)), last_id),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/runs/{run_id}/charts")
+async def run_charts(run_id: str, client=Depends(client_id)):
+    run_path = safe_join(config.RUNS_DIR, run_id)
+    try:
+        chart_file = read_manifest(run_path)["artifacts"]["chart_data"]["file"]
+    except (TypeError, OSError, ValueError, KeyError):
+        raise HTTPException(status_code=404, detail="Unknown run.")
+    return FileResponse(os.path.join(run_path, chart_file), media_type="application/json",
+                        headers={"Cache-Control": f"private, max-age={ONE_YEAR}, immutable"})
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(metrics_registry.to_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,123 @@
+import time
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from pipeline import build_analysis_pipeline, PipelineError
+from artifacts import RunDirectory
+from renderer import renderer_pool
+from admission import Overloaded
+from deadline import Deadline
+from progress import Progress
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class AsyncAnalysisRunner:
+    """
+    Runs the standard analysis graph from an event loop, sharing the
+    collector, analyzer, chart and report components across runs.
+
+    Collection goes through PRAW, which blocks, so it runs on a bounded
+    pool of `praw_threads`; the topic image is fetched meanwhile with
+    non-blocking HTTP. The rest of the graph (scoring, charts, report) is
+    handed to Pipeline.run on shared thread and process pools, at most
+    `max_concurrent` runs at a time. Waiting on the network therefore holds
+    no thread beyond the PRAW calls themselves, and up to `max_in_flight`
+    runs may be collecting or waiting for their turn before new ones are
+    refused with Overloaded.
+    """
+
+    def __init__(self, data_collector, sentiment_analyzer, viz_generator, report_generator, image_search, config,
+                 results_store=None, praw_threads=16, max_concurrent=2, max_in_flight=64):
+        self.components = (data_collector, sentiment_analyzer, viz_generator, report_generator, image_search)
+        self.image_search = image_search
+        self.config = config
+        self.results_store = results_store
+        self.praw_threads = praw_threads
+        self.max_concurrent = max_concurrent
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._pools = None
+
+    def start(self):
+        workers = self.config.PIPELINE_MAX_WORKERS
+        self.praw_pool = ThreadPoolExecutor(max_workers=self.praw_threads, thread_name_prefix="praw")
+        # One thread per concurrent run drives its graph; stages share the other pools
+        self.coordinators = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="pipeline")
+        self.thread_pool = ThreadPoolExecutor(max_workers=workers * self.max_concurrent, thread_name_prefix="stage")
+        self.process_pool = renderer_pool(workers) if self.config.PIPELINE_USE_PROCESSES else None
+        self.http = httpx.AsyncClient(timeout=30)
+        self._graph_slots = asyncio.Semaphore(self.max_concurrent)
+        self._pools = [self.praw_pool, self.coordinators, self.thread_pool] + [self.process_pool] * bool(self.process_pool)
+        return self
+
+    async def aclose(self):
+        await self.http.aclose()
+        for pool in self._pools or []:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _topic_image(self, topic, output_dir, deadline, progress):
+        progress.stage("topic_image", "Image search", "started")
+        started = time.perf_counter()
+        try:
+            path = await asyncio.wait_for(
+                self.image_search.search_and_download_image_async(topic, output_dir, client=self.http),
+                timeout=deadline.remaining() if deadline.bounded else None
+            )
+        except asyncio.TimeoutError:
+            logging.warning(f"Image search for '{topic}' abandoned at the time budget")
+            progress.stage("topic_image", "Image search", "abandoned")
+            return None, None
+        except Exception as e:
+            # The topic image is optional, as in the threaded pipeline
+            logging.warning(f"Image search for '{topic}' failed: {e}")
+            progress.stage("topic_image", "Image search", "failed")
+            return None, None
+        seconds = time.perf_counter() - started
+        progress.stage("topic_image", "Image search", "finished", seconds)
+        return path, seconds
+
+    async def run(self, topic, progress=None):
+        """Analyse `topic`; returns the PipelineResult, raising PipelineError like Pipeline.run."""
+        if self.in_flight >= self.max_in_flight:
+            raise Overloaded("queue_full", 10)
+        self.in_flight += 1
+        try:
+            return await self._run(topic, progress or Progress())
+        finally:
+            self.in_flight -= 1
+
+    async def _run(self, topic, progress):
+        loop = asyncio.get_running_loop()
+        pipeline = build_analysis_pipeline(*self.components, self.config, thread_pool=self.thread_pool,
+                                           process_pool=self.process_pool, results_store=self.results_store)
+        run_dir = RunDirectory.create(self.config.RUNS_DIR, topic)
+        deadline = Deadline(self.config.ANALYSIS_TIME_BUDGET_SECONDS)
+        image = asyncio.ensure_future(self._topic_image(topic, run_dir.path, deadline, progress))
+
+        collect = pipeline.stages["data"]
+        progress.stage(collect.name, collect.label, "started")
+        started = time.perf_counter()
+        try:
+            data = await loop.run_in_executor(
+                self.praw_pool, partial(collect.func, topic=topic, deadline=deadline, progress=progress)
+            )
+        except Exception as e:
+            image.cancel()
+            progress.stage(collect.name, collect.label, "failed")
+            raise PipelineError(collect.name, collect.label, e) from e
+        collect_seconds = time.perf_counter() - started
+        progress.stage(collect.name, collect.label, "finished", collect_seconds)
+        # Pixabay almost always answers well before Reddit has been searched
+        topic_image, image_seconds = await image
+
+        async with self._graph_slots:
+            result = await loop.run_in_executor(self.coordinators, partial(
+                pipeline.run, topic=topic, output_dir=run_dir.path, data=data, topic_image=topic_image,
+                deadline=deadline, progress=progress
+            ))
+        result.timings = {"data": collect_seconds, **({"topic_image": image_seconds} if image_seconds else {}),
+                          **result.timings}
+        return result
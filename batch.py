@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pipeline import build_analysis_pipeline, PipelineError, NoDataError
+from artifacts import RunDirectory
+from renderer import renderer_pool
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def read_topics(path):
+    """One topic per line; blank lines and '#' comments are skipped, duplicates dropped."""
+    topics = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            topic = line.strip()
+            if not topic or topic.startswith("#") or topic.lower() in seen:
+                continue
+            seen.add(topic.lower())
+            topics.append(topic)
+    return topics
+
+
+def summarize_run(topic, result, seconds):
+    """One line of the batch index (and the analysis API's response) for a finished run."""
+    df = result["sentiment_df"]
+    total = len(df)
+    positive = int((df["combined_compound"] >= 0.05).sum())
+    negative = int((df["combined_compound"] <= -0.05).sum())
+    return {
+        "topic": topic,
+        "status": "ok",
+        "items": total,
+        "mean_combined_compound": round(float(df["combined_compound"].mean()), 4),
+        "positive_percentage": round(positive / total * 100, 1),
+        "negative_percentage": round(negative / total * 100, 1),
+        "neutral_percentage": round((total - positive - negative) / total * 100, 1),
+        "run_dir": os.path.dirname(result["manifest"]),
+        "report": result["report"],
+        "results": result["results_path"],
+        "seconds": round(seconds, 2),
+    }
+
+
+class BatchRunner:
+    """
+    Analyses many topics in one process. The collector, analyzer, chart and
+    report components are built once and shared, and every topic's pipeline
+    submits its stages to the same thread and process pools, so NLTK, pandas
+    and matplotlib are loaded (and PRAW authenticated) only once per batch.
+    """
+
+    def __init__(self, data_collector, sentiment_analyzer, viz_generator, report_generator, image_search, config,
+                 parallelism=4, results_store=None):
+        self.components = (data_collector, sentiment_analyzer, viz_generator, report_generator, image_search)
+        self.config = config
+        self.parallelism = parallelism
+        self.results_store = results_store
+
+    def _run_topic(self, topic, thread_pool, process_pool):
+        started = time.perf_counter()
+        try:
+            pipeline = build_analysis_pipeline(*self.components, self.config, thread_pool=thread_pool,
+                                               process_pool=process_pool, results_store=self.results_store)
+            run_dir = RunDirectory.create(self.config.RUNS_DIR, topic)
+            result = pipeline.run(topic=topic, output_dir=run_dir.path)
+            logging.info(f"Batch topic '{topic}' done. Stage timings: {result.format_timings()}")
+            return summarize_run(topic, result, time.perf_counter() - started)
+        except Exception as e:
+            # Anything one topic raises (an unwritable run directory, a bad
+            # result) is recorded for that topic instead of ending the batch
+            no_data = isinstance(e, PipelineError) and isinstance(e.error, NoDataError)
+            logging.error(f"Batch topic '{topic}' failed: {e}")
+            return {"topic": topic, "status": "no_data" if no_data else "error", "error": str(e),
+                    "seconds": round(time.perf_counter() - started, 2)}
+
+    def run(self, topics):
+        started = time.perf_counter()
+        entries = {}
+        # Each topic's scheduler loop runs on `topic_pool`; its stages run on the
+        # shared pools, which are sized for the whole batch
+        workers = self.config.PIPELINE_MAX_WORKERS
+        thread_pool = ThreadPoolExecutor(max_workers=workers * self.parallelism)
+        process_pool = renderer_pool(workers) if self.config.PIPELINE_USE_PROCESSES else None
+        try:
+            with ThreadPoolExecutor(max_workers=self.parallelism) as topic_pool:
+                futures = {topic_pool.submit(self._run_topic, topic, thread_pool, process_pool): topic for topic in topics}
+                for future in as_completed(futures):
+                    entry = future.result()
+                    entries[entry["topic"]] = entry
+        finally:
+            thread_pool.shutdown()
+            if process_pool is not None:
+                process_pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        summary = {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "topics": len(topics),
+            "succeeded": sum(1 for e in entries.values() if e["status"] == "ok"),
+            "parallelism": self.parallelism,
+            "seconds": round(elapsed, 2),
+            "topics_per_minute": round(len(topics) / elapsed * 60, 2) if elapsed else None,
+            "results": [entries[topic] for topic in topics],
+        }
+        return summary
+
+    def write_index(self, summary):
+        """Write batch_summary.json and a markdown index linking every topic's report."""
+        json_path = os.path.join(self.config.OUTPUT_DIR, "batch_summary.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+        lines = [
+            f"# Batch Sentiment Summary ({summary['generated_at']})\n",
+            f"{summary['succeeded']}/{summary['topics']} topics analysed in {summary['seconds']}s "
+            f"({summary['topics_per_minute']} topics/minute, parallelism {summary['parallelism']}).\n",
+            "| Topic | Status | Items | Mean Compound | Positive % | Negative % | Neutral % | Report |",
+            "|---|---|---|---|---|---|---|---|",
+        ]
+        for e in summary["results"]:
+            if e["status"] == "ok":
+                lines.append(f"| {e['topic']} | ok | {e['items']} | {e['mean_combined_compound']:.3f} | "
+                             f"{e['positive_percentage']} | {e['negative_percentage']} | {e['neutral_percentage']} | "
+                             f"[report]({os.path.relpath(e['report'], self.config.OUTPUT_DIR).replace(os.sep, '/')}) |")
+            else:
+                lines.append(f"| {e['topic']} | {e['status']} | - | - | - | - | - | - |")
+        md_path = os.path.join(self.config.OUTPUT_DIR, "batch_summary.md")
+        with open(md_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return json_path, md_path
@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for the analysis pipeline.
+
+Run with `python -m benchmarks` from the repository root; see
+benchmarks/run.py for the options. Nothing here talks to Reddit or Pixabay.
+"""
@@ -0,0 +1,166 @@
+"""
+Reddit dump ingestion throughput (dump_ingest.py) on a generated dump.
+
+A newline-delimited JSON dump of synthetic comments and submissions, with
+the fields real dumps carry, is written zstd- or gzip-compressed; a share
+of the records (`--match-rate`) mention the topic keyword. Then:
+
+- read: decompressing the dump and cutting it into blocks, nothing else
+  (the ceiling for everything below);
+- ingest: decompression, parsing, keyword/subreddit filtering and mapping
+  to items, inline and over process pools of increasing size, with and
+  without the raw-line keyword prefilter;
+- score (--score): the matched items also scored in chunks, with random
+  stand-in scores, and written out as results, report and chart data.
+
+    python -m benchmarks.dump_ingest --records 1000000 --compression zstd --workers 4 --score
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow as pa
+
+from synthetic_corpus import SyntheticCorpus, SUBREDDITS, RandomScorer
+from benchmarks.run import _git_commit
+from chunked import ChunkedAnalysis
+from dump_ingest import DumpFilter, DumpReader, blocks
+from report_generator import ReportGenerator
+
+KEYWORD = "kubernetes"
+
+
+def write_dump(path, records, match_rate, compression, seed=42):
+    """`records` dump lines shaped like Pushshift comments (9 in 10) and submissions."""
+    corpus = SyntheticCorpus(seed=seed)
+    rng = random.Random(seed)
+    start = 1704067200
+    with pa.output_stream(path, compression=compression) as f:
+        lines = []
+        for i in range(records):
+            text = corpus.sentence()
+            if rng.random() < match_rate:
+                text = f"{text} {KEYWORD.capitalize()} {corpus.sentence().lower()}"
+            subreddit = rng.choice(SUBREDDITS)
+            common = {
+                "id": f"{i:x}", "author": f"user{rng.randint(0, 99999)}", "subreddit": subreddit,
+                "subreddit_id": f"t5_{SUBREDDITS.index(subreddit):x}", "created_utc": start + i // 10,
+                "retrieved_on": start + 86400 * 30, "score": rng.randint(-5, 500), "gilded": 0,
+                "distinguished": None, "edited": False, "stickied": False,
+                "author_flair_text": None, "author_flair_css_class": None,
+            }
+            if i % 10:
+                record = {**common, "body": text, "link_id": f"t3_{i // 10:x}", "parent_id": f"t3_{i // 10:x}",
+                          "controversiality": 0, "is_submitter": False,
+                          "permalink": f"/r/{subreddit}/comments/{i // 10:x}/_/{i:x}/"}
+            else:
+                record = {**common, "title": text, "selftext": corpus.sentence(), "num_comments": 9,
+                          "url": f"https://www.reddit.com/r/{subreddit}/comments/{i:x}/",
+                          "permalink": f"/r/{subreddit}/comments/{i:x}/", "over_18": False, "is_self": True}
+            lines.append(json.dumps(record))
+            if len(lines) == 10000:
+                f.write(("\n".join(lines) + "\n").encode())
+                lines = []
+        if lines:
+            f.write(("\n".join(lines) + "\n").encode())
+
+
+def timed_read(path):
+    started = time.perf_counter()
+    size = sum(len(block) for block in blocks(path))
+    return size, time.perf_counter() - started
+
+
+def timed_ingest(path, workers, prefilter):
+    pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        if pool:
+            # Start the processes before timing, as a long-running ingest would have
+            list(pool.map(abs, range(workers)))
+        reader = DumpReader(DumpFilter([KEYWORD], prefilter=prefilter), process_pool=pool)
+        started = time.perf_counter()
+        for _ in reader.items([path]):
+            pass
+        return reader.stats, time.perf_counter() - started
+    finally:
+        if pool:
+            pool.shutdown()
+
+
+def timed_score(path, workers, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        reader = DumpReader(DumpFilter([KEYWORD]), process_pool=pool)
+        analysis = ChunkedAnalysis(RandomScorer(), ReportGenerator(output_dir=output_dir), process_pool=pool)
+        started = time.perf_counter()
+        result = analysis.run(reader.items([path]), KEYWORD, output_dir)
+        return reader.stats, result, time.perf_counter() - started
+    finally:
+        if pool:
+            pool.shutdown()
+
+
+def _mb_s(size, seconds):
+    return round(size / 2 ** 20 / seconds, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Reddit dump ingestion throughput.")
+    parser.add_argument("--records", type=int, default=1_000_000, help="Records in the generated dump.")
+    parser.add_argument("--match-rate", type=float, default=0.05, help="Share of records mentioning the topic.")
+    parser.add_argument("--compression", choices=["zstd", "gzip"], default="zstd", help="Dump compression.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Largest parsing pool measured.")
+    parser.add_argument("--score", action="store_true", help="Also score the matched items end to end.")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    work = tempfile.mkdtemp(prefix="sentinent-dump-")
+    path = os.path.join(work, "RC_bench.ndjson" + (".zst" if args.compression == "zstd" else ".gz"))
+    started = time.perf_counter()
+    write_dump(path, args.records, args.match_rate, args.compression)
+    print(f"Generated {args.records:,} records ({os.path.getsize(path) / 2 ** 20:.1f} MB {args.compression}) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    size, seconds = timed_read(path)
+    rows = [{"phase": "read", "workers": 0, "prefilter": None, "seconds": round(seconds, 2),
+             "records_per_second": None, "mb_per_second": _mb_s(size, seconds), "matched": None}]
+    cases = [(0, True)] + [(w, True) for w in sorted({1, 2, args.workers}) if w <= args.workers]
+    cases.append((args.workers, False))
+    for workers, prefilter in cases:
+        stats, seconds = timed_ingest(path, workers, prefilter)
+        rows.append({"phase": "ingest", "workers": workers, "prefilter": prefilter, "seconds": round(seconds, 2),
+                     "records_per_second": round(stats["records"] / seconds),
+                     "mb_per_second": _mb_s(stats["bytes"], seconds), "matched": stats["matched"]})
+    if args.score:
+        stats, result, seconds = timed_score(path, args.workers, os.path.join(work, "run"))
+        rows.append({"phase": "score", "workers": args.workers, "prefilter": True, "seconds": round(seconds, 2),
+                     "records_per_second": round(stats["records"] / seconds),
+                     "mb_per_second": _mb_s(stats["bytes"], seconds), "matched": result["items"]})
+
+    print(f"{'phase':<7}{'workers':>8}{'prefilter':>10}{'seconds':>9}{'records/s':>12}{'MB/s':>8}{'matched':>9}")
+    for row in rows:
+        prefilter = "-" if row["prefilter"] is None else str(row["prefilter"])
+        matched = "-" if row["matched"] is None else row["matched"]
+        print(f"{row['phase']:<7}{row['workers'] or 'inline':>8}{prefilter:>10}{row['seconds']:>9}"
+              f"{row['records_per_second'] or '-':>12}{row['mb_per_second']:>8}{matched:>9}")
+    report = {"commit": _git_commit(), "records": args.records, "match_rate": args.match_rate,
+              "compression": args.compression, "dump_bytes": os.path.getsize(path), "cpus": os.cpu_count(),
+              "results": rows}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    shutil.rmtree(work)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Concurrent-analysis load test: the Flask app (app.py) against the ASGI
+service (asgi_app.py), offline.
+
+Reddit is simulated by FakeReddit and Pixabay by a local HTTP server, both
+with a per-request delay. Each path gets the same thread budget: the Flask
+app runs under a WSGI server with `--threads` request threads (as gunicorn
+--threads would), the ASGI runner gets the same number of PRAW threads.
+Both allow `--pipelines` analysis graphs at once. Every request asks for a
+different topic, so nothing is coalesced.
+
+    python -m benchmarks.load_test --requests 8 16 32 --threads 8
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+import threading
+import statistics
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import matplotlib
+matplotlib.use("Agg")
+
+from benchmarks.run import _git_commit
+from fake_reddit import FakeReddit, make_collector
+
+
+class FakePixabay(BaseHTTPRequestHandler):
+    latency = 0.0
+    # A 1x1 JPEG-sized payload is enough; the file is only written to disk
+    image = b"\xff\xd8\xff\xe0" + b"\x00" * 2048
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.path.startswith("/api/"):
+            body = json.dumps({"hits": [{"largeImageURL": f"http://{self.headers['Host']}/image.jpg"}]}).encode()
+            content_type = "application/json"
+        else:
+            body, content_type = self.image, "image/jpeg"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_pixabay(latency):
+    handler = type("Pixabay", (FakePixabay,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/"
+
+
+def _app_threads():
+    # The fake Pixabay server's threads stand in for the remote service
+    return sum(1 for t in threading.enumerate() if "process_request_thread" not in t.name)
+
+
+class ThreadSampler:
+    """Peak number of live threads (outside the fake Pixabay server) while the block runs."""
+
+    def __enter__(self):
+        self.peak = _app_threads()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.05):
+            self.peak = max(self.peak, _app_threads())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _summary(path, requests, seconds, latencies, statuses, peak_threads):
+    ok = sorted(latency for latency, status in zip(latencies, statuses) if status == 200)
+    return {
+        "path": path,
+        "requests": requests,
+        "ok": len(ok),
+        "seconds": round(seconds, 2),
+        "analyses_per_minute": round(len(ok) / seconds * 60, 1),
+        "p50_seconds": round(statistics.median(ok), 2) if ok else None,
+        "p95_seconds": round(ok[max(0, int(len(ok) * 0.95) - 1)], 2) if ok else None,
+        "peak_threads": peak_threads,
+    }
+
+
+def run_flask(requests, args, reddit, pixabay_url):
+    import app as flask_app
+    from admission import AdmissionController
+
+    def collector(**_):
+        return make_collector(reddit)
+
+    def one(i):
+        client = flask_app.app.test_client()
+        with client.session_transaction() as session:
+            session["email"] = f"load{i}@example.com"
+        started = time.perf_counter()
+        response = client.post("/analyze", data={"topic": f"load test {i} {time.time_ns()}"})
+        return time.perf_counter() - started, response.status_code
+
+    admission = AdmissionController(max_concurrent=args.pipelines, max_queue=requests, queue_timeout=3600,
+                                    user_rate_per_minute=6e6, user_burst=requests)
+    with patch.object(flask_app, "RedditDataCollector", collector), \
+            patch.object(flask_app, "analysis_admission", admission), \
+            patch.object(flask_app.config, "PIXABAY_API_URL", pixabay_url), \
+            ThreadSampler() as sampler, ThreadPoolExecutor(max_workers=args.threads) as server:
+        started = time.perf_counter()
+        outcomes = list(server.map(one, range(requests)))
+        seconds = time.perf_counter() - started
+    return _summary("flask", requests, seconds, *zip(*outcomes), sampler.peak)
+
+
+def run_asgi(requests, args, reddit, pixabay_url):
+    import httpx
+    import asgi_app
+    from async_pipeline import AsyncAnalysisRunner
+    from admission import AdmissionController
+    from sentiment_analyzer import SentimentAnalyzer
+    from visualization_generator import VisualizationGenerator
+    from report_generator import ReportGenerator
+    from image_search_integration import ImageSearchIntegration
+
+    config = asgi_app.config
+    runner = AsyncAnalysisRunner(
+        make_collector(reddit), SentimentAnalyzer(), VisualizationGenerator(), ReportGenerator(output_dir=config.OUTPUT_DIR),
+        ImageSearchIntegration(output_dir=config.OUTPUT_DIR, api_key="load", base_url=pixabay_url), config,
+        praw_threads=args.threads, max_concurrent=args.pipelines, max_in_flight=requests
+    )
+
+    async def one(client, i):
+        started = time.perf_counter()
+        response = await client.post("/api/analyze", json={"topic": f"load test {i} {time.time_ns()}"}, timeout=None)
+        return time.perf_counter() - started, response.status_code
+
+    async def main():
+        asgi_app.app.state.runner = runner.start()
+        try:
+            transport = httpx.ASGITransport(app=asgi_app.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://asgi") as client:
+                started = time.perf_counter()
+                outcomes = await asyncio.gather(*(one(client, i) for i in range(requests)))
+                return outcomes, time.perf_counter() - started
+        finally:
+            await runner.aclose()
+
+    limits = AdmissionController(user_rate_per_minute=6e6, user_burst=requests)
+    with patch.object(asgi_app, "client_limits", limits), patch.object(config, "API_TOKEN", None), \
+            ThreadSampler() as sampler:
+        outcomes, seconds = asyncio.run(main())
+    return _summary("asgi", requests, seconds, *zip(*outcomes), sampler.peak)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare concurrent-analysis capacity of the Flask and ASGI apps.")
+    parser.add_argument("--requests", nargs="+", type=int, default=[8, 16, 32],
+                        help="Concurrent analyses to submit per round.")
+    parser.add_argument("--threads", type=int, default=8,
+                        help="Flask request threads, and ASGI PRAW threads.")
+    parser.add_argument("--pipelines", type=int, default=2,
+                        help="Analysis graphs allowed at once on either path (ANALYZE_MAX_CONCURRENT).")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated Reddit request latency in seconds.")
+    parser.add_argument("--image-latency", type=float, default=1.0, help="Simulated Pixabay latency in seconds.")
+    parser.add_argument("--paths", nargs="+", choices=["flask", "asgi"], default=["flask", "asgi"])
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    output = os.path.abspath(args.output) if args.output else None
+    for name in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT", "REDDIT_USERNAME",
+                 "REDDIT_PASSWORD", "SMTP_USERNAME", "SMTP_PASSWORD", "PIXABAY_API_KEY"):
+        os.environ.setdefault(name, "load")
+    # Both apps write users.db, output/ and results.db relative to the working directory
+    work = tempfile.mkdtemp(prefix="sentinent-load-")
+    os.makedirs(os.path.join(work, "app"))
+    os.chdir(os.path.join(work, "app"))
+    os.environ.setdefault("RENDER_CHART_PNGS", "0")
+    os.environ.setdefault("SEARCH_INDEX_INTERVAL_SECONDS", "3600")
+
+    server, pixabay_url = start_pixabay(args.image_latency)
+    runners = {"flask": run_flask, "asgi": run_asgi}
+    rows = []
+    try:
+        for requests in args.requests:
+            for path in args.paths:
+                reddit = FakeReddit(num_submissions=10, comments_per_submission=10, latency=args.latency)
+                row = runners[path](requests, args, reddit, pixabay_url)
+                rows.append(row)
+                print(f"{path:<6} {requests:>4} requests: {row['ok']:>4} ok in {row['seconds']:>7.2f}s "
+                      f"({row['analyses_per_minute']:>6.1f}/min, p50 {row['p50_seconds']}s, "
+                      f"p95 {row['p95_seconds']}s, peak {row['peak_threads']} threads)", flush=True)
+    finally:
+        server.shutdown()
+
+    report = {"commit": _git_commit(), "cpu_count": os.cpu_count(), "threads": args.threads,
+              "pipelines": args.pipelines, "latency": args.latency, "image_latency": args.image_latency,
+              "results": rows}
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Out-of-core analysis (chunked.py) of a synthetic corpus far larger than
+the in-memory pipeline could hold, under a fixed RSS ceiling.
+
+Items are generated lazily and scored a chunk at a time, appended to the
+results file and folded into the report and chart sketches; the run fails
+if the process's peak resident set size (ru_maxrss, which includes the
+interpreter and its imports) exceeds `--max-rss-mb`. The scorer is a
+random stand-in by default, so a 10M-item run measures the chunking,
+storage and aggregation rather than hours of VADER and TextBlob;
+`--scorer analyzer` scores for real (use it with fewer items).
+
+For comparison, the size one in-memory frame of every scored item would
+have is extrapolated from the first chunk's deep memory usage.
+
+    python -m benchmarks.out_of_core --items 10000000 --chunk-size 100000 --max-rss-mb 1024
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import logging
+import tempfile
+import pyarrow.parquet as pq
+
+from synthetic_corpus import SyntheticCorpus, RandomScorer
+from benchmarks.run import _git_commit
+from chunked import ChunkedAnalysis
+from report_generator import ReportGenerator
+
+
+def peak_rss_mb():
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Probe:
+    """Scores through `scorer`, sizing the first scored chunk as a pandas frame."""
+
+    def __init__(self, scorer):
+        self.scorer = scorer
+        self.frame_bytes_per_item = None
+
+    def analyze(self, data):
+        df = self.scorer.analyze(data)
+        if self.frame_bytes_per_item is None:
+            self.frame_bytes_per_item = df.memory_usage(deep=True).sum() / max(1, len(df))
+        return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a large synthetic corpus a chunk at a time.")
+    parser.add_argument("--items", type=int, default=10_000_000, help="Synthetic items to analyze.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Items per chunk.")
+    parser.add_argument("--max-rss-mb", type=float, default=1024, help="Fail if peak RSS exceeds this.")
+    parser.add_argument("--scorer", choices=["random", "analyzer"], default="random",
+                        help="Random stand-in scores or the real SentimentAnalyzer.")
+    parser.add_argument("--output-dir", help="Keep the run's files here (default: a temporary directory).")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.scorer == "analyzer":
+        from sentiment_analyzer import SentimentAnalyzer
+        scorer = SentimentAnalyzer()
+    else:
+        scorer = RandomScorer()
+    probe = Probe(scorer)
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix="sentinent-ooc-")
+    os.makedirs(output_dir, exist_ok=True)
+
+    baseline = peak_rss_mb()
+    analysis = ChunkedAnalysis(probe, ReportGenerator(output_dir=output_dir), chunk_size=args.chunk_size, seed=0)
+    started = time.perf_counter()
+    result = analysis.run(SyntheticCorpus(seed=7).iter_items(args.items), "out of core", output_dir)
+    seconds = time.perf_counter() - started
+    peak = peak_rss_mb()
+
+    rows = pq.ParquetFile(result["results_path"]).metadata.num_rows
+    with open(result["chart_data"], encoding="utf-8") as f:
+        charted = json.load(f)["items"]
+    report = {
+        "commit": _git_commit(), "items": args.items, "chunk_size": args.chunk_size, "scorer": args.scorer,
+        "seconds": round(seconds, 1), "items_per_second": round(args.items / seconds),
+        "baseline_rss_mb": round(baseline, 1), "peak_rss_mb": round(peak, 1), "max_rss_mb": args.max_rss_mb,
+        "in_memory_frame_mb": round(probe.frame_bytes_per_item * args.items / 2 ** 20),
+        "results_rows": rows, "results_mb": round(os.path.getsize(result["results_path"]) / 2 ** 20, 1),
+        "chart_data_items": charted, "report_items": result["items"],
+    }
+    print(f"{args.items:,} items in {report['seconds']}s ({report['items_per_second']:,}/s), "
+          f"chunks of {args.chunk_size:,}")
+    print(f"peak RSS {report['peak_rss_mb']} MB (ceiling {args.max_rss_mb} MB; {report['baseline_rss_mb']} MB "
+          f"after imports); one in-memory frame would need ~{report['in_memory_frame_mb']:,} MB")
+    print(f"results file: {rows:,} rows, {report['results_mb']} MB; chart data and report cover "
+          f"{charted:,} and {result['items']:,} items")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if rows != args.items or charted != args.items or result["items"] != args.items:
+        print("Not every item reached the results file, chart data and report.")
+        return 1
+    if peak > args.max_rss_mb:
+        print(f"Peak RSS {peak:.0f} MB is over the {args.max_rss_mb:.0f} MB ceiling.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
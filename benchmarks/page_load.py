@@ -0,0 +1,157 @@
+"""
+Results-page load: bytes transferred, requests made and response time for
+the page's subresources (chart images, chart JSON, scripts), first visit
+and repeat visit, offline.
+
+One analysis is run through the Flask app (fake Reddit and Pixabay, as in
+load_test), then its results page is "loaded" by two clients:
+
+- plain: sends no Accept-Encoding and revalidates every file, as a client
+  that ignores Cache-Control would (and as every file was served before
+  the app set Cache-Control and precompressed);
+- browser: accepts gzip/br and keeps a cache that honours Cache-Control,
+  max-age and ETags.
+
+Time is the app's own response time plus a modelled network cost of
+`--rtt-ms` per request and `--mbps` bandwidth.
+
+    python -m benchmarks.page_load --rtt-ms 50 --mbps 20
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import logging
+import tempfile
+from unittest.mock import patch
+
+import matplotlib
+matplotlib.use("Agg")
+
+from benchmarks.run import _git_commit
+from benchmarks.load_test import start_pixabay
+from fake_reddit import FakeReddit, make_collector
+
+SUBRESOURCE = re.compile(r'(?:src|data-url)="(/[^"]+)"')
+
+
+class Client:
+    """A browser-like HTTP cache in front of the Flask test client."""
+
+    def __init__(self, test_client, accept_encoding=None, honour_cache_control=True):
+        self.client = test_client
+        self.accept_encoding = accept_encoding
+        self.honour_cache_control = honour_cache_control
+        self.cache = {}
+
+    def _fresh(self, entry):
+        return self.honour_cache_control and entry["expires"] > time.time()
+
+    def fetch(self, url):
+        """(requests made, body bytes received, app seconds) for one subresource."""
+        entry = self.cache.get(url)
+        if entry and self._fresh(entry):
+            return 0, 0, 0.0
+        headers = {"Accept-Encoding": self.accept_encoding} if self.accept_encoding else {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        started = time.perf_counter()
+        response = self.client.get(url, headers=headers)
+        body = response.get_data()
+        seconds = time.perf_counter() - started
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"{url}: HTTP {response.status_code}")
+        if response.status_code == 200 or entry is None:
+            max_age = response.cache_control.max_age or 0
+            no_cache = response.cache_control.no_cache
+            self.cache[url] = {"etag": response.headers.get("ETag"),
+                               "expires": time.time() + (0 if no_cache else max_age)}
+        else:
+            self.cache[url]["expires"] = time.time() + (response.cache_control.max_age or 0)
+        return 1, len(body), seconds
+
+
+def load(client, urls, rtt, bytes_per_second):
+    requests = transferred = 0
+    app_seconds = 0.0
+    for url in urls:
+        made, size, seconds = client.fetch(url)
+        requests += made
+        transferred += size
+        app_seconds += seconds
+    return {
+        "requests": requests,
+        "bytes": transferred,
+        "app_ms": round(app_seconds * 1000, 1),
+        "modelled_ms": round((app_seconds + requests * rtt + transferred / bytes_per_second) * 1000, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure first and repeat loads of a results page's files.")
+    parser.add_argument("--submissions", type=int, default=40, help="Fake submissions collected for the run.")
+    parser.add_argument("--rtt-ms", type=float, default=50.0, help="Modelled round trip per request.")
+    parser.add_argument("--mbps", type=float, default=20.0, help="Modelled download bandwidth in Mbit/s.")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    output = os.path.abspath(args.output) if args.output else None
+    for name in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT", "REDDIT_USERNAME",
+                 "REDDIT_PASSWORD", "SMTP_USERNAME", "SMTP_PASSWORD", "PIXABAY_API_KEY"):
+        os.environ.setdefault(name, "load")
+    work = tempfile.mkdtemp(prefix="sentinent-page-")
+    os.makedirs(os.path.join(work, "app"))
+    os.chdir(os.path.join(work, "app"))
+    # The static PNG charts are part of the page, so render them
+    os.environ.setdefault("RENDER_CHART_PNGS", "1")
+    os.environ.setdefault("SEARCH_INDEX_INTERVAL_SECONDS", "3600")
+
+    import app as flask_app
+    logging.getLogger().setLevel(logging.WARNING)
+    server, pixabay_url = start_pixabay(0.0)
+    reddit = FakeReddit(num_submissions=args.submissions, comments_per_submission=9)
+    try:
+        with patch.object(flask_app, "RedditDataCollector", lambda **_: make_collector(reddit)), \
+                patch.object(flask_app.config, "PIXABAY_API_URL", pixabay_url):
+            test_client = flask_app.app.test_client()
+            with test_client.session_transaction() as session:
+                session["email"] = "page@example.com"
+            page = test_client.post("/analyze", data={"topic": "page load"})
+    finally:
+        server.shutdown()
+    if page.status_code != 200:
+        raise RuntimeError(f"/analyze returned HTTP {page.status_code}")
+    urls = sorted(set(SUBRESOURCE.findall(page.get_data(as_text=True))))
+    # e.g. /vendor/plotly.min.js when plotly is not installed
+    missing = [url for url in urls if test_client.get(url).status_code == 404]
+    urls = [url for url in urls if url not in missing]
+    if missing:
+        print(f"Not served here, left out: {', '.join(missing)}")
+    # Background precompression of static assets must not be counted against the first visit
+    flask_app._precompress_assets()
+
+    rtt, bytes_per_second = args.rtt_ms / 1000, args.mbps * 1e6 / 8
+    rows = []
+    for name, accept_encoding, honour in (("plain", None, False), ("browser", "gzip, deflate, br", True)):
+        client = Client(flask_app.app.test_client(), accept_encoding, honour)
+        with client.client.session_transaction() as session:
+            session["email"] = "page@example.com"
+        for visit in ("first", "repeat"):
+            row = {"client": name, "visit": visit, **load(client, urls, rtt, bytes_per_second)}
+            rows.append(row)
+            print(f"{name:<8} {visit:<7} {row['requests']:>3} requests {row['bytes']:>10,} bytes "
+                  f"app {row['app_ms']:>7.1f} ms  modelled {row['modelled_ms']:>8.1f} ms", flush=True)
+
+    report = {"commit": _git_commit(), "files": urls, "missing": missing, "rtt_ms": args.rtt_ms, "mbps": args.mbps,
+              "results": rows}
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Chart rendering latency: the cold process pool every web run used to
+create, against the shared pre-warmed renderer pool (renderer.py), and
+fresh figures against reused figure templates.
+
+- first chart: seconds from submitting a run's five chart stages to the
+  first PNG being written, and to all of them (the run's chart phase);
+  "cold" starts a new pool per run, "warm" reuses one started (and
+  warmed) ahead of the runs.
+- steady state: median time per chart kind drawn repeatedly in one
+  process, on a new figure each time vs on its template.
+
+With the "fork" start method (Linux) pool processes inherit the parent's
+imports; with "spawn" (macOS, Windows) each one imports matplotlib,
+seaborn and wordcloud itself.
+
+    python -m benchmarks.render_latency --size 2000 --runs 5 --repeat 10 --start-method spawn
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import tempfile
+import statistics
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import matplotlib
+matplotlib.use("Agg")
+
+from synthetic_corpus import scored_frame
+from benchmarks.run import _git_commit
+from pipeline import _render, _wordcloud, _timed_call_in_process
+from renderer import renderer_pool, _ready
+from visualization_generator import VisualizationGenerator
+
+CHARTS = ["plot_sentiment_analysis", "plot_sentiment_counts", "plot_sentiment_heatmap",
+          "plot_sentiment_distribution_pie", "generate_wordcloud"]
+
+
+def _stages(viz):
+    for method in CHARTS:
+        if method == "generate_wordcloud":
+            yield partial(_wordcloud, viz)
+        else:
+            yield partial(_render, viz, method)
+
+
+def chart_phase(pool, df, output_dir, reuse_figures):
+    """(seconds to the first chart, seconds to all charts) for one run's chart stages on `pool`."""
+    kwargs = {"output_dir": output_dir, "sentiment_df": df, "topic": "latency"}
+    started = time.perf_counter()
+    pending = {pool.submit(_timed_call_in_process, stage, kwargs)
+               for stage in _stages(VisualizationGenerator(reuse_figures=reuse_figures))}
+    first = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            future.result()
+        first = first or time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+def cold_runs(df, output_dir, runs, workers, context):
+    # As the web app did: a new pool per analysis, started and imported on demand
+    results = []
+    for _ in range(runs):
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            results.append(chart_phase(pool, df, output_dir, reuse_figures=False))
+        finally:
+            pool.shutdown()
+    return results
+
+
+def warm_runs(df, output_dir, runs, workers, context):
+    pool = renderer_pool(workers, mp_context=context)
+    try:
+        # App startup: every worker has warmed up before the first request
+        started = time.perf_counter()
+        for future in [pool.submit(_ready) for _ in range(workers)]:
+            future.result()
+        warm_up = time.perf_counter() - started
+        return warm_up, [chart_phase(pool, df, output_dir, reuse_figures=True) for _ in range(runs)]
+    finally:
+        pool.shutdown()
+
+
+def steady_state(df, output_dir, repeat):
+    rows = {}
+    for reuse in (False, True):
+        viz = VisualizationGenerator(reuse_figures=reuse)
+        for method in CHARTS:
+            times = []
+            for _ in range(repeat + 1):
+                started = time.perf_counter()
+                if method == "generate_wordcloud":
+                    viz.generate_wordcloud(df["text"], "steady", output_path=output_dir)
+                else:
+                    getattr(viz, method)(df.copy(), "steady", output_path=output_dir)
+                times.append(time.perf_counter() - started)
+            # The first draw of each kind builds the template; steady state excludes it
+            rows.setdefault(method, {})["templates" if reuse else "fresh"] = statistics.median(times[1:])
+    return rows
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure first-chart and steady-state chart latency.")
+    parser.add_argument("--size", type=int, default=2000, help="Scored items per chart.")
+    parser.add_argument("--runs", type=int, default=5, help="Chart phases per pool variant.")
+    parser.add_argument("--repeat", type=int, default=10, help="Draws per chart kind for the steady state.")
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 4, 5), help="Pool processes.")
+    parser.add_argument("--start-method", choices=multiprocessing.get_all_start_methods(),
+                        default=multiprocessing.get_start_method(), help="How pool processes are started.")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    df = scored_frame(args.size)
+    output_dir = tempfile.mkdtemp(prefix="sentinent-render-")
+
+    context = multiprocessing.get_context(args.start_method)
+    cold = cold_runs(df, output_dir, args.runs, args.workers, context)
+    warm_up, warm = warm_runs(df, output_dir, args.runs, args.workers, context)
+    report = {
+        "commit": _git_commit(), "size": args.size, "workers": args.workers, "start_method": args.start_method,
+        "warm_up_ms": _ms(warm_up),
+        "chart_phase": {
+            name: {
+                "first_chart_ms": [_ms(first) for first, _ in runs],
+                "all_charts_ms": [_ms(total) for _, total in runs],
+            }
+            for name, runs in (("cold", cold), ("warm", warm))
+        },
+        "steady_state_ms": {method: {k: _ms(v) for k, v in row.items()}
+                            for method, row in steady_state(df, output_dir, args.repeat).items()},
+    }
+
+    print(f"Pool warm-up at startup: {report['warm_up_ms']} ms ({args.workers} processes, {args.start_method})")
+    for name, phase in report["chart_phase"].items():
+        print(f"{name:<5} first chart: run 1 {phase['first_chart_ms'][0]:>7.1f} ms, "
+              f"median {statistics.median(phase['first_chart_ms']):>7.1f} ms | all charts: run 1 "
+              f"{phase['all_charts_ms'][0]:>7.1f} ms, median {statistics.median(phase['all_charts_ms']):>7.1f} ms")
+    print(f"{'steady state (ms)':<34}{'fresh':>9}{'templates':>11}")
+    for method, row in report["steady_state_ms"].items():
+        print(f"{method:<34}{row['fresh']:>9.1f}{row['templates']:>11.1f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
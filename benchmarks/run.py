@@ -0,0 +1,357 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import logging
+from datetime import datetime
+
+import matplotlib
+import pandas as pd
+matplotlib.use("Agg")
+
+from sentiment_analyzer import SentimentAnalyzer
+from visualization_generator import VisualizationGenerator
+from report_generator import ReportGenerator
+from results_store import ResultsStore
+from results_io import write_results, read_results
+from dedup import Deduplicator, score_unique
+from sampling import Sampler, estimate
+from text_cleaning import clean_text, clean_texts
+from chart_data import write_chart_data
+from synthetic_corpus import SyntheticCorpus, scored_frame
+from fake_reddit import FakeReddit, make_collector
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SIZES = [1000, 10000, 100000]
+COMMENTS_PER_SUBMISSION = 9
+# Items scored by the sampling-mode benchmark, whatever the corpus size
+SAMPLE_SIZE = 5000
+
+
+class Extra(dict):
+    """Return this from a benchmark to record extra fields (e.g. file size) next to its timing."""
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def _measure(func, repeat):
+    """Best-of-`repeat` wall time; returns (seconds, last result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_collect_data(size, latency, **_):
+    submissions = max(1, size // (COMMENTS_PER_SUBMISSION + 1))
+    reddit = FakeReddit(num_submissions=submissions, comments_per_submission=COMMENTS_PER_SUBMISSION, latency=latency)
+    collector = make_collector(reddit)
+    return lambda: collector.collect_data("benchmark", post_limit=submissions, comment_limit=COMMENTS_PER_SUBMISSION)
+
+
+def _collect_subreddits(max_concurrency):
+    def bench(size, latency, **_):
+        # Eight communities, each searched with its own requests; a real
+        # round trip is what fan-out hides, so simulate one if none was given
+        latency = latency or 0.02
+        subreddits = [f"community{i}" for i in range(8)]
+        submissions = max(1, size // (COMMENTS_PER_SUBMISSION + 1) // len(subreddits))
+        reddit = FakeReddit(num_submissions=submissions, comments_per_submission=COMMENTS_PER_SUBMISSION, latency=latency)
+        collector = make_collector(reddit, max_concurrency=max_concurrency)
+
+        def run():
+            collector.collect_data("benchmark", subreddit_name=subreddits, post_limit=submissions,
+                                   comment_limit=COMMENTS_PER_SUBMISSION)
+            return Extra(latency=latency, subreddits=len(subreddits))
+        return run
+    return bench
+
+
+def _raw_texts(size):
+    # Text as Reddit returns it: line breaks, indentation, trailing whitespace and the odd non-ASCII character
+    texts = [item["text"] for item in SyntheticCorpus().items(min(size, 100000))]
+    raw = ["  " + text.replace(". ", ".\n\n", 1) + " \t" if i % 10 else text + " — café\r\n"
+           for i, text in enumerate(texts)]
+    return (raw * (size // len(raw) + 1))[:size]
+
+
+def bench_clean_text_loop(size, **_):
+    texts = _raw_texts(size)
+    return lambda: [clean_text(text) for text in texts]
+
+
+def bench_clean_texts(size, **_):
+    texts = _raw_texts(size)
+    return lambda: clean_texts(texts)
+
+
+def bench_analyze(size, **_):
+    items = SyntheticCorpus().items(size)
+    analyzer = SentimentAnalyzer()
+    return lambda: analyzer.analyze(items)
+
+
+def bench_analyze_sampled(size, **_):
+    # Compare with "analyze": the same corpus scored in full
+    items = SyntheticCorpus().items(size)
+    analyzer = SentimentAnalyzer()
+    full = pd.DataFrame(analyzer.analyze(items))
+    truth = full["combined_compound"].mean()
+    truth_positive = (full["combined_compound"] >= 0.05).mean() * 100
+    sampler = Sampler(SAMPLE_SIZE, seed=0)
+
+    def run():
+        sample = sampler.sample(items)
+        result = estimate(pd.DataFrame(analyzer.analyze(sample)), sample)
+        if result is None:
+            return Extra(sample=len(items))
+        mean, positive = result["mean_combined_compound"], result["positive_percentage"]
+        return Extra(sample=len(sample), mean_error=round(mean["estimate"] - truth, 4),
+                     mean_ci_half_width=round((mean["high"] - mean["low"]) / 2, 4),
+                     positive_error=round(positive["estimate"] - truth_positive, 2),
+                     positive_ci_half_width=round((positive["high"] - positive["low"]) / 2, 2))
+    return run
+
+
+def _with_duplicates(size, share=0.2):
+    # Roughly what a busy Reddit search returns: a fifth of the items repeat an earlier text
+    items = SyntheticCorpus().items(size)
+    copies = int(size * share)
+    for i in range(copies):
+        items[size - copies + i] = {**items[size - copies + i], "text": items[i]["text"]}
+    return items
+
+
+def bench_deduplicate(size, **_):
+    texts = [item["text"] for item in _with_duplicates(size)]
+    deduplicator = Deduplicator()
+    return lambda: deduplicator.find(texts)
+
+
+def bench_analyze_dedup(size, **_):
+    items = _with_duplicates(size)
+    analyzer = SentimentAnalyzer()
+    deduplicator = Deduplicator()
+
+    def run():
+        dedup = deduplicator.find([item["text"] for item in items])
+        _, _, saved = score_unique(analyzer, items, dedup)
+        return Extra(dedup_ratio=round(dedup.ratio, 4), scoring_seconds_saved=round(saved, 3))
+    return run
+
+
+def _chart(method):
+    def bench(size, output_dir, **_):
+        df = scored_frame(size)
+        viz = VisualizationGenerator()
+        if method == "generate_wordcloud":
+            return lambda: viz.generate_wordcloud(df["text"], "benchmark", output_path=output_dir)
+        return lambda: getattr(viz, method)(df.copy(), "benchmark", output_path=output_dir)
+    return bench
+
+
+def bench_chart_data(size, output_dir, **_):
+    df = scored_frame(size)
+    path = os.path.join(output_dir, f"charts_{size}.json")
+
+    def run():
+        write_chart_data(df, path)
+        return Extra(bytes=os.path.getsize(path))
+    return run
+
+
+def bench_generate_summary_report(size, output_dir, **_):
+    df = scored_frame(size)
+    reporter = ReportGenerator(output_dir=output_dir)
+    return lambda: reporter.generate_summary_report(df.copy(), "benchmark", None, None, None)
+
+
+def _filled_store(size, output_dir):
+    # Spread the rows over ten runs of five topics, like a store that has been in use for a while
+    store = ResultsStore(os.path.join(output_dir, f"results_{size}.db"))
+    df = scored_frame(min(size, 100000))
+    for run in range(10):
+        rows = size // 10
+        chunk = df.iloc[:rows] if rows <= len(df) else df.sample(rows, replace=True, random_state=run)
+        store.save_run(f"run{run}", f"topic{run % 5}", chunk)
+    return store
+
+
+def bench_results_store_write(size, output_dir, **_):
+    store = ResultsStore(os.path.join(output_dir, f"write_{size}.db"))
+    df = scored_frame(size)
+    return lambda: store.save_run("benchmark", "benchmark", df)
+
+
+def bench_results_store_query(size, output_dir, **_):
+    store = _filled_store(size, output_dir)
+    days = [r["group"] for r in store.aggregate(group_by="day")]
+    start, end = days[len(days) // 4], days[3 * len(days) // 4]
+    return lambda: store.aggregate(topic="topic1", group_by="subreddit", start=start, end=end)
+
+
+def bench_results_store_search(size, output_dir, **_):
+    store = _filled_store(size, output_dir)
+    while store.index_pending():
+        pass
+    # Two common words, so the bm25 ranking has to score many matches
+    return lambda: store.search("broken release", limit=20)
+
+
+def bench_results_write_csv(size, output_dir, **_):
+    df = scored_frame(size)
+    path = os.path.join(output_dir, f"results_{size}.csv")
+
+    def run():
+        df.to_csv(path, index=False)
+        return Extra(bytes=os.path.getsize(path))
+    return run
+
+
+def bench_results_write_parquet(size, output_dir, **_):
+    df = scored_frame(size)
+    path = os.path.join(output_dir, f"results_{size}.parquet")
+
+    def run():
+        write_results(df, path)
+        return Extra(bytes=os.path.getsize(path))
+    return run
+
+
+def bench_results_read_csv(size, output_dir, **_):
+    path = os.path.join(output_dir, f"read_{size}.csv")
+    scored_frame(size).to_csv(path, index=False)
+    # Parsing dates back is part of the cost the CSV forces on readers
+    return lambda: pd.read_csv(path, parse_dates=["created"])
+
+
+def bench_results_read_parquet(size, output_dir, **_):
+    path = write_results(scored_frame(size), os.path.join(output_dir, f"read_{size}.parquet"))
+    return lambda: read_results(path)
+
+
+BENCHMARKS = {
+    "collect_data": bench_collect_data,
+    "collect_subreddits_sequential": _collect_subreddits(max_concurrency=1),
+    "collect_subreddits_fanout": _collect_subreddits(max_concurrency=8),
+    "clean_text_loop": bench_clean_text_loop,
+    "clean_texts": bench_clean_texts,
+    "analyze": bench_analyze,
+    "analyze_sampled": bench_analyze_sampled,
+    "deduplicate": bench_deduplicate,
+    "analyze_dedup": bench_analyze_dedup,
+    "plot_sentiment_analysis": _chart("plot_sentiment_analysis"),
+    "plot_sentiment_heatmap": _chart("plot_sentiment_heatmap"),
+    "plot_sentiment_distribution_pie": _chart("plot_sentiment_distribution_pie"),
+    "plot_sentiment_counts": _chart("plot_sentiment_counts"),
+    "generate_wordcloud": _chart("generate_wordcloud"),
+    "chart_data": bench_chart_data,
+    "generate_summary_report": bench_generate_summary_report,
+    "results_write_csv": bench_results_write_csv,
+    "results_write_parquet": bench_results_write_parquet,
+    "results_read_csv": bench_results_read_csv,
+    "results_read_parquet": bench_results_read_parquet,
+    "results_store_write": bench_results_store_write,
+    "results_store_query": bench_results_store_query,
+    "results_store_search": bench_results_store_search,
+}
+
+
+def run_benchmarks(names, sizes, repeat=1, latency=0.0):
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in names:
+            for size in sizes:
+                func = BENCHMARKS[name](size=size, output_dir=output_dir, latency=latency)
+                seconds, result = _measure(func, repeat)
+                logging.info(f"{name} @ {size}: {seconds:.3f}s ({size / seconds:,.0f} items/s)")
+                entry = {
+                    "benchmark": name,
+                    "size": size,
+                    "seconds": round(seconds, 6),
+                    "items_per_second": round(size / seconds, 2),
+                }
+                if isinstance(result, Extra):
+                    entry.update(result)
+                results.append(entry)
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "latency": latency,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare two result files. Returns a list of (benchmark, size, old, new,
+    ratio, regressed) rows; `regressed` is True when the new run is more than
+    `threshold` slower.
+    """
+    old = {(r["benchmark"], r["size"]): r["seconds"] for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        key = (r["benchmark"], r["size"])
+        if key not in old:
+            continue
+        ratio = r["seconds"] / old[key] if old[key] else float("inf")
+        rows.append((r["benchmark"], r["size"], old[key], r["seconds"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline Sentinent benchmarks.")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run (default: all).")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Item counts to benchmark.")
+    parser.add_argument("--repeat", type=int, default=1, help="Repetitions per case; the fastest is kept.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated Reddit request latency in seconds.")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two result files instead of running.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown ratio reported as a regression.")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        regressed = False
+        print(f"{'benchmark':<34}{'size':>9}{'old s':>11}{'new s':>11}{'ratio':>8}")
+        for name, size, old, new, ratio, slower in compare(baseline, current, args.threshold):
+            regressed |= slower
+            print(f"{name:<34}{size:>9}{old:>11.3f}{new:>11.3f}{ratio:>8.2f}{'  REGRESSION' if slower else ''}")
+        return 1 if regressed else 0
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    report = run_benchmarks(args.only or list(BENCHMARKS), args.sizes, args.repeat, args.latency)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    for r in report["results"]:
+        size_note = f"{r['bytes'] / 1024 / 1024:>10.1f} MiB" if "bytes" in r else ""
+        print(f"{r['benchmark']:<34}{r['size']:>9}{r['seconds']:>11.3f}s{r['items_per_second']:>14,.0f} items/s{size_note}")
+    print(f"Results saved to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import os
+import re
+import json
+from collections import Counter
+import numpy as np
+import pandas as pd
+from wordcloud import STOPWORDS
+from artifacts import atomic_write
+from metrics import timed, arg_len
+from streaming_stats import GroupedMoments, QuantileSketch, RunningCovariance, RunningMoments
+
+# Same cut-offs as the PNG charts and the report
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+CORRELATION_COLUMNS = ['vader_neg', 'vader_neu', 'vader_pos', 'vader_compound', 'textblob_polarity', 'combined_compound']
+BOX_STATS = ["min", "q1", "median", "q3", "max"]
+_WORD = re.compile(r"[a-z][a-z']{2,}")
+# Word frequencies are estimated from an evenly spread sample of this many texts
+TERMS_SAMPLE = 50000
+# A ChartSketch keeps counts for at most this many distinct words
+TERMS_VOCABULARY = 100000
+
+
+def chart_data_path_for(output_dir, topic):
+    return os.path.join(output_dir, f"{topic.replace(' ', '_')}_chart_data.json")
+
+
+def _round(values, digits=4):
+    # NaN (e.g. the spread of a one-item group) has no JSON form
+    return [None if pd.isna(v) else round(float(v), digits) for v in values]
+
+
+def _histogram(df, bins):
+    edges = np.linspace(-1.0, 1.0, bins + 1)
+    series = {
+        str(content_type): np.histogram(group.clip(-1, 1), bins=edges)[0].tolist()
+        for content_type, group in df.groupby("type", observed=True)["combined_compound"]
+    }
+    return {"edges": _round(edges), "series": series}
+
+
+def _categories(scores):
+    positive = int((scores >= POSITIVE_THRESHOLD).sum())
+    negative = int((scores <= NEGATIVE_THRESHOLD).sum())
+    return {"Positive": positive, "Negative": negative, "Neutral": int(len(scores)) - positive - negative}
+
+
+def _subreddits(df, top):
+    # Box-plot statistics for the busiest subreddits, split by content type
+    busiest = df["subreddit"].value_counts().index[:top]
+    grouped = df[df["subreddit"].isin(busiest)].groupby(["subreddit", "type"], observed=True)["combined_compound"]
+    stats = grouped.quantile([0.0, 0.25, 0.5, 0.75, 1.0]).unstack()
+    stats.columns = BOX_STATS
+    stats["mean"] = grouped.mean()
+    stats["count"] = grouped.size()
+    stats = stats.reset_index()
+    stats["rank"] = stats["subreddit"].map({name: i for i, name in enumerate(busiest)})
+    return [
+        {
+            "subreddit": str(row["subreddit"]),
+            "type": str(row["type"]),
+            "count": int(row["count"]),
+            **dict(zip(BOX_STATS + ["mean"], _round([row[k] for k in BOX_STATS + ["mean"]]))),
+        }
+        for row in stats.sort_values(["rank", "type"]).to_dict("records")
+    ]
+
+
+def _trend(df):
+    days = pd.to_datetime(df["created"], errors="coerce").dt.floor("D")
+    grouped = df.assign(date=days).dropna(subset=["date"]).groupby(["date", "type"], observed=True)["combined_compound"]
+    daily = grouped.agg(["mean", "count"]).reset_index()
+    # Format the few hundred distinct days, not every row
+    daily["date"] = daily["date"].dt.strftime("%Y-%m-%d")
+    return {
+        "dates": sorted(daily["date"].unique().tolist()),
+        "series": {
+            str(content_type): {
+                "dates": group["date"].tolist(),
+                "mean": _round(group["mean"]),
+                "count": group["count"].astype(int).tolist(),
+            }
+            for content_type, group in daily.groupby("type", observed=True)
+        },
+    }
+
+
+def _by_type(df):
+    grouped = df.groupby("type", observed=True)["combined_compound"].agg(["mean", "count"])
+    return {
+        "types": [str(t) for t in grouped.index],
+        "mean": _round(grouped["mean"]),
+        "count": grouped["count"].astype(int).tolist(),
+    }
+
+
+def _correlation(df):
+    columns = [c for c in CORRELATION_COLUMNS if c in df]
+    matrix = df[columns].corr().to_numpy()
+    return {"columns": columns, "matrix": [_round(row) for row in matrix]}
+
+
+def _word_counts(texts):
+    counts = Counter(_WORD.findall(" ".join(t for t in texts if isinstance(t, str)).lower()))
+    for word in STOPWORDS:
+        counts.pop(word, None)
+    return counts
+
+
+def _terms(texts, top):
+    # Word frequencies for a client-side word chart, with the word cloud's stopwords
+    step = max(1, len(texts) // TERMS_SAMPLE)
+    return _word_counts(texts.iloc[::step]).most_common(top)
+
+
+@timed("build_chart_data", items=arg_len(0))
+def build_chart_data(df, bins=40, top_subreddits=15, top_terms=60):
+    """
+    Everything the interactive charts need, pre-aggregated: a few KB of
+    numbers however many rows were scored, instead of the rows or PNGs.
+    """
+    scores = df["combined_compound"]
+    return {
+        "items": int(len(df)),
+        "histogram": _histogram(df, bins),
+        "categories": _categories(scores),
+        "subreddits": _subreddits(df, top_subreddits),
+        "trend": _trend(df),
+        "by_type": _by_type(df),
+        "correlation": _correlation(df),
+        "terms": _terms(df["text"], top_terms),
+    }
+
+
+class ChartSketch:
+    """
+    build_chart_data for a stream of frames: fed a chunk at a time with
+    update() and mergeable, it keeps histogram and category counts, daily
+    sums, per-group moments and quantile sketches, the metric covariance
+    and word counts from a sample of the texts, so the chart data of any
+    number of rows takes a few MB. data() returns the same structure as
+    build_chart_data; box-plot quantiles are approximate once a
+    subreddit/type group outgrows `exact_limit` values, and word counts
+    once more than TERMS_SAMPLE texts have been seen.
+    """
+
+    def __init__(self, bins=40, top_subreddits=15, top_terms=60, k=200, seed=None, exact_limit=10000):
+        self.edges = np.linspace(-1.0, 1.0, bins + 1)
+        self.top_subreddits = top_subreddits
+        self.top_terms = top_terms
+        self.k = k
+        self.seed = seed
+        self.exact_limit = exact_limit
+        self.items = 0
+        self.histogram = {}
+        self.categories = Counter()
+        self.subreddit_counts = Counter()
+        self.boxes = {}
+        self.daily = {}
+        self.by_type = GroupedMoments("type")
+        self.covariance = None
+        # Every `terms_step`-th row's words are counted; the step doubles
+        # (and the counts halve) whenever the sample outgrows TERMS_SAMPLE
+        self.terms = Counter()
+        self.terms_step = 1
+        self.terms_sampled = 0
+
+    def update(self, df):
+        if not len(df):
+            return self
+        scores = df["combined_compound"]
+        for content_type, group in df.groupby("type", observed=True)["combined_compound"]:
+            counts = np.histogram(group.clip(-1, 1), bins=self.edges)[0]
+            key = str(content_type)
+            self.histogram[key] = self.histogram.get(key, 0) + counts
+        self.categories.update(_categories(scores))
+        self.subreddit_counts.update(df["subreddit"].astype(str).value_counts(sort=False).to_dict())
+        for (subreddit, content_type), group in df.groupby(["subreddit", "type"], observed=True)["combined_compound"]:
+            key = (str(subreddit), str(content_type))
+            if key not in self.boxes:
+                self.boxes[key] = (RunningMoments(), QuantileSketch(self.k, seed=self.seed, exact_limit=self.exact_limit))
+            for sketch in self.boxes[key]:
+                sketch.update(group.to_numpy(dtype=float))
+        days = pd.to_datetime(df["created"], errors="coerce").dt.floor("D")
+        grouped = df.assign(date=days).dropna(subset=["date"]).groupby(["date", "type"], observed=True)["combined_compound"]
+        for (date, content_type), row in grouped.agg(["sum", "count"]).iterrows():
+            key = (date.strftime("%Y-%m-%d"), str(content_type))
+            total, count = self.daily.get(key, (0.0, 0))
+            self.daily[key] = (total + row["sum"], count + int(row["count"]))
+        self.by_type.update(df["type"].astype(str).to_numpy(), scores.to_numpy(dtype=float))
+        if self.covariance is None:
+            self.covariance = RunningCovariance([c for c in CORRELATION_COLUMNS if c in df])
+        self.covariance.update(df[self.covariance.columns].to_numpy(dtype=float))
+        self._sample_terms(df["text"])
+        self.items += len(df)
+        return self
+
+    def _sample_terms(self, texts):
+        offset = -self.items % self.terms_step
+        sample = texts.iloc[offset::self.terms_step]
+        self.terms.update(_word_counts(sample))
+        self.terms_sampled += len(sample)
+        while self.terms_sampled > 2 * TERMS_SAMPLE:
+            self._thin_terms(2)
+        if len(self.terms) > TERMS_VOCABULARY:
+            self.terms = Counter(dict(self.terms.most_common(TERMS_VOCABULARY // 2)))
+
+    def _thin_terms(self, factor):
+        self.terms_step *= factor
+        self.terms_sampled //= factor
+        self.terms = Counter({word: count / factor for word, count in self.terms.items()})
+
+    def merge(self, other):
+        for key, counts in other.histogram.items():
+            self.histogram[key] = self.histogram.get(key, 0) + counts
+        self.categories.update(other.categories)
+        self.subreddit_counts.update(other.subreddit_counts)
+        for key, (moments, quantiles) in other.boxes.items():
+            if key in self.boxes:
+                self.boxes[key][0].merge(moments)
+                self.boxes[key][1].merge(quantiles)
+            else:
+                self.boxes[key] = (RunningMoments().merge(moments),
+                                   QuantileSketch(self.k, seed=self.seed, exact_limit=self.exact_limit).merge(quantiles))
+        for key, (total, count) in other.daily.items():
+            mine = self.daily.get(key, (0.0, 0))
+            self.daily[key] = (mine[0] + total, mine[1] + count)
+        self.by_type.merge(other.by_type)
+        if self.covariance is None:
+            self.covariance = other.covariance
+        elif other.covariance is not None:
+            self.covariance.merge(other.covariance)
+        # Bring both word samples to the sparser rate before adding them up
+        if other.terms_step > self.terms_step:
+            self._thin_terms(other.terms_step // self.terms_step)
+        factor = self.terms_step // other.terms_step
+        self.terms.update({word: count / factor for word, count in other.terms.items()})
+        self.terms_sampled += other.terms_sampled // factor
+        self.items += other.items
+        return self
+
+    def _subreddits(self):
+        busiest = [name for name, _ in sorted(self.subreddit_counts.items(), key=lambda kv: -kv[1])][:self.top_subreddits]
+        rows = []
+        for subreddit in busiest:
+            for content_type in sorted(t for s, t in self.boxes if s == subreddit):
+                moments, quantiles = self.boxes[(subreddit, content_type)]
+                # The exact extremes, whatever the sketch has compacted away
+                box = [moments.min, *quantiles.quantiles([0.25, 0.5, 0.75]), moments.max, moments.mean]
+                rows.append({"subreddit": subreddit, "type": content_type, "count": int(moments.count),
+                             **dict(zip(BOX_STATS + ["mean"], _round(box)))})
+        return rows
+
+    def _trend(self):
+        series = {}
+        for (date, content_type) in sorted(self.daily, key=lambda key: (key[1], key[0])):
+            total, count = self.daily[(date, content_type)]
+            entry = series.setdefault(content_type, {"dates": [], "mean": [], "count": []})
+            entry["dates"].append(date)
+            entry["mean"].append(round(float(total / count), 4))
+            entry["count"].append(count)
+        return {"dates": sorted({date for date, _ in self.daily}), "series": series}
+
+    def data(self):
+        by_type = self.by_type.table()
+        correlation = self.covariance.correlation() if self.covariance is not None else pd.DataFrame()
+        return {
+            "items": int(self.items),
+            "histogram": {"edges": _round(self.edges),
+                          "series": {key: self.histogram[key].tolist() for key in sorted(self.histogram)}},
+            "categories": {name: int(self.categories[name]) for name in ("Positive", "Negative", "Neutral")},
+            "subreddits": self._subreddits(),
+            "trend": self._trend(),
+            "by_type": {
+                "types": [str(t) for t in by_type.index],
+                "mean": _round(by_type["mean"]),
+                "count": by_type["count"].astype(int).tolist(),
+            },
+            "correlation": {"columns": list(correlation.columns),
+                            "matrix": [_round(row) for row in correlation.to_numpy()]},
+            "terms": [(word, int(round(count))) for word, count in self.terms.most_common(self.top_terms)],
+        }
+
+
+def write_chart_data(df, path, sketch=None):
+    """Write the chart data of `df`, or of a ChartSketch (with `df=None`) for data never held in memory."""
+    data = sketch.data() if sketch is not None else build_chart_data(df)
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    return path
@@ -0,0 +1,190 @@
+"""
+Out-of-core analysis: score a corpus larger than memory a chunk at a time.
+
+    python chunked.py --results runs/<run>/Topic_sentiment_results.parquet --topic "Topic" --output-dir out
+    python chunked.py --items items.jsonl --topic "Topic" --output-dir out --workers 4
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import itertools
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from artifacts import write_manifest
+from chart_data import ChartSketch, chart_data_path_for, write_chart_data
+from metrics import registry
+from pipeline import NoDataError, _timed_call_in_process
+from results_io import ResultsWriter, iter_results, results_path_for
+from streaming_stats import SentimentSketch
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_CHUNK_SIZE = 100000
+
+chunk_items = registry.counter(
+    "sentinent_chunked_items_total", "Items scored or summarised by chunked (out-of-core) analyses."
+)
+chunks_done = registry.counter(
+    "sentinent_chunked_chunks_total", "Chunks scored or summarised by chunked (out-of-core) analyses."
+)
+
+
+def chunks(items, size):
+    """Lists of up to `size` items from any iterable, drawn from it only as each list is needed."""
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _score_chunk(sentiment_analyzer, items):
+    # A frame pickles back from a worker process far faster than a list of row dicts
+    return pd.DataFrame(sentiment_analyzer.analyze(items))
+
+
+class ChunkedAnalysis:
+    """
+    The analysis for corpora that do not fit in one DataFrame. Items are
+    read `chunk_size` at a time, each chunk is scored, appended to the
+    run's results file (a Parquet row group per chunk) and folded into a
+    SentimentSketch and a ChartSketch; the report and chart data are
+    written from the sketches. Memory is bounded by a few chunks whatever
+    the corpus size. With a `process_pool`, up to `max_in_flight` chunks
+    are scored at once and written in input order.
+    """
+
+    def __init__(self, sentiment_analyzer, report_generator, chunk_size=DEFAULT_CHUNK_SIZE, process_pool=None,
+                 max_in_flight=None, seed=None):
+        self.sentiment_analyzer = sentiment_analyzer
+        self.report_generator = report_generator
+        self.chunk_size = chunk_size
+        self.process_pool = process_pool
+        self.max_in_flight = max_in_flight or 2 * (getattr(process_pool, "_max_workers", 1) or 1)
+        self.seed = seed
+
+    @staticmethod
+    def _collect(future):
+        df, _, snapshot = future.result()
+        registry.merge(snapshot)
+        return df
+
+    def _scored(self, items):
+        """Scored frames in input order."""
+        if self.process_pool is None:
+            for chunk in chunks(items, self.chunk_size):
+                yield _score_chunk(self.sentiment_analyzer, chunk)
+            return
+        pending = deque()
+        try:
+            for chunk in chunks(items, self.chunk_size):
+                pending.append(self.process_pool.submit(
+                    _timed_call_in_process, partial(_score_chunk, self.sentiment_analyzer, chunk), {}
+                ))
+                # Don't read further ahead than the pool can use
+                if len(pending) >= self.max_in_flight:
+                    yield self._collect(pending.popleft())
+            while pending:
+                yield self._collect(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _sketches(self):
+        return SentimentSketch(seed=self.seed), ChartSketch(seed=self.seed)
+
+    @staticmethod
+    def _update(sketches, df, index):
+        for sketch in sketches:
+            sketch.update(df)
+        chunk_items.inc(len(df))
+        chunks_done.inc()
+        logging.info(f"Chunk {index + 1}: {len(df)} items ({sketches[0].count} so far)")
+
+    def run(self, items, topic, output_dir):
+        """
+        Score `items` (an iterable in the collect_data schema, e.g. a
+        generator reading a dump) into `output_dir`. Returns the paths
+        of the results file, chart data, report and manifest.
+        """
+        sketches = self._sketches()
+        results_path = results_path_for(output_dir, topic)
+        with ResultsWriter(results_path) as writer:
+            for index, df in enumerate(self._scored(items)):
+                if df.empty:
+                    continue
+                writer.write(df)
+                self._update(sketches, df, index)
+        return self._finish(sketches, topic, output_dir, results_path)
+
+    def summarize(self, results_path, topic, output_dir):
+        """Report and chart data for a stored results file, read a chunk at a time."""
+        sketches = self._sketches()
+        for index, df in enumerate(iter_results(results_path, self.chunk_size)):
+            self._update(sketches, df, index)
+        return self._finish(sketches, topic, output_dir, results_path)
+
+    def _finish(self, sketches, topic, output_dir, results_path):
+        sentiment_sketch, chart_sketch = sketches
+        if not sentiment_sketch.count:
+            raise NoDataError(f"No scored items for topic '{topic}'")
+        chart_data = write_chart_data(None, chart_data_path_for(output_dir, topic), sketch=chart_sketch)
+        report = self.report_generator.generate_summary_report(
+            None, topic, None, None, None, output_dir=output_dir, sketch=sentiment_sketch
+        )
+        artifacts = {"results_path": results_path, "chart_data": chart_data, "report": report}
+        manifest = write_manifest(output_dir, topic, artifacts, items=sentiment_sketch.count)
+        return {**artifacts, "manifest": manifest, "items": sentiment_sketch.count}
+
+
+def read_items(path):
+    """Items in the collect_data schema from a JSON-lines file, one at a time."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a corpus larger than memory, a chunk at a time.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--items", metavar="JSONL", help="Score the items in this JSON-lines file.")
+    source.add_argument("--results", metavar="PARQUET", help="Report on an already scored results file.")
+    parser.add_argument("--topic", required=True, help="Topic the report and file names are for.")
+    parser.add_argument("--output-dir", default="output", help="Where the results, report and chart data go.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Items per chunk.")
+    parser.add_argument("--workers", type=int, default=0, help="Processes scoring chunks (0 = score inline).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from sentiment_analyzer import SentimentAnalyzer
+    from report_generator import ReportGenerator
+
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers else None
+    analysis = ChunkedAnalysis(SentimentAnalyzer(), ReportGenerator(output_dir=args.output_dir),
+                               chunk_size=args.chunk_size, process_pool=pool)
+    try:
+        if args.results:
+            result = analysis.summarize(args.results, args.topic, args.output_dir)
+        else:
+            result = analysis.run(read_items(args.items), args.topic, args.output_dir)
+    except NoDataError as e:
+        logging.warning(str(e))
+        return 1
+    finally:
+        if pool:
+            pool.shutdown()
+    logging.info(f"Analyzed {result['items']} items. Report available at {result['report']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
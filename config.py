@@ -17,12 +17,101 @@ class Config:
         self.SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
         # Pixabay API key
         self.PIXABAY_API_KEY = os.getenv("PIXABAY_API_KEY")
+        self.PIXABAY_API_URL = os.getenv("PIXABAY_API_URL", "https://pixabay.com/api/")
         # Other settings
-        self.DEFAULT_SUBREDDIT = "all"
+        # Comma-separated subreddits are searched concurrently and merged
+        self.DEFAULT_SUBREDDIT = os.getenv("REDDIT_SUBREDDITS", "all")
+        self.COLLECT_MAX_CONCURRENCY = int(os.getenv("COLLECT_MAX_CONCURRENCY", 4))
+        # Client-side pacing for all requests made with this client ID
+        # (Reddit allows 100 per minute, averaged over ten minutes)
+        self.REDDIT_REQUESTS_PER_MINUTE = float(os.getenv("REDDIT_REQUESTS_PER_MINUTE", 100))
+        self.REDDIT_REQUEST_BURST = int(os.getenv("REDDIT_REQUEST_BURST", 60))
         self.DEFAULT_POST_LIMIT = 10
         self.DEFAULT_COMMENT_LIMIT = 10
-        self.OUTPUT_DIR = os.path.abspath(os.path.join(os.getcwd(), "..", "output"))
+        # Shared storage when web hosts and workers run on separate machines
+        self.OUTPUT_DIR = os.path.abspath(os.getenv("OUTPUT_DIR", os.path.join(os.getcwd(), "..", "output")))
         os.makedirs(self.OUTPUT_DIR, exist_ok=True)
+        # Every run writes into its own directory under RUNS_DIR; the janitor
+        # deletes runs older than the age limit and evicts the oldest ones
+        # while the directory is over the size quota
+        self.RUNS_DIR = os.path.join(self.OUTPUT_DIR, "runs")
+        os.makedirs(self.RUNS_DIR, exist_ok=True)
+        # gzip/Brotli copies of static assets and vendored scripts (run
+        # artifacts keep theirs next to the file, inside the run directory)
+        self.ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", os.path.join(self.OUTPUT_DIR, "asset-cache"))
+        self.ARTIFACT_MAX_AGE_HOURS = float(os.getenv("ARTIFACT_MAX_AGE_HOURS", 24 * 7))
+        self.ARTIFACT_MAX_TOTAL_MB = float(os.getenv("ARTIFACT_MAX_TOTAL_MB", 2048))
+        self.JANITOR_INTERVAL_SECONDS = int(os.getenv("JANITOR_INTERVAL_SECONDS", 600))
+        # Every run's scored items, queryable across runs (kept outside RUNS_DIR
+        # so the janitor never evicts history)
+        self.RESULTS_DB = os.getenv("RESULTS_DB", os.path.join(self.OUTPUT_DIR, "results.db"))
+        # Stored items become searchable when the background indexer catches
+        # up: right after each web run, and at least this often otherwise
+        self.SEARCH_INDEX_INTERVAL_SECONDS = int(os.getenv("SEARCH_INDEX_INTERVAL_SECONDS", 30))
+        # Users allowed to request admin-only features such as profiled runs
+        self.ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+        # Pipeline execution
+        self.PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", os.cpu_count() or 4))
+        self.PIPELINE_USE_PROCESSES = os.getenv("PIPELINE_USE_PROCESSES", "1") == "1"
+        self.BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", 4))
+        # How long a finished /analyze result is reused for identical requests
+        self.ANALYSIS_FRESHNESS_SECONDS = int(os.getenv("ANALYSIS_FRESHNESS_SECONDS", 300))
+        # Live progress of running analyses (/api/progress): at most
+        # PROGRESS_MAX_STREAMS watchers hold a connection open, each for up
+        # to PROGRESS_STREAM_SECONDS; the rest poll every PROGRESS_RETRY_MS
+        self.PROGRESS_MAX_STREAMS = int(os.getenv("PROGRESS_MAX_STREAMS", 32))
+        self.PROGRESS_STREAM_SECONDS = float(os.getenv("PROGRESS_STREAM_SECONDS", 25))
+        self.PROGRESS_RETRY_MS = int(os.getenv("PROGRESS_RETRY_MS", 2000))
+        # The results page draws interactive charts from per-run aggregate
+        # JSON; the 300-DPI PNGs are only rendered for the markdown report
+        # (and the page's static fallback) when this is on
+        self.RENDER_CHART_PNGS = os.getenv("RENDER_CHART_PNGS", "1") == "1"
+        # Time budget for a whole analysis (0 = unlimited, the default). Collection
+        # may use COLLECTION_BUDGET_SHARE of it and then returns what it has so far;
+        # optional stages (the topic image) are dropped when it runs out. While a
+        # budget is set, each Reddit request runs on its own thread, and one that
+        # is abandoned at the deadline keeps running until Reddit answers
+        self.ANALYSIS_TIME_BUDGET_SECONDS = float(os.getenv("ANALYSIS_TIME_BUDGET_SECONDS", 0))
+        self.COLLECTION_BUDGET_SHARE = float(os.getenv("COLLECTION_BUDGET_SHARE", 0.6))
+        # Near-duplicate detection before scoring (off by default); dropping
+        # duplicates also removes them from the report, charts and stored results
+        self.DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "0") == "1"
+        self.DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.7))
+        self.DEDUP_DROP_DUPLICATES = os.getenv("DEDUP_DROP_DUPLICATES", "0") == "1"
+        # Sampling mode: score at most SAMPLE_SIZE of the collected items
+        # (0 = score everything), drawn in proportion from each combination
+        # of the comma-separated SAMPLE_STRATA fields (empty = one simple
+        # random sample); the report gives SAMPLE_CONFIDENCE intervals
+        self.SAMPLE_SIZE = int(os.getenv("SAMPLE_SIZE", 0))
+        self.SAMPLE_STRATA = [f.strip() for f in os.getenv("SAMPLE_STRATA", "subreddit,type").split(",") if f.strip()]
+        self.SAMPLE_CONFIDENCE = float(os.getenv("SAMPLE_CONFIDENCE", 0.95))
+        # /analyze admission control: pipelines running at once, how many more
+        # may wait (and for how long), and each user's request budget
+        self.ANALYZE_MAX_CONCURRENT = int(os.getenv("ANALYZE_MAX_CONCURRENT", 2))
+        self.ANALYZE_MAX_QUEUE = int(os.getenv("ANALYZE_MAX_QUEUE", 8))
+        self.ANALYZE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ANALYZE_QUEUE_TIMEOUT_SECONDS", 30))
+        self.ANALYZE_USER_RATE_PER_MINUTE = float(os.getenv("ANALYZE_USER_RATE_PER_MINUTE", 6))
+        self.ANALYZE_USER_BURST = int(os.getenv("ANALYZE_USER_BURST", 3))
+        # ASGI service (asgi_app.py): bearer token for its API (unset = open),
+        # threads for blocking PRAW calls, and how many analyses may be
+        # collecting or waiting for a free pipeline slot at once
+        self.API_TOKEN = os.getenv("API_TOKEN")
+        # Without API_TOKEN, notify_email may only name one of these
+        # comma-separated addresses (with it, any address)
+        self.NOTIFY_EMAIL_ALLOWLIST = {a.strip().lower() for a in os.getenv("NOTIFY_EMAIL_ALLOWLIST", "").split(",")
+                                       if a.strip()}
+        self.ASGI_PRAW_THREADS = int(os.getenv("ASGI_PRAW_THREADS", 16))
+        self.ASGI_MAX_IN_FLIGHT = int(os.getenv("ASGI_MAX_IN_FLIGHT", 64))
+        # Worker mode: with JOB_QUEUE_DB set, /analyze queues its runs in this
+        # shared SQLite file for worker.py processes (on any host that shares
+        # it and OUTPUT_DIR) and waits up to JOB_WAIT_SECONDS for the result.
+        # A worker's lease lasts JOB_LEASE_SECONDS and is renewed while it
+        # runs; a job whose worker died is retried up to JOB_MAX_ATTEMPTS times
+        self.JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB")
+        self.JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 60))
+        self.JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+        self.JOB_WAIT_SECONDS = float(os.getenv("JOB_WAIT_SECONDS", 900))
+        self.WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", 1.0))
         # Validate configurations
         self.validate_reddit_credentials()
         self.validate_smtp_credentials()
@@ -8,11 +8,71 @@ import logging
 import praw
 from datetime import datetime
 import uuid
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from prawcore.exceptions import TooManyRequests
+from metrics import registry, timed, result_len
+from deadline import Deadline, DeadlineExceeded, call_with_deadline
+from rate_limit import TokenBucket, RequestScheduler
+from text_cleaning import clean_texts
+from progress import Progress
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+partial_collections = registry.counter(
+    "sentinent_partial_collections_total", "Collections that returned partial results, by reason."
+)
+
+# Reddit listings return up to 100 items per request
+LISTING_PAGE_SIZE = 100
+
+
+def reddit_retry_after(error):
+    """Seconds a 429 asked us to wait (0 if it did not say), or None for any other error."""
+    if not isinstance(error, TooManyRequests):
+        return None
+    try:
+        return float(error.retry_after or 0)
+    except ValueError:
+        return 0.0
+
+
+def reddit_scheduler(requests_per_minute=100, burst=60):
+    """A scheduler for one Reddit client ID; share it between every collector using that ID."""
+    return RequestScheduler(TokenBucket(requests_per_minute / 60.0, burst), reddit_retry_after, name="reddit")
+
+
+def subreddit_names(subreddit_name):
+    """A list of subreddits from a name, a comma-separated string or a list."""
+    if isinstance(subreddit_name, str):
+        subreddit_name = subreddit_name.split(",")
+    return [name.strip() for name in subreddit_name if name.strip()] or ["all"]
+
+
+class CollectedData(list):
+    """
+    The collected items, plus whether collection stopped early (`partial`)
+    and why (`reason`). `text_cleaned` is set once every text has been
+    through clean_texts, so later stages need not clean it again. Behaves
+    as a plain list everywhere else.
+    """
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.text_cleaned = False
+        self.partial = False
+        self.reason = None
+        self.seconds = None
+
+    def mark_partial(self, kind, reason):
+        """`kind` is 'deadline' or 'error'; `reason` is shown in the report."""
+        self.partial = True
+        self.reason = reason
+        partial_collections.inc(reason=kind)
+
+
 class RedditDataCollector:
-    def __init__(self, client_id, client_secret, user_agent, username, password):
+    def __init__(self, client_id, client_secret, user_agent, username, password, scheduler=None, max_concurrency=4):
         self.reddit = praw.Reddit(
             client_id=client_id,
             client_secret=client_secret,
@@ -20,45 +80,100 @@ class RedditDataCollector:
             username=username,
             password=password
         )
+        # Every Reddit request goes through the scheduler, which keeps the
+        # client under Reddit's rate limit and backs off on 429s
+        self.scheduler = scheduler or reddit_scheduler()
+        self.max_concurrency = max_concurrency
+
+    def _fetch_comments(self, submission, comment_limit):
+        submission.comments.replace_more(limit=0)
+        return submission.comments.list()[:comment_limit]
+
+    @timed("collect_data", items=result_len)
+    def collect_data(self, topic, subreddit_name="all", post_limit=10, comment_limit=10, time_budget=None, deadline=None,
+                     progress=None):
+        """
+        Collect posts and their top comments for `topic`. `subreddit_name`
+        may list several subreddits (a list or "a,b,c"); they are searched
+        concurrently, `post_limit` posts each, and merged in the order given.
+        With a `time_budget` (seconds) or a `deadline`, fetching stops when
+        time runs out and everything gathered so far is returned with
+        `partial=True`; a failure part-way through is handled the same way.
+        The running item count is reported to `progress` as `collected`.
+        """
+        deadline = deadline or Deadline(time_budget)
+        progress = progress or Progress()
+        names = subreddit_names(subreddit_name)
+        if len(names) == 1:
+            posts_data = self._collect_subreddit(topic, names[0], post_limit, comment_limit, deadline, progress)
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(names), self.max_concurrency),
+                                    thread_name_prefix="collect") as pool:
+                parts = list(pool.map(
+                    lambda name: self._collect_subreddit(topic, name, post_limit, comment_limit, deadline, progress),
+                    names
+                ))
+            posts_data = CollectedData()
+            reasons = []
+            for name, part in zip(names, parts):
+                posts_data.extend(part)
+                if part.partial:
+                    reasons.append(f"r/{name}: {part.reason}")
+            if reasons:
+                posts_data.partial = True
+                posts_data.reason = "; ".join(reasons)
+        # Clean every text in one batch rather than item by item during the fetch
+        for item, text in zip(posts_data, clean_texts([item['text'] for item in posts_data])):
+            item['text'] = text
+        posts_data.text_cleaned = True
+        posts_data.seconds = deadline.elapsed()
+        return posts_data
 
-    def _clean_text(self, text):
-        # Remove newlines, extra spaces, and handle encoding errors
-        if not isinstance(text, str):
-            return ""
-        text = text.encode('utf-8', errors='ignore').decode('utf-8')
-        text = text.replace("\n", " ").strip()
-        text = " ".join(text.split())
-        return text
-
-    def collect_data(self, topic, subreddit_name="all", post_limit=10, comment_limit=10):
-        posts_data = []
+    def _collect_subreddit(self, topic, subreddit_name, post_limit, comment_limit, deadline, progress):
+        posts_data = CollectedData()
         try:
             subreddit = self.reddit.subreddit(subreddit_name)
-            for submission in subreddit.search(topic, limit=post_limit):
+            submissions = iter(subreddit.search(topic, limit=post_limit))
+            for index in itertools.count():
+                # Each page of search results and each comment tree is a
+                # separate request that may stall; only those take a
+                # rate-limit token
+                if index % LISTING_PAGE_SIZE == 0:
+                    submission = self.scheduler.call(deadline, next, submissions, None)
+                else:
+                    submission = call_with_deadline(deadline, next, submissions, None)
+                if submission is None:
+                    break
                 post_id = str(uuid.uuid4())
                 post_text = submission.title + " " + (submission.selftext if submission.selftext else "")
                 posts_data.append({
                     'id': post_id,
                     'type': 'post',
-                    'text': self._clean_text(post_text),
+                    'text': post_text,
                     'created': datetime.fromtimestamp(submission.created_utc),
                     'subreddit': submission.subreddit.display_name,
                     'url': submission.url
                 })
+                progress.add(collected=1)
 
-                submission.comments.replace_more(limit=0)
-                for comment in submission.comments.list()[:comment_limit]:
+                comments = self.scheduler.call(deadline, self._fetch_comments, submission, comment_limit)
+                for comment in comments:
                     posts_data.append({
                         'id': str(uuid.uuid4()),
                         'type': 'comment',
-                        'text': self._clean_text(comment.body),
+                        'text': comment.body,
                         'created': datetime.fromtimestamp(comment.created_utc),
                         'subreddit': comment.subreddit.display_name,
                         'url': submission.url
                     })
+                progress.add(collected=len(comments))
+        except DeadlineExceeded:
+            logging.warning(f"Time budget of {deadline.seconds:.1f}s reached while collecting '{topic}' "
+                            f"from r/{subreddit_name}; keeping {len(posts_data)} items collected so far")
+            posts_data.mark_partial("deadline", "time budget reached")
         except Exception as e:
-            logging.error(f"Error collecting data for topic '{topic}': {e}")
-            return []
+            logging.error(f"Error collecting data for topic '{topic}' from r/{subreddit_name}: {e}")
+            posts_data.mark_partial("error", f"collection failed part-way: {e}" if posts_data else f"collection failed: {e}")
         return posts_data
 
 if __name__ == "__main__":
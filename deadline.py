@@ -0,0 +1,72 @@
+import time
+import threading
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work could not finish before its deadline."""
+
+
+class Deadline:
+    """
+    A point in time work must finish by, `seconds` from creation. A
+    deadline without seconds never expires, so code can take a Deadline
+    unconditionally and pay nothing when no budget is set.
+    """
+
+    def __init__(self, seconds=None, clock=time.monotonic):
+        self._clock = clock
+        self.started = clock()
+        self.seconds = seconds if seconds else None
+        self.ends = self.started + self.seconds if self.seconds else None
+
+    @property
+    def bounded(self):
+        return self.ends is not None
+
+    def elapsed(self):
+        return self._clock() - self.started
+
+    def remaining(self):
+        if self.ends is None:
+            return float("inf")
+        return max(0.0, self.ends - self._clock())
+
+    def expired(self, margin=0.0):
+        return self.remaining() <= margin
+
+    def share(self, fraction):
+        """A deadline covering `fraction` of the time left on this one."""
+        if self.ends is None:
+            return Deadline(None, self._clock)
+        return Deadline(max(self.remaining() * fraction, 1e-6), self._clock)
+
+
+def call_with_deadline(deadline, func, *args, **kwargs):
+    """
+    Run `func` and return its result, or raise DeadlineExceeded once the
+    deadline passes. Blocking client calls (PRAW requests) cannot be
+    interrupted, so a late call is left to finish on a daemon thread and
+    its result discarded.
+    """
+    if not deadline.bounded:
+        return func(*args, **kwargs)
+    if deadline.expired():
+        raise DeadlineExceeded("deadline already passed")
+
+    outcome = {}
+    finished = threading.Event()
+
+    def target():
+        try:
+            outcome["result"] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            finished.set()
+
+    threading.Thread(target=target, name="deadline-call", daemon=True).start()
+    if not finished.wait(deadline.remaining()):
+        raise DeadlineExceeded(f"no response within the remaining {deadline.seconds:.1f}s budget")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
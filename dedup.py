@@ -0,0 +1,217 @@
+import re
+import time
+import zlib
+import hashlib
+import numpy as np
+from metrics import registry, timed
+
+duplicates_found = registry.counter(
+    "sentinent_dedup_duplicates_total", "Collected items that repeated an earlier text, by kind (exact or near)."
+)
+scoring_seconds_saved = registry.counter(
+    "sentinent_dedup_scoring_seconds_saved_total", "Estimated scoring time avoided by scoring repeated texts once."
+)
+
+# Largest 31-bit prime; with 32-bit shingle hashes a*x+b stays inside uint64
+MERSENNE_PRIME = (1 << 31) - 1
+_URL = re.compile(r"https?://\S+")
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text):
+    """Lowercased text without URLs, punctuation or repeated whitespace."""
+    if not isinstance(text, str):
+        return ""
+    text = _URL.sub(" ", text.lower())
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def exact_key(text):
+    """Text with only its whitespace collapsed: case, punctuation and emoticons all change the score."""
+    if not isinstance(text, str):
+        return ""
+    return " ".join(text.split())
+
+
+class DedupResult:
+    """
+    `representative[i]` is the index of the first item whose text item `i`
+    duplicates, exactly or nearly (itself if it is unique).
+    `scored_as[i]` is the index of the item whose score item `i` takes:
+    the first occurrence of the same exact text, never a near duplicate.
+    """
+
+    def __init__(self, representative, exact, near, seconds, scored_as=None):
+        self.representative = representative
+        self.exact = exact
+        self.near = near
+        self.seconds = seconds
+        self.scored_as = scored_as if scored_as is not None else list(representative)
+
+    @property
+    def unique_indices(self):
+        return [i for i, rep in enumerate(self.representative) if rep == i]
+
+    @property
+    def scored_indices(self):
+        return [i for i, rep in enumerate(self.scored_as) if rep == i]
+
+    @property
+    def duplicates(self):
+        return self.exact + self.near
+
+    @property
+    def ratio(self):
+        """Share of items that were duplicates."""
+        return self.duplicates / len(self.representative) if self.representative else 0.0
+
+
+class Deduplicator:
+    """
+    Finds exact duplicates (same text up to whitespace) by hashing, then near
+    duplicates among the remaining texts with MinHash signatures over word
+    shingles and LSH banding: texts sharing any band become candidates,
+    and candidates whose estimated Jaccard similarity reaches `threshold`
+    are merged. Texts shorter than `min_tokens` words are only matched
+    exactly, since a couple of shared words says little. Empty texts
+    are never grouped.
+    """
+
+    def __init__(self, threshold=0.7, num_perm=64, bands=16, shingle_size=3, min_tokens=5, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_tokens = min_tokens
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None]
+
+    def _shingle_hashes(self, tokens):
+        size = self.shingle_size
+        shingles = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)} or {" ".join(tokens)}
+        return [zlib.crc32(s.encode("utf-8")) for s in shingles]
+
+    def signatures(self, token_lists):
+        """MinHash signatures (len(token_lists) x num_perm), computed in one vectorized pass."""
+        hashes, starts = [], []
+        for tokens in token_lists:
+            starts.append(len(hashes))
+            hashes.extend(self._shingle_hashes(tokens))
+        if not hashes:
+            return np.empty((0, self.num_perm), dtype=np.uint64)
+        permuted = (self._a * np.array(hashes, dtype=np.uint64) + self._b) % MERSENNE_PRIME
+        # Minimum over each text's run of shingle columns
+        return np.minimum.reduceat(permuted, starts, axis=1).T
+
+    def signature(self, tokens):
+        return self.signatures([tokens])[0]
+
+    @timed("deduplicate", items=lambda args, result: len(args[1]))
+    def find(self, texts):
+        started = time.perf_counter()
+        representative = list(range(len(texts)))
+        first_by_hash = {}
+        candidates = []
+        exact = 0
+        for i, text in enumerate(texts):
+            key = exact_key(text)
+            if not key:
+                continue
+            digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+            first = first_by_hash.setdefault(digest, i)
+            if first != i:
+                representative[i] = first
+                exact += 1
+            else:
+                tokens = normalize(text).split()
+                if len(tokens) >= self.min_tokens:
+                    candidates.append((i, tokens))
+
+        scored_as = list(representative)
+        near = self._merge_near_duplicates(candidates, representative)
+        return DedupResult(representative, exact, near, time.perf_counter() - started, scored_as)
+
+    def _merge_near_duplicates(self, candidates, representative):
+        if not candidates:
+            return 0
+        items = [i for i, _ in candidates]
+        matrix = self.signatures([tokens for _, tokens in candidates])
+        parent = list(range(len(items)))
+
+        def root(row):
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
+
+        for band in range(self.bands):
+            block = np.ascontiguousarray(matrix[:, band * self.rows:(band + 1) * self.rows])
+            keys = block.view(np.dtype((np.void, block.dtype.itemsize * self.rows))).ravel()
+            _, bucket, counts = np.unique(keys, return_inverse=True, return_counts=True)
+            # Only rows sharing this band with another row are candidates
+            shared = np.nonzero(counts[bucket] > 1)[0]
+            if not len(shared):
+                continue
+            shared = shared[np.argsort(bucket[shared], kind="stable")]
+            boundaries = np.nonzero(np.diff(bucket[shared]))[0] + 1
+            for members in np.split(shared, boundaries):
+                first = members[0]
+                similarity = (matrix[members[1:]] == matrix[first]).mean(axis=1)
+                for other in members[1:][similarity >= self.threshold]:
+                    a, b = root(first), root(other)
+                    if a != b:
+                        # Keep the earliest item as the cluster's representative
+                        parent[max(a, b)] = min(a, b)
+
+        near = 0
+        rep_of = {}
+        for row, i in enumerate(items):
+            rep = items[root(row)]
+            rep_of[i] = rep
+            if rep != i:
+                representative[i] = rep
+                near += 1
+        # Exact duplicates point at an item that may itself have been merged
+        for i, rep in enumerate(representative):
+            if rep != i and rep in rep_of:
+                representative[i] = rep_of[rep]
+        return near
+
+
+def score_unique(sentiment_analyzer, data, dedup, analyze=None):
+    """
+    Score each distinct text once, then fan each score out to the exact
+    duplicates of that text; near duplicates are scored on their own, as
+    one changed word can flip the sentiment. Rows keep their own
+    id/metadata and carry a `duplicate_of` id (None for the first
+    occurrence). `analyze` replaces `sentiment_analyzer.analyze` for the
+    scoring itself. Returns (rows, scoring_seconds, estimated_seconds_saved).
+    """
+    unique = [data[i] for i in dedup.scored_indices]
+    started = time.perf_counter()
+    scored = (analyze or sentiment_analyzer.analyze)(unique)
+    scoring_seconds = time.perf_counter() - started
+    by_id = {row["id"]: row for row in scored}
+
+    rows = []
+    for i, item in enumerate(data):
+        rep = dedup.representative[i]
+        score = by_id.get(data[dedup.scored_as[i]]["id"])
+        if score is None:
+            # The representative had no scorable text
+            continue
+        row = dict(score)
+        row.update(id=item["id"], type=item["type"], text=item.get("text", ""), subreddit=item["subreddit"],
+                   created=item["created"], url=item["url"])
+        row["duplicate_of"] = data[rep]["id"] if rep != i else None
+        rows.append(row)
+
+    saved = scoring_seconds / len(unique) * dedup.exact if unique else 0.0
+    duplicates_found.inc(dedup.exact, kind="exact")
+    duplicates_found.inc(dedup.near, kind="near")
+    scoring_seconds_saved.inc(saved)
+    return rows, scoring_seconds, saved
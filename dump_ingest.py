@@ -0,0 +1,269 @@
+"""
+Bulk offline ingestion from Reddit dump files (newline-delimited JSON
+submissions or comments, plain or zstd/gzip compressed), scored out of
+core with chunked.ChunkedAnalysis.
+
+    python dump_ingest.py --topic "python" --subreddits python,learnpython --workers 4 dumps/RC_2024-0*.zst
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+from collections import deque
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow as pa
+from chunked import ChunkedAnalysis, DEFAULT_CHUNK_SIZE
+from metrics import registry
+from pipeline import NoDataError
+from text_cleaning import clean_texts
+
+try:
+    import zstandard
+except ImportError:  # pyarrow's zstd reader, which only takes the default window size
+    zstandard = None
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Decompressed bytes handed to a decoding process at a time
+BLOCK_BYTES = 8 * 1024 * 1024
+# Pushshift-style dumps are compressed with --long=31
+ZSTD_MAX_WINDOW = 2 ** 31
+REDDIT_URL = "https://www.reddit.com"
+_REMOVED = {"[deleted]", "[removed]"}
+
+dump_bytes = registry.counter("sentinent_dump_bytes_total", "Decompressed bytes of Reddit dump files read.")
+dump_records = registry.counter(
+    "sentinent_dump_records_total", "Reddit dump records read, by outcome (matched, skipped, malformed)."
+)
+
+
+def open_dump(path):
+    """A binary stream of a dump's decompressed lines, by extension: .zst, .gz or plain."""
+    if path.endswith(".zst"):
+        if zstandard is not None:
+            decompressor = zstandard.ZstdDecompressor(max_window_size=ZSTD_MAX_WINDOW)
+            return decompressor.stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+        return pa.input_stream(path, compression="zstd")
+    if path.endswith(".gz"):
+        return pa.input_stream(path, compression="gzip")
+    return open(path, "rb")
+
+
+def blocks(path, block_bytes=BLOCK_BYTES):
+    """A dump's decompressed contents in blocks of about `block_bytes`, each ending at a line break."""
+    with open_dump(path) as stream:
+        rest = b""
+        while True:
+            data = stream.read(block_bytes)
+            if not data:
+                break
+            data = rest + data
+            end = data.rfind(b"\n") + 1
+            rest = data[end:]
+            if end:
+                yield data[:end]
+        if rest:
+            yield rest
+
+
+class DumpFilter:
+    """
+    Which dump records become items: those whose text contains one of
+    `keywords` as a whole word (any case), from one of `subreddits`
+    (either left empty keeps everything). Lines that do not contain any
+    keyword's bytes are skipped without being parsed.
+    """
+
+    def __init__(self, keywords=(), subreddits=(), prefilter=True):
+        self.keywords = [k.strip() for k in keywords if k.strip()]
+        self.subreddits = {s.strip().lower() for s in subreddits if s.strip()}
+        self.pattern = None
+        if self.keywords:
+            alternatives = "|".join(re.escape(k) for k in self.keywords)
+            self.pattern = re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", re.IGNORECASE)
+        # JSON escapes non-ASCII characters and quotes, and may escape "/" as
+        # "\/", so only plain ASCII keywords can be looked for in the raw lines
+        self.needles = []
+        if prefilter and self.keywords and all(k.isascii() and not set(k) & set('"\\/') for k in self.keywords):
+            self.needles = [k.lower().encode() for k in self.keywords]
+
+    def matches(self, item):
+        if self.subreddits and item["subreddit"].lower() not in self.subreddits:
+            return False
+        return self.pattern is None or self.pattern.search(item["text"]) is not None
+
+
+def to_item(record):
+    """A submission or comment record in the collect_data item schema; None when it has no text left."""
+    if "title" in record:
+        selftext = record.get("selftext") or ""
+        text = record["title"] + " " + ("" if selftext in _REMOVED else selftext)
+        kind = "post"
+        url = record.get("url") or REDDIT_URL + record.get("permalink", "")
+    else:
+        text = record.get("body") or ""
+        if text in _REMOVED:
+            return None
+        kind = "comment"
+        permalink = record.get("permalink")
+        url = REDDIT_URL + permalink if permalink else \
+            f"{REDDIT_URL}/comments/{str(record.get('link_id', ''))[3:]}/_/{record['id']}"
+    return {
+        "id": str(record["id"]),
+        "type": kind,
+        "text": text,
+        # Older dumps store the timestamp as a string
+        "created": datetime.fromtimestamp(int(float(record["created_utc"]))),
+        "subreddit": record.get("subreddit") or "",
+        "url": url,
+    }
+
+
+def _candidate_lines(dump_filter, block):
+    # Every line, or with the prefilter only those holding a keyword's bytes,
+    # found by scanning the whole block rather than testing line by line
+    if not dump_filter.needles:
+        return block.split(b"\n")
+    lowered = block.lower()
+    spans = {}
+    for needle in dump_filter.needles:
+        position = lowered.find(needle)
+        while position != -1:
+            start = lowered.rfind(b"\n", 0, position) + 1
+            end = lowered.find(b"\n", position)
+            end = len(lowered) if end == -1 else end
+            spans[start] = end
+            position = lowered.find(needle, end)
+    return [block[start:spans[start]] for start in sorted(spans)]
+
+
+def decode_block(dump_filter, block):
+    """(matching items, records read, malformed records) for one block of whole lines."""
+    items, malformed = [], 0
+    records = sum(1 for line in block.split(b"\n") if line and not line.isspace())
+    for line in _candidate_lines(dump_filter, block):
+        if not line or line.isspace():
+            continue
+        try:
+            item = to_item(json.loads(line))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            malformed += 1
+            continue
+        if item is not None and dump_filter.matches(item):
+            items.append(item)
+    for item, text in zip(items, clean_texts([item["text"] for item in items])):
+        item["text"] = text
+    return items, records, malformed
+
+
+class DumpReader:
+    """
+    Streams the items matching `dump_filter` out of dump files, in file
+    order. Files are decompressed as they are read, and the blocks of
+    lines are parsed on `process_pool` (inline without one), at most
+    `max_in_flight` blocks ahead of the consumer. `stats` counts what
+    has been read so far.
+    """
+
+    def __init__(self, dump_filter, process_pool=None, block_bytes=BLOCK_BYTES, max_in_flight=None):
+        self.dump_filter = dump_filter
+        self.process_pool = process_pool
+        self.block_bytes = block_bytes
+        self.max_in_flight = max_in_flight or 2 * (getattr(process_pool, "_max_workers", 1) or 1)
+        self.stats = {"files": 0, "compressed_bytes": 0, "bytes": 0, "records": 0, "matched": 0, "malformed": 0}
+
+    def _blocks(self, paths):
+        for path in paths:
+            self.stats["files"] += 1
+            self.stats["compressed_bytes"] += os.path.getsize(path)
+            for block in blocks(path, self.block_bytes):
+                self.stats["bytes"] += len(block)
+                dump_bytes.inc(len(block))
+                yield block
+
+    def _count(self, result):
+        items, records, malformed = result
+        self.stats["records"] += records
+        self.stats["matched"] += len(items)
+        self.stats["malformed"] += malformed
+        dump_records.inc(len(items), outcome="matched")
+        dump_records.inc(records - len(items) - malformed, outcome="skipped")
+        dump_records.inc(malformed, outcome="malformed")
+        return items
+
+    def _decoded(self, paths):
+        decode = partial(decode_block, self.dump_filter)
+        if self.process_pool is None:
+            for block in self._blocks(paths):
+                yield self._count(decode(block))
+            return
+        pending = deque()
+        try:
+            for block in self._blocks(paths):
+                pending.append(self.process_pool.submit(decode, block))
+                if len(pending) >= self.max_in_flight:
+                    yield self._count(pending.popleft().result())
+            while pending:
+                yield self._count(pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def items(self, paths):
+        return itertools.chain.from_iterable(self._decoded(paths))
+
+
+def _split(value):
+    return [part for part in (value or "").split(",") if part.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score the items about a topic in Reddit dump files.")
+    parser.add_argument("dumps", nargs="+", help="NDJSON dump files (.zst, .gz or uncompressed).")
+    parser.add_argument("--topic", required=True, help="Topic the report and file names are for.")
+    parser.add_argument("--keywords", help="Comma-separated words an item must contain one of (default: the topic).")
+    parser.add_argument("--subreddits", help="Comma-separated subreddits to keep (default: all).")
+    parser.add_argument("--output-dir", default="output", help="Where the results, report and chart data go.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Items scored per chunk.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes parsing and scoring (0 = all inline).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from sentiment_analyzer import SentimentAnalyzer
+    from report_generator import ReportGenerator
+
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    dump_filter = DumpFilter(_split(args.keywords) or [args.topic], _split(args.subreddits))
+    # One pool parses dump blocks and scores chunks of items
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers else None
+    reader = DumpReader(dump_filter, process_pool=pool)
+    analysis = ChunkedAnalysis(SentimentAnalyzer(), ReportGenerator(output_dir=args.output_dir),
+                               chunk_size=args.chunk_size, process_pool=pool)
+    started = time.perf_counter()
+    try:
+        result = analysis.run(reader.items(args.dumps), args.topic, args.output_dir)
+    except NoDataError:
+        logging.warning(f"No items about '{args.topic}' in {reader.stats['records']} dump records.")
+        return 1
+    finally:
+        if pool:
+            pool.shutdown()
+    seconds = time.perf_counter() - started
+    stats = reader.stats
+    logging.info(f"Read {stats['records']} records ({stats['bytes'] / 2 ** 20:.0f} MB) from {stats['files']} files in "
+                 f"{seconds:.1f}s; {stats['matched']} matched, {stats['malformed']} malformed. "
+                 f"Report available at {result['report']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
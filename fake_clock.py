@@ -0,0 +1,8 @@
+class FakeClock:
+    """A clock for tests: returns `now`, which only moves when the test sets or advances it."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,151 @@
+"""
+Offline stand-ins for PRAW, shared by the unit tests and the benchmarks:
+FakeReddit serves synthetic submissions and comments with simulated
+latency and rate limiting, and make_collector points a
+RedditDataCollector at one.
+"""
+import time
+import threading
+from types import SimpleNamespace
+from prawcore.exceptions import TooManyRequests
+from synthetic_corpus import SyntheticCorpus
+from data_collector import RedditDataCollector, reddit_scheduler
+from rate_limit import TokenBucket
+
+# PRAW pages listing endpoints (search) 100 items per request
+PAGE_SIZE = 100
+
+
+class FakeComment:
+    def __init__(self, body, created_utc, subreddit):
+        self.body = body
+        self.created_utc = created_utc
+        self.subreddit = SimpleNamespace(display_name=subreddit)
+
+
+class FakeCommentForest:
+    def __init__(self, reddit, comments):
+        self._reddit = reddit
+        self._comments = comments
+
+    def replace_more(self, limit=32):
+        # Expanding "load more comments" stubs costs extra requests on big threads
+        if limit != 0:
+            self._reddit._request(limit or 1)
+        self._reddit._sleep(self._reddit.replace_more_latency)
+        return []
+
+    def list(self):
+        return list(self._comments)
+
+
+class FakeSubmission:
+    def __init__(self, reddit, index, title, selftext, created_utc, subreddit, comments):
+        self._reddit = reddit
+        self._comments = comments
+        self._forest = None
+        self.id = f"fake{index}"
+        self.title = title
+        self.selftext = selftext
+        self.created_utc = created_utc
+        self.subreddit = SimpleNamespace(display_name=subreddit)
+        self.url = f"https://www.reddit.com/r/{subreddit}/comments/fake{index}/"
+
+    @property
+    def comments(self):
+        # Like PRAW, the comment tree is fetched lazily on first access
+        if self._forest is None:
+            self._reddit._request()
+            self._forest = FakeCommentForest(self._reddit, self._comments)
+        return self._forest
+
+
+class FakeSubreddit:
+    def __init__(self, reddit, name):
+        self._reddit = reddit
+        self.display_name = name
+
+    def search(self, query, limit=100, **kwargs):
+        count = min(limit, self._reddit.num_submissions) if limit is not None else self._reddit.num_submissions
+        return FakeListing(self._reddit, self.display_name, count)
+
+
+class FakeListing:
+    """Like PRAW's ListingGenerator: a page that failed to load is requested again by the next `next()`."""
+
+    def __init__(self, reddit, subreddit, count):
+        self._reddit = reddit
+        self._subreddit = subreddit
+        self._count = count
+        self._index = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._index >= self._count:
+            raise StopIteration
+        if self._index % PAGE_SIZE == 0:
+            self._reddit._request()
+        self._index += 1
+        return self._reddit._submission(self._subreddit, self._index - 1)
+
+
+class FakeReddit:
+    """
+    Offline stand-in for `praw.Reddit` covering what RedditDataCollector uses.
+    Every simulated HTTP request sleeps `latency` seconds and is counted in
+    `requests`, so collection benchmarks and tests see realistic I/O waits.
+    With `server_rate` (requests per second, bursts of `server_burst`),
+    requests over the limit fail with a 429 like Reddit's and are counted
+    in `rejected`.
+    """
+
+    def __init__(self, num_submissions=10, comments_per_submission=10, latency=0.0,
+                 replace_more_latency=0.0, seed=42, server_rate=None, server_burst=10):
+        self.num_submissions = num_submissions
+        self.comments_per_submission = comments_per_submission
+        self.latency = latency
+        self.replace_more_latency = replace_more_latency
+        self.corpus = SyntheticCorpus(seed=seed)
+        self.requests = 0
+        self.rejected = 0
+        self._server_limit = TokenBucket(server_rate, server_burst) if server_rate else None
+        self._lock = threading.Lock()
+
+    def _sleep(self, seconds):
+        if seconds:
+            time.sleep(seconds)
+
+    def _request(self, count=1):
+        if self._server_limit and not self._server_limit.try_acquire(count):
+            with self._lock:
+                self.rejected += 1
+            retry_after = self._server_limit.wait_time(count)
+            raise TooManyRequests(SimpleNamespace(status_code=429, headers={"retry-after": f"{retry_after:.3f}"},
+                                                  text="Too Many Requests"))
+        with self._lock:
+            self.requests += count
+        self._sleep(self.latency * count)
+
+    def _submission(self, subreddit, index):
+        base = 1704067200 + index * 60
+        with self._lock:
+            title = self.corpus.sentence()
+            selftext = self.corpus.sentence()
+            bodies = [self.corpus.sentence() for _ in range(self.comments_per_submission)]
+        comments = [FakeComment(body, base + i, subreddit) for i, body in enumerate(bodies)]
+        return FakeSubmission(self, index, title, selftext, base, subreddit, comments)
+
+    def subreddit(self, name):
+        return FakeSubreddit(self, name)
+
+
+def make_collector(reddit, max_concurrency=4, requests_per_minute=None):
+    """A RedditDataCollector reading from `reddit` (e.g. a FakeReddit) instead of the Reddit API."""
+    # Unpaced by default: most benchmarks measure our own overhead, not Reddit's rate limit
+    scheduler = reddit_scheduler(requests_per_minute or 6e6, burst=1000)
+    collector = RedditDataCollector("bench", "bench", "sentinent-bench", "bench", "bench",
+                                    scheduler=scheduler, max_concurrency=max_concurrency)
+    collector.reddit = reddit
+    return collector
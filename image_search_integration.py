@@ -2,26 +2,37 @@
 import os
 import shutil
 import requests
+import httpx
 from urllib.parse import quote
+from metrics import timed
+from artifacts import atomic_write
 
 class ImageSearchIntegration:
-    def __init__(self, output_dir=".", api_key="YOUR_PIXABAY_API_KEY"):
+    def __init__(self, output_dir=".", api_key="YOUR_PIXABAY_API_KEY", base_url="https://pixabay.com/api/"):
         self.output_dir = output_dir
         self.api_key = api_key  # Pixabay API key
-        self.base_url = "https://pixabay.com/api/"
+        self.base_url = base_url
 
-    def search_and_download_image(self, topic):
+    def _search_url(self, topic):
+        return f"{self.base_url}?key={self.api_key}&q={quote(topic)}&image_type=photo&per_page=3"
+
+    def _image_path(self, topic, image_url, output_dir):
+        ext = image_url.split(".")[-1].lower()
+        if ext not in ["jpg", "jpeg", "png"]:
+            ext = "jpg"  # Default to jpg if unknown
+        topic_clean = topic.replace(" ", "_").replace("/", "_")
+        return os.path.join(output_dir or self.output_dir, f"{topic_clean}_topic_image.{ext}")
+
+    @timed("image_search", items=lambda args, result: 1 if result else 0)
+    def search_and_download_image(self, topic, output_dir=None):
         """
-        Search for an image related to the topic using Pixabay API and download it.
+        Search for an image related to the topic using Pixabay API and download it
+        into `output_dir` (defaults to the directory given at construction).
         Returns the path to the downloaded image or None if failed.
         """
         try:
-            # Encode the topic for the URL
-            query = quote(topic)
-            url = f"{self.base_url}?key={self.api_key}&q={query}&image_type=photo&per_page=3"
-            
             # Make API request
-            response = requests.get(url)  
+            response = requests.get(self._search_url(topic))
             response.raise_for_status()  # Raise exception for bad status codes
             data = response.json()
 
@@ -30,19 +41,10 @@ class ImageSearchIntegration:
                 image_url = data["hits"][0]["largeImageURL"]  # Get the first image
                 image_response = requests.get(image_url, stream=True)
                 image_response.raise_for_status()
-
-                # Determine file extension
-                ext = image_url.split(".")[-1].lower()
-                if ext not in ["jpg", "jpeg", "png"]:
-                    ext = "jpg"  # Default to jpg if unknown
-
-                # Create destination path
-                topic_clean = topic.replace(" ", "_").replace("/", "_")
-                dest_filename = f"{topic_clean}_topic_image.{ext}"
-                dest_path = os.path.join(self.output_dir, dest_filename)
+                dest_path = self._image_path(topic, image_url, output_dir)
 
                 # Save the image
-                with open(dest_path, "wb") as f:
+                with atomic_write(dest_path, "wb") as f:
                     shutil.copyfileobj(image_response.raw, f)
                 print(f"Image downloaded to: {dest_path}")
                 return dest_path
@@ -54,6 +56,38 @@ class ImageSearchIntegration:
             print(f"Error in image search: {e}")
             return None
 
+    @timed("image_search_async", items=lambda args, result: 1 if result else 0)
+    async def search_and_download_image_async(self, topic, output_dir=None, client=None):
+        """
+        search_and_download_image with non-blocking HTTP, so an event loop
+        can wait on Pixabay without holding a thread. Pass a shared
+        httpx.AsyncClient to reuse its connections.
+        """
+        own_client = client is None
+        client = client or httpx.AsyncClient(timeout=30)
+        try:
+            response = await client.get(self._search_url(topic))
+            response.raise_for_status()
+            hits = response.json().get("hits")
+            if not hits:
+                print(f"No images found for topic: {topic}")
+                return None
+            image_url = hits[0]["largeImageURL"]
+            dest_path = self._image_path(topic, image_url, output_dir)
+            async with client.stream("GET", image_url) as image_response:
+                image_response.raise_for_status()
+                with atomic_write(dest_path, "wb") as f:
+                    async for chunk in image_response.aiter_bytes():
+                        f.write(chunk)
+            print(f"Image downloaded to: {dest_path}")
+            return dest_path
+        except Exception as e:
+            print(f"Error in image search: {e}")
+            return None
+        finally:
+            if own_client:
+                await client.aclose()
+
     def copy_image_to_output(self, source_path, topic):
         """
         Copy a downloaded image to the output directory with proper naming.
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from metrics import registry
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+jobs_finished = registry.counter("sentinent_jobs_total", "Queued jobs finished, by kind and outcome (done or failed).")
+leases_expired = registry.counter(
+    "sentinent_job_leases_expired_total", "Jobs taken over from a worker whose lease ran out (crashed or stuck)."
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    -- Jobs with the same key share one run while either is queued or running
+    job_key TEXT,
+    payload TEXT NOT NULL,
+    -- queued -> running -> done | failed; a running job whose lease has
+    -- expired is claimable again
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (job_key, status);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    job_id INTEGER
+);
+"""
+
+
+class JobQueue:
+    """
+    A job queue in a SQLite table that any number of app hosts and worker
+    processes can share. Workers claim a job with a lease and extend it
+    with heartbeat(); when a worker dies its lease runs out and the next
+    claim() takes the job over, up to `max_attempts` claims per job.
+
+    Claims run in an IMMEDIATE transaction, so two workers never get the
+    same job. Everything goes through the handful of methods below, which
+    map directly onto a Postgres table (claim with FOR UPDATE SKIP LOCKED)
+    when the hosts cannot share a SQLite file.
+    """
+
+    def __init__(self, path, lease_seconds=60, max_attempts=3, clock=time.time):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.clock = clock
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Immediate(self._connect())
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self, kind, payload, key=None):
+        """Queue a job and return its id; with `key`, an unfinished job with the same key is returned instead."""
+        with self._transaction() as conn:
+            if key is not None:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE job_key = ? AND status IN ('queued', 'running') ORDER BY id LIMIT 1",
+                    (key,)
+                ).fetchone()
+                if row:
+                    return row["id"]
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, job_key, payload, status, max_attempts, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (kind, key, json.dumps(payload), self.max_attempts, self.clock())
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker, kinds=None):
+        """
+        Lease the oldest claimable job to `worker`: a queued one, or a running
+        one whose lease has expired. Returns the job (a dict) or None.
+        """
+        now = self.clock()
+        kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})" if kinds else ""
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' OR (status = 'running' AND lease_expires < ?))"
+                    f"{kind_filter} ORDER BY id LIMIT 1",
+                    (now, *(kinds or ()))
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["status"] == "running":
+                    leases_expired.inc()
+                    logging.warning(f"Job {row['id']} lease held by {row['worker']} expired")
+                    if row["attempts"] >= row["max_attempts"]:
+                        self._finish(conn, row, "failed", error=f"Worker lost {row['attempts']} times (lease expired).")
+                        continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_expires = ?, "
+                    "started_at = ? WHERE id = ?",
+                    (worker, now + self.lease_seconds, now, row["id"])
+                )
+                return self._job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+    def heartbeat(self, job_id, worker):
+        """Extend `worker`'s lease on the job; False if the job is no longer leased to it."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (self.clock() + self.lease_seconds, job_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        return self._settle(job_id, worker, "done", result=result)
+
+    def fail(self, job_id, worker, error):
+        return self._settle(job_id, worker, "failed", error=error)
+
+    def _settle(self, job_id, worker, status, result=None, error=None):
+        # A worker that lost its lease must not overwrite the new owner's outcome
+        with self._transaction() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                               (job_id, worker)).fetchone()
+            if row is None:
+                logging.warning(f"Worker {worker} no longer holds job {job_id}; its {status} outcome is dropped")
+                return False
+            self._finish(conn, row, status, result=result, error=error)
+            return True
+
+    def _finish(self, conn, row, status, result=None, error=None):
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires = NULL WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, self.clock(), row["id"])
+        )
+        jobs_finished.inc(kind=row["kind"], outcome=status)
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def wait(self, job_id, timeout=None, poll_seconds=0.5):
+        """Block until the job is done or failed and return it; the job as it stands if `timeout` runs out."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in ("done", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_seconds)
+
+    def counts(self):
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def register_worker(self, worker, job_id=None):
+        """Record that `worker` is alive (and what it is running); called on every heartbeat."""
+        now = self.clock()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO workers (worker, host, pid, started_at, heartbeat_at, job_id) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (worker) DO UPDATE SET heartbeat_at = excluded.heartbeat_at, job_id = excluded.job_id",
+                (worker, socket.gethostname(), os.getpid(), now, now, job_id)
+            )
+
+    def workers(self, within_seconds=None):
+        """Workers that have sent a heartbeat in the last `within_seconds` (default: two leases)."""
+        since = self.clock() - (within_seconds or 2 * self.lease_seconds)
+        rows = self._connect().execute(
+            "SELECT * FROM workers WHERE heartbeat_at >= ? ORDER BY worker", (since,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _job(row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error; takes the write lock up front so claims cannot race."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -1,24 +1,68 @@
-import pandas as pd
-import os
+import argparse
+import json
 import logging
 from config import Config  # Adjusted to match assumed Config class
-from data_collector import RedditDataCollector
+from data_collector import RedditDataCollector, reddit_scheduler
 from sentiment_analyzer import SentimentAnalyzer
 from visualization_generator import VisualizationGenerator
 from report_generator import ReportGenerator
 from image_search_integration import ImageSearchIntegration
+from pipeline import build_analysis_pipeline, PipelineError, NoDataError
+from metrics import registry as metrics_registry
+from profiling import StageProfiler, profile_dir_for
+from batch import BatchRunner, read_topics
+from artifacts import RunDirectory, ArtifactJanitor
+from results_store import ResultsStore
+from streaming_stats import SentimentSketch
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyze Reddit sentiment for a topic.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run each stage under cProfile and tracemalloc and write the profiles to the output directory.")
+    parser.add_argument("--batch", metavar="TOPICS_FILE",
+                        help="Analyze every topic in TOPICS_FILE (one per line) and write a batch_summary index.")
+    parser.add_argument("--parallel", type=int, default=None,
+                        help="Number of topics analyzed concurrently in batch mode (default: BATCH_PARALLELISM).")
+    parser.add_argument("--time-budget", type=float, default=None, metavar="SECONDS",
+                        help="Finish each analysis within SECONDS, reporting partial data if collection runs long "
+                             "(default: ANALYSIS_TIME_BUDGET_SECONDS, 0 = unlimited).")
+    return parser.parse_args()
+
+def janitor_for(config):
+    return ArtifactJanitor(
+        config.RUNS_DIR,
+        max_age_seconds=config.ARTIFACT_MAX_AGE_HOURS * 3600,
+        max_total_bytes=config.ARTIFACT_MAX_TOTAL_MB * 1024 * 1024,
+        interval_seconds=config.JANITOR_INTERVAL_SECONDS
+    )
+
+def run_batch(args, config, *components):
+    topics = read_topics(args.batch)
+    if not topics:
+        logging.warning(f"No topics found in {args.batch}.")
+        return
+    runner = BatchRunner(*components, config, parallelism=args.parallel or config.BATCH_PARALLELISM,
+                         results_store=ResultsStore(config.RESULTS_DB))
+    logging.info(f"Running batch of {len(topics)} topics with parallelism {runner.parallelism}")
+    summary = runner.run(topics)
+    json_path, md_path = runner.write_index(summary)
+    janitor_for(config).sweep()
+    logging.info(f"Batch complete: {summary['succeeded']}/{summary['topics']} topics in {summary['seconds']}s "
+                 f"({summary['topics_per_minute']} topics/minute). Index: {md_path}, {json_path}")
+    logging.info(f"Run metrics:\n{json.dumps(metrics_registry.summary(), indent=2)}")
+
 def main():
+    args = parse_args()
     try:
         config = Config()
         config.validate_reddit_credentials()
     except ValueError as e:
         logging.error(f"Configuration error: {e}")
         return
-
-    topic = input("Enter the topic to analyze: ")
+    if args.time_budget is not None:
+        config.ANALYSIS_TIME_BUDGET_SECONDS = args.time_budget
 
     # Initialize components
     data_collector = RedditDataCollector(
@@ -26,106 +70,67 @@ def main():
         client_secret=config.REDDIT_CLIENT_SECRET,
         user_agent=config.REDDIT_USER_AGENT,
         username=config.REDDIT_USERNAME,
-        password=config.REDDIT_PASSWORD
+        password=config.REDDIT_PASSWORD,
+        scheduler=reddit_scheduler(config.REDDIT_REQUESTS_PER_MINUTE, config.REDDIT_REQUEST_BURST),
+        max_concurrency=config.COLLECT_MAX_CONCURRENCY
     )
     sentiment_analyzer = SentimentAnalyzer()
     viz_generator = VisualizationGenerator()
     report_generator = ReportGenerator(output_dir=config.OUTPUT_DIR)
     image_search_integrator = ImageSearchIntegration(output_dir=config.OUTPUT_DIR)
 
-    # 1. Collect Data
-    logging.info(f"Collecting Reddit data for topic: {topic}")
-    try:
-        data = data_collector.collect_data(
-            topic,
-            subreddit_name=config.DEFAULT_SUBREDDIT,
-            post_limit=config.DEFAULT_POST_LIMIT,
-            comment_limit=config.DEFAULT_COMMENT_LIMIT
-        )
-    except Exception as e:
-        logging.error(f"Data collection error: {e}")
-        return
-
-    if not data:
-        logging.warning(f"No data found for topic {topic}. Try a different topic or check your API credentials.")
+    if args.batch:
+        if args.profile:
+            logging.warning("--profile is ignored in batch mode.")
+        run_batch(args, config, data_collector, sentiment_analyzer, viz_generator, report_generator, image_search_integrator)
         return
 
-    df = pd.DataFrame(data)
-
-    # 2. Perform Sentiment Analysis
-    logging.info("Performing sentiment analysis...")
+    topic = input("Enter the topic to analyze: ")
+    run_dir = RunDirectory.create(config.RUNS_DIR, topic)
+    profiler = StageProfiler(profile_dir_for(run_dir.path)) if args.profile else None
+
+    # Collection, image search, scoring, charts, CSV and report run as a stage
+    # graph so independent stages (e.g. image search and Reddit collection,
+    # or the individual charts) overlap
+    pipeline = build_analysis_pipeline(
+        data_collector, sentiment_analyzer, viz_generator, report_generator, image_search_integrator, config,
+        profiler=profiler, results_store=ResultsStore(config.RESULTS_DB)
+    )
+    logging.info(f"Running analysis pipeline for topic: {topic}")
     try:
-        sentiment_results = sentiment_analyzer.analyze(data)
-        sentiment_df = pd.DataFrame(sentiment_results)
-    except Exception as e:
-        logging.error(f"Sentiment analysis error: {e}")
+        result = pipeline.run(topic=topic, output_dir=run_dir.path)
+    except PipelineError as e:
+        if isinstance(e.error, NoDataError):
+            logging.warning(f"No data found for topic {topic}. Try a different topic or check your API credentials.")
+        else:
+            logging.error(str(e))
+        logging.info(f"Run metrics:\n{json.dumps(metrics_registry.summary(), indent=2)}")
         return
+    finally:
+        if profiler:
+            print(profiler.format_report())
 
-    # Save raw sentiment results to CSV
-    topic_clean = topic.replace(" ", "_")
-    output_csv_path = os.path.join(config.OUTPUT_DIR, f"{topic_clean}_sentiment_results.csv")
-    try:
-        sentiment_df.to_csv(output_csv_path, index=False)
-        logging.info(f"Sentiment results saved to {output_csv_path}")
-    except Exception as e:
-        logging.error(f"Error saving CSV: {e}")
-        return
+    sketch = SentimentSketch.from_frame(result["sentiment_df"])
 
     # Display basic statistics
     logging.info("\nSentiment Analysis Statistics:")
-    logging.info(sentiment_df[["vader_neg", "vader_neu", "vader_pos", "vader_compound", "textblob_polarity", "combined_compound"]].describe())
+    logging.info(sketch.describe())
 
     # Show top 5 most positive and negative texts
     logging.info("\nTop 5 Most Positive Texts:")
-    logging.info(sentiment_df.nlargest(5, "combined_compound")[["text", "combined_compound", "type", "subreddit"]])
+    logging.info(sketch.most_positive.frame())
     logging.info("\nTop 5 Most Negative Texts:")
-    logging.info(sentiment_df.nsmallest(5, "combined_compound")[["text", "combined_compound", "type", "subreddit"]])
+    logging.info(sketch.most_negative.frame())
 
-    # 3. Generate Visualizations
-    logging.info("Generating visualizations...")
-    try:
-        plot_file = viz_generator.plot_sentiment_analysis(sentiment_df, topic, output_path=config.OUTPUT_DIR)
-        wordcloud_file = viz_generator.generate_wordcloud(sentiment_df["text"], topic, output_path=config.OUTPUT_DIR)
-        sentiment_counts_file = viz_generator.plot_sentiment_counts(sentiment_df, topic, output_path=config.OUTPUT_DIR)
-        
-        # New plots
-        heatmap_file = viz_generator.plot_sentiment_heatmap(sentiment_df, topic, output_path=config.OUTPUT_DIR)
-        pie_chart_file = viz_generator.plot_sentiment_distribution_pie(sentiment_df, topic, output_path=config.OUTPUT_DIR)
-
-    except Exception as e:
-        logging.error(f"Visualization error: {e}")
-        return
+    if result["topic_image"]:
+        logging.info(f"Found and saved topic image: {result['topic_image']}")
+    else:
+        logging.warning(f"No image found for topic {topic}.")
 
-    # 4. Search and download image for the topic
-    logging.info(f"Searching for an image related to {topic}...")
-    topic_image_path = None
-    try:
-        image_results = image_search_integrator.search_and_download_image(topic)
-        if image_results:
-            topic_image_path = image_search_integrator.copy_image_to_output(image_results, topic)
-            logging.info(f"Found and saved topic image: {topic_image_path}")
-        else:
-            logging.warning(f"No image found for topic {topic}.")
-    except Exception as e:
-        logging.error(f"Image search/download error: {e}")
-
-    # 5. Generate Report
-    logging.info("Generating summary report...")
-    try:
-        report_file = report_generator.generate_summary_report(
-            sentiment_df, 
-            topic, 
-            plot_file, 
-            wordcloud_file, 
-            sentiment_counts_file,
-            heatmap_path=heatmap_file,
-            pie_path=pie_chart_file,
-            topic_image_path=topic_image_path
-        )
-        logging.info(f"Analysis complete. Report available at {report_file}")
-    except Exception as e:
-        logging.error(f"Report generation error: {e}")
-        return
+    logging.info(f"Stage timings: {result.format_timings()}")
+    logging.info(f"Analysis complete. Report available at {result['report']}")
+    janitor_for(config).sweep()
+    logging.info(f"Run metrics:\n{json.dumps(metrics_registry.summary(), indent=2)}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,313 @@
+import sys
+import time
+import inspect
+import threading
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, lock):
+        self.name = name
+        self.help = help
+        self._lock = lock
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[_label_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_max(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = max(self.values.get(key, value), value)
+
+    def merge(self, values):
+        # Gauges from other processes are peaks/levels, not increments
+        with self._lock:
+            for key, value in values.items():
+                self.values[key] = max(self.values.get(key, value), value)
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, lock, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self._lock = lock
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts, sum, count, max]
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+            state[3] = max(state[3], value)
+
+    def get(self, **labels):
+        state = self.values.get(_label_key(labels))
+        if state is None:
+            return {"count": 0, "sum": 0.0, "max": 0.0}
+        return {"count": state[2], "sum": state[1], "max": state[3]}
+
+    def merge(self, values):
+        with self._lock:
+            for key, (counts, total, count, peak) in values.items():
+                state = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0, 0.0])
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+                state[3] = max(state[3], peak)
+
+    def samples(self):
+        for key, (counts, total, count, _) in sorted(self.values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {bucket_count}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(key)} {count}"
+
+
+class Timer:
+    """
+    Context manager that records one call of an instrumented stage: wall
+    time, CPU time of the calling thread, item count and the process' peak
+    RSS. Set `timer.items` inside the block to record how much was processed.
+    """
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+        self.items = None
+        self.wall = None
+        self.cpu = None
+
+    def __enter__(self):
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall = time.perf_counter() - self._wall_start
+        self.cpu = time.thread_time() - self._cpu_start
+        self.registry.record_stage(self.stage, self.wall, self.cpu, self.items, failed=exc_type is not None)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.metrics = {}
+        self._define_stage_metrics()
+
+    def _define_stage_metrics(self):
+        self.stage_calls = self.counter("sentinent_stage_calls_total", "Number of calls per instrumented stage.")
+        self.stage_errors = self.counter("sentinent_stage_errors_total", "Number of calls per stage that raised.")
+        self.stage_items = self.counter("sentinent_stage_items_total", "Items processed per stage.")
+        self.stage_wall = self.histogram("sentinent_stage_wall_seconds", "Wall-clock time per stage call.")
+        self.stage_cpu = self.histogram("sentinent_stage_cpu_seconds", "Thread CPU time per stage call.")
+        self.stage_peak_rss = self.gauge("sentinent_stage_peak_rss_bytes", "Process peak RSS observed after a stage call.")
+
+    def _get_or_create(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, self._lock, **kwargs)
+                self.metrics[name] = metric
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.type}.")
+            return metric
+
+    def counter(self, name, help=""):
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name, help=""):
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def record_stage(self, stage, wall, cpu, items=None, failed=False):
+        self.stage_calls.inc(stage=stage)
+        if failed:
+            self.stage_errors.inc(stage=stage)
+        if items is not None:
+            self.stage_items.inc(items, stage=stage)
+        self.stage_wall.observe(wall, stage=stage)
+        self.stage_cpu.observe(cpu, stage=stage)
+        peak = peak_rss_bytes()
+        if peak is not None:
+            self.stage_peak_rss.set_max(peak, stage=stage)
+
+    def timer(self, stage):
+        return Timer(self, stage)
+
+    def timed(self, stage, items=None):
+        """
+        Decorator form of timer(). `items` is an optional callable taking
+        (args, result) and returning the number of items processed. On a
+        coroutine function the CPU time also counts other tasks that ran on
+        the event loop while it was suspended.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(stage) as t:
+                        result = await func(*args, **kwargs)
+                        if items is not None:
+                            t.items = items(args, result)
+                    return result
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage) as t:
+                    result = func(*args, **kwargs)
+                    if items is not None:
+                        t.items = items(args, result)
+                return result
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self.metrics = {}
+            self._define_stage_metrics()
+
+    def snapshot(self):
+        """Picklable copy of all metric values, used to ship metrics out of worker processes."""
+        with self._lock:
+            return {
+                name: (metric.type, metric.help, getattr(metric, "buckets", None),
+                       {k: (list(v[0]), v[1], v[2], v[3]) if metric.type == "histogram" else v
+                        for k, v in metric.values.items()})
+                for name, metric in self.metrics.items()
+            }
+
+    def merge(self, snapshot):
+        for name, (kind, help, buckets, values) in snapshot.items():
+            if kind == "counter":
+                metric = self.counter(name, help)
+            elif kind == "gauge":
+                metric = self.gauge(name, help)
+            else:
+                metric = self.histogram(name, help, buckets=buckets)
+            metric.merge(values)
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self.metrics.items()):
+                if not metric.values:
+                    continue
+                lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {metric.type}")
+                lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Per-stage totals as a plain dict, suitable for json.dumps."""
+        stages = {}
+        with self._lock:
+            for key in self.stage_calls.values:
+                labels = dict(key)
+                stage = labels["stage"]
+                wall = self.stage_wall.get(**labels)
+                cpu = self.stage_cpu.get(**labels)
+                stages[stage] = {
+                    "calls": self.stage_calls.get(**labels),
+                    "errors": self.stage_errors.get(**labels),
+                    "items": self.stage_items.get(**labels),
+                    "wall_seconds": round(wall["sum"], 4),
+                    "wall_seconds_max": round(wall["max"], 4),
+                    "cpu_seconds": round(cpu["sum"], 4),
+                    "peak_rss_bytes": self.stage_peak_rss.get(**labels) or None,
+                }
+        return stages
+
+
+def result_len(args, result):
+    """`items` callable counting the returned collection."""
+    return len(result) if result is not None else 0
+
+
+def arg_len(index):
+    """`items` callable counting the positional argument at `index` (self is 0)."""
+    return lambda args, result: len(args[index])
+
+
+# Process-wide default registry used by the instrumented components
+registry = MetricsRegistry()
+
+
+def timed(stage, items=None):
+    return registry.timed(stage, items=items)
+
+
+def timer(stage):
+    return registry.timer(stage)
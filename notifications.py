@@ -0,0 +1,49 @@
+import logging
+from email.message import EmailMessage
+import aiosmtplib
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def analysis_email(sender, recipient, topic, summary):
+    """A short 'your analysis is ready' message from an analysis summary."""
+    message = EmailMessage()
+    message["Subject"] = f"Sentiment analysis ready: {topic}"
+    message["From"] = sender
+    message["To"] = recipient
+    if summary.get("status") != "ok":
+        body = f"The analysis for '{topic}' did not finish: {summary.get('error', 'unknown error')}."
+    else:
+        body = (
+            f"The analysis for '{topic}' is ready.\n\n"
+            f"Items analysed: {summary['items']}\n"
+            f"Mean combined sentiment: {summary['mean_combined_compound']:.3f}\n"
+            f"Positive / negative / neutral: {summary['positive_percentage']}% / "
+            f"{summary['negative_percentage']}% / {summary['neutral_percentage']}%\n"
+        )
+        if summary.get("partial"):
+            body += "\nCollection stopped early, so these are partial results.\n"
+    message.set_content(body)
+    return message
+
+
+async def send_email_async(config, message, timeout=30):
+    """
+    Send `message` through the configured SMTP server (STARTTLS) without
+    blocking the event loop. Returns True on success; failures are logged.
+    """
+    try:
+        await aiosmtplib.send(
+            message,
+            hostname=config.SMTP_SERVER,
+            port=config.SMTP_PORT,
+            username=config.SMTP_USERNAME,
+            password=config.SMTP_PASSWORD,
+            start_tls=True,
+            timeout=timeout,
+        )
+    except aiosmtplib.SMTPException as e:
+        logging.error(f"Sending email to {message['To']} failed: {e}")
+        return False
+    logging.info(f"Email sent to {message['To']}")
+    return True
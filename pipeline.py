@@ -0,0 +1,486 @@
+import os
+import time
+import logging
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+import pandas as pd
+from metrics import registry
+from artifacts import write_manifest
+from results_io import results_path_for, write_results
+from chart_data import chart_data_path_for, write_chart_data
+from dedup import Deduplicator, score_unique
+from sampling import Sampler, estimate
+from deadline import Deadline, DeadlineExceeded
+from progress import Progress
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class NoDataError(Exception):
+    """Raised by the collection stage when Reddit returned nothing for the topic."""
+
+
+class PipelineError(Exception):
+    """Raised when a required stage fails; wraps the original exception."""
+
+    def __init__(self, stage, label, error):
+        super().__init__(f"{label} error: {error}")
+        self.stage = stage
+        self.label = label
+        self.error = error
+
+
+class Stage:
+    """
+    A single node of the pipeline graph.
+    `inputs` names earlier stages (or initial values passed to run()) whose
+    results are handed to `func` as keyword arguments. `kind` is "io" for
+    stages that mostly wait on the network/disk (run on threads) and "cpu"
+    for stages that burn CPU (run on processes).
+    """
+
+    def __init__(self, name, func, inputs=(), kind="io", optional=False, label=None):
+        if kind not in ("io", "cpu"):
+            raise ValueError(f"Unknown stage kind '{kind}' for stage '{name}'.")
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.kind = kind
+        self.optional = optional
+        self.label = label or name
+
+
+class PipelineResult:
+    def __init__(self, results, timings, errors):
+        self.results = results
+        self.timings = timings
+        self.errors = errors
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    def get(self, name, default=None):
+        return self.results.get(name, default)
+
+    def format_timings(self):
+        return ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.timings.items())
+
+
+def _timed_call(func, kwargs):
+    # Module-level so it can be shipped to a ProcessPoolExecutor
+    started = time.perf_counter()
+    result = func(**kwargs)
+    return result, time.perf_counter() - started, None
+
+
+# matplotlib and seaborn keep global state (rcParams, caches), so "cpu" stages
+# that run in-process (processes disabled) must not overlap, even across
+# pipelines running side by side
+_INLINE_CPU_LOCK = threading.Lock()
+
+
+def _serialized(func, **kwargs):
+    with _INLINE_CPU_LOCK:
+        return func(**kwargs)
+
+
+def _timed_call_in_process(func, kwargs):
+    # Worker processes are reused across stages: start each stage from an
+    # empty registry and ship what it recorded back to the parent
+    registry.reset()
+    result, elapsed, _ = _timed_call(func, kwargs)
+    return result, elapsed, registry.snapshot()
+
+
+class Pipeline:
+    """
+    Runs a graph of stages, starting each one as soon as all of its inputs
+    are available. Independent stages overlap: "io" stages share a thread
+    pool and "cpu" stages a process pool. When processes are disabled the
+    "cpu" stages run on the thread pool but one at a time process-wide,
+    since matplotlib's global state is not safe to drive from several
+    threads at once.
+
+    With a `profiler` (see profiling.StageProfiler) the stages instead run
+    one at a time on a single thread, so each stage's profile and allocation
+    snapshot only contain that stage's work.
+
+    `thread_pool` / `process_pool` let several pipelines share long-lived,
+    already-warm executors; pools passed in are never shut down by run().
+
+    With a `time_budget` (seconds), every run gets a `deadline` input that
+    stages can declare to bound their own work. Once it passes, optional
+    stages still running are abandoned (their result is None) so they
+    cannot hold up the rest of the run.
+
+    Every run also provides a `progress` input (see progress.Progress),
+    told about each stage as it starts and finishes, and a `cpu_map`
+    input: `cpu_map(func, chunks)` yields `(index, func(chunk))` as each
+    chunk finishes on the run's process pool (inline without one), so a
+    thread stage can spread work over processes and report as it goes.
+
+    A stage whose result is passed to run() as an initial value is not run,
+    so a caller can produce some results itself (e.g. asynchronously) and
+    hand the rest of the graph over.
+    """
+
+    def __init__(self, max_workers=4, use_processes=True, profiler=None, thread_pool=None, process_pool=None,
+                 time_budget=None):
+        self.time_budget = time_budget
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.profiler = profiler
+        self.thread_pool = thread_pool
+        self.process_pool = process_pool
+        self.stages = {}
+
+    def add_stage(self, name, func, inputs=(), kind="io", optional=False, label=None):
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already defined.")
+        self.stages[name] = Stage(name, func, inputs, kind, optional, label)
+        return self
+
+    def _check_graph(self, initial):
+        known = set(initial) | set(self.stages) | {"cpu_map"}
+        for stage in self.stages.values():
+            missing = [i for i in stage.inputs if i not in known]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown inputs: {missing}")
+
+    def _executors(self):
+        """Return (io pool, cpu pool or None, pools owned by this run)."""
+        if self.profiler is not None:
+            pool = ThreadPoolExecutor(max_workers=1)
+            return pool, None, [pool]
+        owned = []
+        threads = self.thread_pool
+        if threads is None:
+            threads = ThreadPoolExecutor(max_workers=self.max_workers)
+            owned.append(threads)
+        cpu_pool = None
+        if self.use_processes:
+            cpu_pool = self.process_pool
+            if cpu_pool is None:
+                cpu_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                owned.append(cpu_pool)
+        return threads, cpu_pool, owned
+
+    @staticmethod
+    def _cpu_map(cpu_pool, func, chunks):
+        if cpu_pool is None:
+            for index, chunk in enumerate(chunks):
+                yield index, func(chunk)
+            return
+        futures = {cpu_pool.submit(_timed_call_in_process, partial(func, chunk), {}): index
+                   for index, chunk in enumerate(chunks)}
+        try:
+            for future in as_completed(futures):
+                result, _, snapshot = future.result()
+                registry.merge(snapshot)
+                yield futures[future], result
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def run(self, **initial):
+        initial.setdefault("deadline", Deadline(self.time_budget))
+        initial.setdefault("progress", Progress())
+        deadline = initial["deadline"]
+        progress = initial["progress"]
+        self._check_graph(initial)
+        results = dict(initial)
+        timings = {}
+        errors = {}
+        pending = {name: stage for name, stage in self.stages.items() if name not in initial}
+        running = {}
+        failed = False
+        abandoned = False
+
+        threads, cpu_pool, owned = self._executors()
+        results["cpu_map"] = partial(self._cpu_map, cpu_pool)
+        try:
+            while pending or running:
+                ready = [s for s in pending.values() if all(i in results for i in s.inputs)]
+                for stage in ready:
+                    del pending[stage.name]
+                    kwargs = {i: results[i] for i in stage.inputs}
+                    logging.info(f"Starting stage '{stage.name}'")
+                    progress.stage(stage.name, stage.label, "started")
+                    if self.profiler is not None:
+                        func = partial(self.profiler.run_stage, stage.name, stage.func)
+                        future = threads.submit(_timed_call, func, kwargs)
+                    elif stage.kind == "cpu" and cpu_pool is not None:
+                        future = cpu_pool.submit(_timed_call_in_process, stage.func, kwargs)
+                    elif stage.kind == "cpu":
+                        future = threads.submit(_timed_call, partial(_serialized, stage.func), kwargs)
+                    else:
+                        future = threads.submit(_timed_call, stage.func, kwargs)
+                    running[future] = stage
+
+                if not running:
+                    raise ValueError(f"Pipeline has a dependency cycle among: {list(pending)}")
+
+                optional_running = any(stage.optional for stage in running.values())
+                timeout = deadline.remaining() if deadline.bounded and optional_running else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Out of time: stop waiting for optional stages
+                    for future, stage in list(running.items()):
+                        if stage.optional:
+                            del running[future]
+                            future.cancel()
+                            abandoned = True
+                            logging.warning(f"Optional stage '{stage.name}' abandoned at the time budget")
+                            progress.stage(stage.name, stage.label, "abandoned")
+                            results[stage.name] = None
+                            errors[stage.name] = DeadlineExceeded(f"'{stage.name}' did not finish within the time budget")
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        results[stage.name], timings[stage.name], snapshot = future.result()
+                        if snapshot:
+                            registry.merge(snapshot)
+                        logging.info(f"Finished stage '{stage.name}' in {timings[stage.name]:.2f}s")
+                        progress.stage(stage.name, stage.label, "finished", timings[stage.name])
+                    except Exception as e:
+                        progress.stage(stage.name, stage.label, "failed")
+                        if not stage.optional:
+                            failed = True
+                            raise PipelineError(stage.name, stage.label, e) from e
+                        logging.warning(f"Optional stage '{stage.name}' failed: {e}")
+                        results[stage.name] = None
+                        errors[stage.name] = e
+        finally:
+            # On failure (or after abandoning late stages) don't block the
+            # caller on stages whose output is no longer needed
+            for future in running:
+                future.cancel()
+            for pool in owned:
+                pool.shutdown(wait=not (failed or abandoned), cancel_futures=True)
+
+        return PipelineResult(results, timings, errors)
+
+
+def _collect(data_collector, topic, deadline, progress, subreddit_name, post_limit, comment_limit, budget_share,
+             sampler=None):
+    # Collection gets a share of the run's budget; the rest is kept for scoring, charts and the report
+    data = data_collector.collect_data(
+        topic,
+        subreddit_name=subreddit_name,
+        post_limit=post_limit,
+        comment_limit=comment_limit,
+        deadline=deadline.share(budget_share),
+        progress=progress
+    )
+    if not data:
+        if getattr(data, "partial", False):
+            raise NoDataError(f"No data found for topic '{topic}' ({data.reason}).")
+        raise NoDataError(f"No data found for topic '{topic}'.")
+    if sampler is not None:
+        # Everything downstream (dedup, scoring, charts, report) sees only the sample
+        sample = sampler.sample(data)
+        if len(sample) < len(data):
+            logging.info(f"Sampling mode: scoring {len(sample)} of {len(data)} collected items")
+        return sample
+    return data
+
+
+def _collection_status(data):
+    sampled = hasattr(data, "population")
+    return {
+        "items": data.population_size if sampled else len(data),
+        "sampled": len(data) if sampled else None,
+        "partial": getattr(data, "partial", False),
+        "reason": getattr(data, "reason", None),
+        "seconds": getattr(data, "seconds", None),
+        "text_cleaned": getattr(data, "text_cleaned", False),
+    }
+
+
+# Scoring is split into at most this many chunks (of at least SCORE_CHUNK_MIN
+# items): enough to keep every worker busy and report progress as it goes
+SCORE_CHUNKS = 16
+SCORE_CHUNK_MIN = 500
+
+
+def _score(sentiment_analyzer, cpu_map, progress, items):
+    """Score `items` in chunks over the process pool, reporting the running count and mean."""
+    size = max(SCORE_CHUNK_MIN, -(-len(items) // SCORE_CHUNKS))
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    scored = [None] * len(chunks)
+    count, total = 0, 0.0
+    progress.update(to_score=len(items))
+    for index, rows in cpu_map(sentiment_analyzer.analyze, chunks):
+        scored[index] = rows
+        count += len(rows)
+        total += sum(row["combined_compound"] for row in rows)
+        progress.add(scored=len(chunks[index]))
+        if count:
+            progress.update(scored_mean=round(total / count, 4))
+    return [row for rows in scored for row in rows]
+
+
+def _analyze(sentiment_analyzer, data, cpu_map, progress):
+    return pd.DataFrame(_score(sentiment_analyzer, cpu_map, progress, data))
+
+
+def _deduplicate(deduplicator, data):
+    return deduplicator.find([item.get("text", "") for item in data])
+
+
+def _analyze_unique(sentiment_analyzer, drop_duplicates, data, dedup, cpu_map, progress):
+    """Score each unique text once; returns (scored frame, dedup stats)."""
+    rows, scoring_seconds, saved = score_unique(
+        sentiment_analyzer, data, dedup, analyze=partial(_score, sentiment_analyzer, cpu_map, progress)
+    )
+    df = pd.DataFrame(rows)
+    if drop_duplicates and not df.empty:
+        df = df[df["duplicate_of"].isna()].reset_index(drop=True)
+    stats = {
+        "items": len(data),
+        "unique": len(data) - dedup.duplicates,
+        "exact_duplicates": dedup.exact,
+        "near_duplicates": dedup.near,
+        "dedup_ratio": dedup.ratio,
+        "dedup_seconds": dedup.seconds,
+        "scoring_seconds": scoring_seconds,
+        "scoring_seconds_saved": saved,
+        "duplicates_dropped": drop_duplicates,
+    }
+    logging.info(f"Deduplication: {dedup.duplicates}/{len(data)} items were duplicates ({dedup.ratio:.1%}; "
+                 f"{dedup.exact} exact, {dedup.near} near); ~{saved:.2f}s of scoring saved")
+    return df, stats
+
+
+def _sampling(confidence, data, sentiment_df):
+    return estimate(sentiment_df, data, confidence)
+
+
+def _pick(index, scored):
+    return scored[index]
+
+
+def _save_results(output_dir, sentiment_df, topic):
+    # Parquet is the canonical results file; CSV is only produced on export
+    results_path = write_results(sentiment_df, results_path_for(output_dir, topic))
+    logging.info(f"Sentiment results saved to {results_path}")
+    return results_path
+
+
+def _chart_data(output_dir, sentiment_df, topic):
+    return write_chart_data(sentiment_df, chart_data_path_for(output_dir, topic))
+
+
+def _render(viz_generator, method, output_dir, sentiment_df, topic):
+    # Chart methods add helper columns to the frame they are given, so hand
+    # them a copy to keep the shared scored frame (and the CSV) untouched
+    return getattr(viz_generator, method)(sentiment_df.copy(), topic, output_path=output_dir)
+
+
+def _wordcloud(viz_generator, output_dir, sentiment_df, topic):
+    return viz_generator.generate_wordcloud(sentiment_df["text"], topic, output_path=output_dir)
+
+
+def _report(report_generator, output_dir, sentiment_df, topic, topic_image, collection, plots=None, wordcloud=None,
+            sentiment_counts=None, heatmap=None, pie=None, dedup_stats=None, sampling=None):
+    return report_generator.generate_summary_report(
+        sentiment_df.copy(),
+        topic,
+        (plots or {}).get('distribution'),
+        wordcloud,
+        sentiment_counts,
+        heatmap_path=heatmap,
+        pie_path=pie,
+        topic_image_path=topic_image,
+        output_dir=output_dir,
+        dedup_stats=dedup_stats,
+        sampling=sampling,
+        collection_status=collection,
+        text_cleaned=collection["text_cleaned"]
+    )
+
+
+def _store(results_store, output_dir, topic, sentiment_df):
+    # The run directory's name is the run id
+    return results_store.save_run(os.path.basename(output_dir), topic, sentiment_df)
+
+
+def _manifest(output_dir, topic, sentiment_df, **artifacts):
+    return write_manifest(output_dir, topic, artifacts, items=len(sentiment_df))
+
+
+def build_analysis_pipeline(data_collector, sentiment_analyzer, viz_generator, report_generator, image_search, config,
+                            profiler=None, thread_pool=None, process_pool=None, results_store=None):
+    """
+    Wire the collector, analyzer, chart, image and report components into the
+    standard analysis graph. Run it with
+    `pipeline.run(topic=..., output_dir=run_directory.path)`; every artifact
+    of the run is written into `output_dir`, and manifest.json last. With a
+    `results_store`, the scored items are also saved to it (best effort).
+    """
+    pipeline = Pipeline(max_workers=config.PIPELINE_MAX_WORKERS, use_processes=config.PIPELINE_USE_PROCESSES,
+                        profiler=profiler, thread_pool=thread_pool, process_pool=process_pool,
+                        time_budget=config.ANALYSIS_TIME_BUDGET_SECONDS)
+    pipeline.add_stage(
+        "data",
+        partial(_collect, data_collector,
+                subreddit_name=config.DEFAULT_SUBREDDIT,
+                post_limit=config.DEFAULT_POST_LIMIT,
+                comment_limit=config.DEFAULT_COMMENT_LIMIT,
+                budget_share=config.COLLECTION_BUDGET_SHARE,
+                sampler=Sampler(config.SAMPLE_SIZE, config.SAMPLE_STRATA) if config.SAMPLE_SIZE else None),
+        inputs=("topic", "deadline", "progress"), label="Data collection")
+    pipeline.add_stage("collection", _collection_status, inputs=("data",), label="Data collection")
+    # The topic image only needs the topic, so it is fetched while Reddit is being searched
+    pipeline.add_stage("topic_image", image_search.search_and_download_image,
+                       inputs=("topic", "output_dir"), optional=True, label="Image search")
+    report_inputs = ("collection",)
+    if config.DEDUP_ENABLED:
+        # Crossposts, bot comments and copy-pasted replies are scored once
+        # and the scores fanned back out to every copy
+        pipeline.add_stage("dedup", partial(_deduplicate, Deduplicator(threshold=config.DEDUP_THRESHOLD)),
+                           inputs=("data",), kind="cpu", label="Deduplication")
+        # Scoring is spread over the process pool by the stage itself (cpu_map)
+        pipeline.add_stage("scored", partial(_analyze_unique, sentiment_analyzer, config.DEDUP_DROP_DUPLICATES),
+                           inputs=("data", "dedup", "cpu_map", "progress"), label="Sentiment analysis")
+        pipeline.add_stage("sentiment_df", partial(_pick, 0), inputs=("scored",), label="Sentiment analysis")
+        pipeline.add_stage("dedup_stats", partial(_pick, 1), inputs=("scored",), label="Sentiment analysis")
+        report_inputs += ("dedup_stats",)
+    else:
+        pipeline.add_stage("sentiment_df", partial(_analyze, sentiment_analyzer),
+                           inputs=("data", "cpu_map", "progress"), label="Sentiment analysis")
+    if config.SAMPLE_SIZE:
+        pipeline.add_stage("sampling", partial(_sampling, config.SAMPLE_CONFIDENCE),
+                           inputs=("data", "sentiment_df"), label="Sampling estimates")
+        report_inputs += ("sampling",)
+    pipeline.add_stage("results_path", _save_results,
+                       inputs=("output_dir", "sentiment_df", "topic"), label="Saving results")
+    # The web page draws its charts from this small JSON in the browser
+    pipeline.add_stage("chart_data", _chart_data,
+                       inputs=("output_dir", "sentiment_df", "topic"), label="Chart data")
+    artifact_stages = ("topic_image",)
+    if config.RENDER_CHART_PNGS:
+        # PNGs are only needed for the markdown report and static fallback
+        for name, method in [
+            ("plots", "plot_sentiment_analysis"),
+            ("sentiment_counts", "plot_sentiment_counts"),
+            ("heatmap", "plot_sentiment_heatmap"),
+            ("pie", "plot_sentiment_distribution_pie"),
+        ]:
+            pipeline.add_stage(name, partial(_render, viz_generator, method),
+                               inputs=("output_dir", "sentiment_df", "topic"), kind="cpu", label="Visualization")
+        pipeline.add_stage("wordcloud", partial(_wordcloud, viz_generator),
+                           inputs=("output_dir", "sentiment_df", "topic"), kind="cpu", label="Visualization")
+        artifact_stages += ("plots", "wordcloud", "sentiment_counts", "heatmap", "pie")
+    if results_store is not None:
+        pipeline.add_stage("run_id", partial(_store, results_store),
+                           inputs=("output_dir", "topic", "sentiment_df"), optional=True, label="Storing results")
+    pipeline.add_stage("report", partial(_report, report_generator),
+                       inputs=("output_dir", "sentiment_df", "topic") + artifact_stages + report_inputs,
+                       label="Report generation")
+    pipeline.add_stage("manifest", _manifest,
+                       inputs=("output_dir", "topic", "sentiment_df", "results_path", "chart_data", "report")
+                       + artifact_stages,
+                       label="Writing manifest")
+    return pipeline
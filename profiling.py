@@ -0,0 +1,75 @@
+import io
+import os
+import threading
+import cProfile
+import pstats
+import logging
+import tracemalloc
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def profile_dir_for(run_dir):
+    """Directory that holds a run's profiles: inside the run, so they are swept with it."""
+    return os.path.join(run_dir, "profiles")
+
+
+# tracemalloc is process-wide: a stage of one profiled run stopping it would
+# break the snapshot of another's, so profiled stages run one at a time
+_tracing_lock = threading.Lock()
+
+
+class StageProfiler:
+    """
+    Runs pipeline stages under cProfile and tracemalloc and writes, per stage,
+    `<stage>.pstats` (load with pstats / snakeviz) and `<stage>.tracemalloc`
+    (load with tracemalloc.Snapshot.load). Only constructed when profiling was
+    requested, so normal runs pay nothing for it.
+    """
+
+    def __init__(self, output_dir, top_n=10, traceback_frames=10):
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.traceback_frames = traceback_frames
+        self.summaries = {}
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def run_stage(self, stage, func, **kwargs):
+        with _tracing_lock:
+            profiler = cProfile.Profile()
+            tracemalloc.start(self.traceback_frames)
+            profiler.enable()
+            try:
+                return func(**kwargs)
+            finally:
+                profiler.disable()
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self._save(stage, profiler, snapshot, peak)
+
+    def _save(self, stage, profiler, snapshot, peak):
+        pstats_path = os.path.join(self.output_dir, f"{stage}.pstats")
+        profiler.dump_stats(pstats_path)
+        snapshot.dump(os.path.join(self.output_dir, f"{stage}.tracemalloc"))
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top_n)
+        top_allocations = "\n".join(str(s) for s in snapshot.statistics("lineno")[:self.top_n])
+        self.summaries[stage] = {
+            "hot_functions": buffer.getvalue(),
+            "top_allocations": top_allocations,
+            "peak_traced_bytes": peak,
+        }
+
+    def format_report(self):
+        sections = []
+        for stage, summary in self.summaries.items():
+            sections.append(
+                f"===== Stage '{stage}' (peak traced memory {summary['peak_traced_bytes'] / 1024 / 1024:.1f} MiB) =====\n"
+                f"{summary['hot_functions'].strip()}\n\n"
+                f"Top allocations:\n{summary['top_allocations']}\n"
+            )
+        sections.append(f"Profiles written to {self.output_dir}")
+        return "\n".join(sections)
@@ -0,0 +1,216 @@
+import json
+import time
+import itertools
+import threading
+from collections import deque
+from metrics import registry
+
+open_streams = registry.gauge("sentinent_progress_streams", "Progress event streams currently held open.")
+progress_responses = registry.counter(
+    "sentinent_progress_responses_total", "Progress requests by how they were answered: stream (held open) or poll."
+)
+
+
+class Progress:
+    """
+    Where a run reports how far it has got. This one discards everything,
+    so the pipeline and collector can report unconditionally; a
+    ProgressBroker hands out reporters that publish to watchers. Only
+    thread ("io") stages should take it: reporters do not cross processes.
+    """
+
+    def stage(self, name, label, status, seconds=None):
+        """A stage `status` change: started, finished, failed or abandoned."""
+
+    def add(self, **counts):
+        """Increase running counters, e.g. add(collected=1)."""
+
+    def update(self, **values):
+        """Set running values, e.g. update(scored_mean=0.12)."""
+
+    def finish(self, error=None):
+        """The run is over; `error` is a message if it failed."""
+
+
+def format_event(event_id, event, data):
+    """One Server-Sent Events frame."""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class ProgressChannel:
+    """
+    The events of one run, each encoded once however many watchers read it.
+    Only the last `history` events are kept; every "progress" event carries
+    the full counters, so a watcher that missed some loses nothing.
+    """
+
+    def __init__(self, ids, history=100):
+        self._ids = ids
+        self._events = deque(maxlen=history)
+        self._changed = threading.Condition()
+        self.closed_at = None
+
+    @property
+    def closed(self):
+        return self.closed_at is not None
+
+    def publish(self, event, data, final=False):
+        with self._changed:
+            if self.closed:
+                return
+            event_id = next(self._ids)
+            self._events.append((event_id, format_event(event_id, event, data)))
+            if final:
+                self.closed_at = time.monotonic()
+            self._changed.notify_all()
+
+    def events_after(self, last_id, timeout=0.0):
+        """
+        Frames newer than `last_id`, waiting up to `timeout` seconds for one
+        if there are none yet. Returns (frames, last id, closed).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.closed or (self._events and self._events[-1][0] > last_id), timeout)
+            frames = [frame for event_id, frame in self._events if event_id > last_id]
+            if self._events:
+                last_id = max(last_id, self._events[-1][0])
+            return frames, last_id, self.closed
+
+
+class ProgressReporter(Progress):
+    """
+    Publishes a run's progress to its channel. Counter changes are
+    coalesced to at most one "progress" event per `interval` seconds;
+    stage changes flush them first so the counts never lag a stage.
+    """
+
+    def __init__(self, channel, interval=0.25, clock=time.monotonic):
+        self.channel = channel
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._values = {}
+        self._dirty = False
+        self._published = float("-inf")
+
+    def _flush(self, force=False):
+        # Called with the lock held
+        now = self._clock()
+        if self._dirty and (force or now - self._published >= self.interval):
+            self.channel.publish("progress", dict(self._values))
+            self._published = now
+            self._dirty = False
+
+    def stage(self, name, label, status, seconds=None):
+        with self._lock:
+            self._flush(force=True)
+            data = {"stage": name, "label": label, "status": status}
+            if seconds is not None:
+                data["seconds"] = round(seconds, 3)
+            self.channel.publish("stage", data)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, amount in counts.items():
+                self._values[name] = self._values.get(name, 0) + amount
+            self._dirty = True
+            self._flush()
+
+    def update(self, **values):
+        with self._lock:
+            self._values.update(values)
+            self._dirty = True
+            self._flush()
+
+    def finish(self, error=None):
+        with self._lock:
+            self._flush(force=True)
+            self.channel.publish("done", {"ok": error is None, "error": error}, final=True)
+
+
+class ProgressBroker:
+    """
+    Progress channels of running analyses, by analysis key. Starting a run
+    replaces any older channel for its key; finished channels are kept for
+    `linger_seconds` so late watchers still see the outcome. Event ids
+    increase across runs, so a watcher resuming with Last-Event-ID from an
+    earlier run still receives all of a newer run's events.
+    """
+
+    def __init__(self, history=100, linger_seconds=300, interval=0.25):
+        self.history = history
+        self.linger_seconds = linger_seconds
+        self.interval = interval
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def _expire(self):
+        # Called with the lock held
+        now = time.monotonic()
+        for key, channel in list(self._channels.items()):
+            if channel.closed and now - channel.closed_at > self.linger_seconds:
+                del self._channels[key]
+
+    def reporter(self, key):
+        """A reporter for a new run under `key`."""
+        channel = ProgressChannel(self._ids, self.history)
+        with self._lock:
+            self._expire()
+            self._channels[key] = channel
+        return ProgressReporter(channel, self.interval)
+
+    def channel(self, key):
+        with self._lock:
+            self._expire()
+            return self._channels.get(key)
+
+
+class StreamLimiter:
+    """
+    Caps how many watchers may hold a response open, since each one holds
+    a server thread. Beyond the cap watchers are answered straight away
+    and reconnect after the `retry` delay, so they poll instead.
+    """
+
+    def __init__(self, max_streams=32):
+        self._slots = threading.BoundedSemaphore(max_streams) if max_streams > 0 else None
+
+    def acquire(self):
+        return self._slots is not None and self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+
+def event_stream(channel, last_id, limiter, hold_seconds=25.0, retry_ms=2000, keepalive_seconds=10.0):
+    """
+    The body of one progress response: every event after `last_id`, then,
+    if the limiter grants a slot, new events as they happen for up to
+    `hold_seconds`. The stream ends when the run does; otherwise the
+    browser's EventSource reconnects with Last-Event-ID after `retry_ms`.
+    """
+    yield f"retry: {retry_ms}\n\n"
+    if channel is None:
+        # The run has not started yet (or is long gone)
+        progress_responses.inc(mode="poll")
+        return
+    frames, last_id, closed = channel.events_after(last_id)
+    yield from frames
+    if closed or not limiter.acquire():
+        progress_responses.inc(mode="poll")
+        return
+    progress_responses.inc(mode="stream")
+    open_streams.inc()
+    try:
+        ends = time.monotonic() + hold_seconds
+        while not closed:
+            remaining = ends - time.monotonic()
+            if remaining <= 0:
+                break
+            frames, last_id, closed = channel.events_after(last_id, min(remaining, keepalive_seconds))
+            # A comment line keeps proxies from closing an idle stream
+            yield "".join(frames) if frames else ": keepalive\n\n"
+    finally:
+        open_streams.inc(-1)
+        limiter.release()
@@ -0,0 +1,124 @@
+import time
+import threading
+from metrics import registry
+from deadline import Deadline, DeadlineExceeded, call_with_deadline
+
+throttled = registry.counter(
+    "sentinent_rate_limited_responses_total", "Requests the remote API rejected as over its rate limit, by client."
+)
+backoff_seconds = registry.counter(
+    "sentinent_rate_limit_backoff_seconds_total", "Time spent backing off after rate-limit responses, by client."
+)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: holds up to `capacity` tokens and refills
+    `rate` tokens per second, so it allows bursts of `capacity` and a
+    sustained `rate` per second. Thread-safe.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if available; never blocks."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens=1):
+        """Seconds until `tokens` would be available (0 if they are now)."""
+        with self._lock:
+            self._refill()
+            missing = tokens - self._tokens
+            if missing <= 0:
+                return 0.0
+            return missing / self.rate if self.rate > 0 else float("inf")
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until `tokens` are taken; returns False if `timeout` runs out first."""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            wait = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(wait)
+
+    def is_full(self):
+        with self._lock:
+            self._refill()
+            return self._tokens >= self.capacity
+
+
+class RequestScheduler:
+    """
+    Paces calls to a rate-limited API across threads. Every call takes a
+    token from one shared `bucket`; when the server still answers "too
+    many requests" (`retry_after(error)` returns a delay instead of None),
+    all callers pause for that delay, or an exponential backoff when the
+    server gave none, and the call is retried up to `max_retries` times.
+    """
+
+    def __init__(self, bucket, retry_after, max_retries=3, backoff=1.0, max_backoff=60.0, name="api"):
+        self.bucket = bucket
+        self.retry_after = retry_after
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.name = name
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def call(self, deadline, func, *args, **kwargs):
+        """Run `func` once a request slot is free, within `deadline` (a Deadline or None)."""
+        deadline = deadline or Deadline()
+        attempt = 0
+        while True:
+            self._wait_for_slot(deadline)
+            try:
+                return call_with_deadline(deadline, func, *args, **kwargs)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                delay = self.retry_after(e)
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                delay = delay or min(self.max_backoff, self.backoff * 2 ** attempt)
+                attempt += 1
+                throttled.inc(client=self.name)
+                self._pause(delay)
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_for_slot(self, deadline):
+        while True:
+            with self._lock:
+                pause = self._paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            if pause > deadline.remaining():
+                raise DeadlineExceeded("rate-limit backoff outlasts the time budget")
+            backoff_seconds.inc(pause, client=self.name)
+            time.sleep(pause)
+        if not self.bucket.acquire(timeout=deadline.remaining() if deadline.bounded else None):
+            raise DeadlineExceeded("no request slot free within the time budget")
@@ -0,0 +1,76 @@
+import io
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from metrics import registry
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+warm_up_seconds = registry.histogram(
+    "sentinent_renderer_warm_up_seconds", "Time a renderer process spent on imports, fonts and figure templates."
+)
+
+# Set in each worker process by warm_up()
+_warmed_in = None
+
+
+def warm_up():
+    """
+    Process initializer for the pipeline's CPU pool: pays the one-time
+    costs of the first chart up front. It forces the Agg backend, imports
+    seaborn and wordcloud, resolves the fonts charts use (building the
+    font cache on the very first run), and draws and saves every figure
+    template once so each chart kind starts from a laid-out figure.
+    """
+    global _warmed_in
+    started = time.perf_counter()
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib import font_manager
+    import pandas as pd
+    from visualization_generator import templates, FIGURE_LAYOUTS
+
+    for weight in ("normal", "bold"):
+        font_manager.findfont(font_manager.FontProperties(weight=weight))
+    for kind in FIGURE_LAYOUTS:
+        fig, axes = templates.get(kind)
+        axes[0].set_title(kind, fontsize=16)
+        axes[0].plot(pd.to_datetime(["2024-01-01", "2024-01-02"]), [0, 1], marker="o")
+        fig.savefig(io.BytesIO(), format="png", dpi=30, bbox_inches="tight")
+        templates.get(kind)
+    templates.wordcloud(width=800, height=400, background_color="white").generate("warm up renderer")
+    _warmed_in = time.perf_counter() - started
+    logging.info(f"Renderer process {os.getpid()} warmed up in {_warmed_in:.2f}s")
+
+
+def _ready():
+    # Stages reset the worker's metrics, so the warm-up time is reported back to the parent instead
+    return os.getpid(), _warmed_in
+
+
+def _recorder():
+    reported = set()
+
+    def record(future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        pid, seconds = future.result()
+        if seconds is not None and pid not in reported:
+            reported.add(pid)
+            warm_up_seconds.observe(seconds)
+    return record
+
+
+def renderer_pool(max_workers, mp_context=None):
+    """
+    A ProcessPoolExecutor whose workers run warm_up() as they start. All
+    `max_workers` processes are started right away (in the background),
+    so the first analysis finds them ready instead of forking and warming
+    them on its critical path. Share one pool across runs.
+    """
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, initializer=warm_up)
+    record = _recorder()
+    for _ in range(max_workers):
+        pool.submit(_ready).add_done_callback(record)
+    return pool
@@ -2,6 +2,10 @@ import pandas as pd
 import os
 import requests
 from urllib.parse import quote
+from metrics import timed
+from artifacts import atomic_write
+from text_cleaning import clean_texts
+from streaming_stats import SentimentSketch
 
 class ReportGenerator:
     def __init__(self, output_dir="."):
@@ -20,48 +24,26 @@ class ReportGenerator:
 
     def calculate_sentiment_statistics(self, df):
         """Calculate detailed positive and negative sentiment statistics"""
-        def categorize_sentiment(score):
-            if score >= 0.05:
-                return "Positive"
-            elif score <= -0.05:
-                return "Negative"
-            else:
-                return "Neutral"
-
-        df["sentiment_category"] = df["combined_compound"].apply(categorize_sentiment)
-        
-        total_count = len(df)
-        positive_count = len(df[df["sentiment_category"] == "Positive"])
-        negative_count = len(df[df["sentiment_category"] == "Negative"])
-        neutral_count = len(df[df["sentiment_category"] == "Neutral"])
-        
-        positive_percentage = (positive_count / total_count) * 100
-        negative_percentage = (negative_count / total_count) * 100
-        neutral_percentage = (neutral_count / total_count) * 100
-        
-        avg_positive_score = df[df["sentiment_category"] == "Positive"]["combined_compound"].mean() if positive_count > 0 else 0
-        avg_negative_score = df[df["sentiment_category"] == "Negative"]["combined_compound"].mean() if negative_count > 0 else 0
-        avg_neutral_score = df[df["sentiment_category"] == "Neutral"]["combined_compound"].mean() if neutral_count > 0 else 0
-        
-        return {
-            "total_count": total_count,
-            "positive_count": positive_count,
-            "negative_count": negative_count,
-            "neutral_count": neutral_count,
-            "positive_percentage": positive_percentage,
-            "negative_percentage": negative_percentage,
-            "neutral_percentage": neutral_percentage,
-            "avg_positive_score": avg_positive_score,
-            "avg_negative_score": avg_negative_score,
-            "avg_neutral_score": avg_neutral_score
-        }
-
-    def generate_summary_report(self, df, topic, plot_path, wordcloud_path, sentiment_counts_path, heatmap_path=None, pie_path=None, topic_image_path=None):
-        # Clean text column to ensure UTF-8 compatibility
-        df['text'] = df['text'].apply(lambda x: x.encode('utf-8', errors='ignore').decode('utf-8') if isinstance(x, str) else x)
-        
+        return SentimentSketch().update(df).category_stats()
+
+    @timed("generate_summary_report", items=lambda args, result: len(args[1]) if args[1] is not None else None)
+    def generate_summary_report(self, df, topic, plot_path, wordcloud_path, sentiment_counts_path, heatmap_path=None, pie_path=None, topic_image_path=None, output_dir=None, dedup_stats=None, collection_status=None, text_cleaned=False, sketch=None, sampling=None):
+        """
+        Write the markdown report. Every figure comes from a SentimentSketch:
+        pass `sketch` (with `df=None`) to report on data that was summarised
+        batch by batch and never held in memory; otherwise one is built from
+        `df`. With `sampling` (sampling.estimate) the report notes that the
+        figures describe a sample and adds estimates for the whole collection
+        with confidence intervals.
+        """
+        if sketch is None:
+            # Clean text column to ensure UTF-8 compatibility, unless the collector already did
+            if not text_cleaned:
+                df['text'] = clean_texts(df['text'])
+            sketch = SentimentSketch.from_frame(df)
+
         # Calculate detailed sentiment statistics
-        sentiment_stats = self.calculate_sentiment_statistics(df)
+        sentiment_stats = sketch.category_stats()
         
         report_content = f"# Comprehensive Sentiment Analysis Report for {topic}\n\n"
         
@@ -69,6 +51,20 @@ class ReportGenerator:
         if topic_image_path and os.path.exists(topic_image_path):
             report_content += f"![Topic Image]({os.path.basename(topic_image_path)})\n\n"
         
+        if collection_status and collection_status["partial"]:
+            report_content += f"> **Partial results:** data collection stopped early ({collection_status['reason']}) "
+            report_content += f"after gathering {collection_status['items']} items"
+            if collection_status["seconds"] is not None:
+                report_content += f" in {collection_status['seconds']:.1f}s"
+            report_content += ". The figures below cover only the content collected before that point.\n\n"
+
+        if sampling:
+            report_content += f"> **Sampled:** {sampling['sample']} of {sampling['population']} collected items were scored"
+            if sampling["strata"]:
+                report_content += f" (stratified by {', '.join(sampling['strata'])})"
+            report_content += ". The statistics below describe the sample; section 1.6 estimates the figures for every "
+            report_content += f"collected item with {sampling['confidence'] * 100:.0f}% confidence intervals.\n\n"
+
         report_content += "## Executive Summary\n\n"
         report_content += f"This comprehensive sentiment analysis report examines {sentiment_stats['total_count']} pieces of content related to '{topic}'. "
         report_content += f"The analysis reveals that {sentiment_stats['positive_percentage']:.1f}% of the content expresses positive sentiment, "
@@ -88,12 +84,12 @@ class ReportGenerator:
         report_content += f"- **Average Neutral Score**: {sentiment_stats['avg_neutral_score']:.3f}\n\n"
         
         report_content += "### 1.3 Statistical Summary of All Sentiment Metrics\n\n"
-        stats = df[["vader_neg", "vader_neu", "vader_pos", "vader_compound", "textblob_polarity", "combined_compound"]].describe().to_markdown()
+        stats = sketch.describe().to_markdown()
         report_content += f"{stats}\n\n"
 
         # Interpretation of statistics
         report_content += "### 1.4 Statistical Interpretation\n\n"
-        overall_sentiment = df["combined_compound"].mean()
+        overall_sentiment = sketch.moments["combined_compound"].mean
         if overall_sentiment > 0.1:
             sentiment_interpretation = "predominantly positive"
         elif overall_sentiment < -0.1:
@@ -103,7 +99,7 @@ class ReportGenerator:
         
         report_content += f"The overall sentiment towards '{topic}' is **{sentiment_interpretation}** with an average combined compound score of {overall_sentiment:.3f}. "
         
-        sentiment_variance = df["combined_compound"].var()
+        sentiment_variance = sketch.moments["combined_compound"].variance
         if sentiment_variance > 0.3:
             report_content += f"The high variance ({sentiment_variance:.3f}) indicates diverse opinions and polarized views on this topic.\n\n"
         elif sentiment_variance < 0.1:
@@ -111,17 +107,43 @@ class ReportGenerator:
         else:
             report_content += f"The moderate variance ({sentiment_variance:.3f}) indicates a reasonable spread of opinions on this topic.\n\n"
 
+        if dedup_stats and dedup_stats["items"]:
+            report_content += "### 1.5 Duplicate Content\n\n"
+            report_content += f"- **Collected Items**: {dedup_stats['items']} ({dedup_stats['unique']} unique texts)\n"
+            report_content += f"- **Exact Duplicates**: {dedup_stats['exact_duplicates']}\n"
+            report_content += f"- **Near Duplicates**: {dedup_stats['near_duplicates']}\n"
+            report_content += f"- **Duplicate Ratio**: {dedup_stats['dedup_ratio'] * 100:.1f}%\n"
+            report_content += f"- **Scoring Time Saved**: ~{dedup_stats['scoring_seconds_saved']:.2f}s "
+            report_content += f"(scored unique texts in {dedup_stats['scoring_seconds']:.2f}s, detection took {dedup_stats['dedup_seconds']:.2f}s)\n\n"
+            if dedup_stats["duplicates_dropped"]:
+                report_content += "Duplicates (crossposts, bot and copy-pasted comments) were excluded from all statistics above.\n\n"
+            else:
+                report_content += "Duplicates (crossposts, bot and copy-pasted comments) are included in the statistics above with the score of their first occurrence.\n\n"
+
+        if sampling:
+            confidence = f"{sampling['confidence'] * 100:.0f}%"
+            report_content += "### 1.6 Sampling Estimates\n\n"
+            report_content += f"| Metric | Estimate | {confidence} Confidence Interval |\n|:--|--:|--:|\n"
+            for key, label in [("positive_percentage", "Positive content"), ("negative_percentage", "Negative content"),
+                               ("neutral_percentage", "Neutral content")]:
+                interval = sampling[key]
+                report_content += f"| {label} | {interval['estimate']:.1f}% | {interval['low']:.1f}% – {interval['high']:.1f}% |\n"
+            interval = sampling["mean_combined_compound"]
+            report_content += f"| Mean combined compound | {interval['estimate']:.3f} | {interval['low']:.3f} – {interval['high']:.3f} |\n\n"
+            report_content += f"Estimated from {sampling['sample']} scored items out of {sampling['population']} collected; "
+            report_content += "intervals are normal approximations for a stratified sample, with the finite population correction.\n\n"
+
         report_content += "## 2. Content Analysis by Sentiment Category\n\n"
 
         report_content += "### 2.1 Top 5 Most Positive Content\n\n"
-        positive_texts = df.nlargest(5, "combined_compound")[["text", "combined_compound", "type", "subreddit"]].to_markdown(index=False)
+        positive_texts = sketch.most_positive.frame().to_markdown(index=False)
         report_content += f"{positive_texts}\n\n"
         
         report_content += "**Analysis**: The most positive content typically features enthusiastic language, success stories, or expressions of satisfaction. "
         report_content += "These posts and comments often use words like 'great', 'love', 'excited', and 'amazing', contributing to their high sentiment scores.\n\n"
 
         report_content += "### 2.2 Top 5 Most Negative Content\n\n"
-        negative_texts = df.nsmallest(5, "combined_compound")[["text", "combined_compound", "type", "subreddit"]].to_markdown(index=False)
+        negative_texts = sketch.most_negative.frame().to_markdown(index=False)
         report_content += f"{negative_texts}\n\n"
         
         report_content += "**Analysis**: The most negative content often contains criticism, complaints, or expressions of frustration. "
@@ -129,7 +151,7 @@ class ReportGenerator:
 
         # Content type analysis
         report_content += "### 2.3 Sentiment by Content Type\n\n"
-        type_analysis = df.groupby('type')['combined_compound'].agg(['mean', 'count', 'std']).round(3)
+        type_analysis = sketch.by_type.table().round(3)
         report_content += type_analysis.to_markdown()
         report_content += "\n\n"
         
@@ -145,7 +167,7 @@ class ReportGenerator:
 
         # Subreddit analysis
         report_content += "### 2.4 Sentiment by Community (Subreddit)\n\n"
-        subreddit_analysis = df.groupby('subreddit')['combined_compound'].agg(['mean', 'count', 'std']).round(3)
+        subreddit_analysis = sketch.by_subreddit.table().round(3)
         report_content += subreddit_analysis.to_markdown()
         report_content += "\n\n"
         
@@ -210,8 +232,8 @@ class ReportGenerator:
         report_content += "---\n\n"
         report_content += f"*Report generated using advanced sentiment analysis techniques combining VADER and TextBlob methodologies. Analysis based on {sentiment_stats['total_count']} content items.*\n"
 
-        report_filename_md = os.path.join(self.output_dir, f"{topic.replace(' ', '_')}_sentiment_report.md")
-        with open(report_filename_md, "w", encoding="utf-8") as f:
+        report_filename_md = os.path.join(output_dir or self.output_dir, f"{topic.replace(' ', '_')}_sentiment_report.md")
+        with atomic_write(report_filename_md, "w", encoding="utf-8") as f:
             f.write(report_content)
         print(f"Enhanced report saved as '{report_filename_md}'")
         return report_filename_md
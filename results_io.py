@@ -0,0 +1,115 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from artifacts import atomic_path
+from metrics import timed
+
+# Low-cardinality string columns are dictionary-encoded in the file and come
+# back as pandas categoricals
+CATEGORY_COLUMNS = ["type", "subreddit"]
+COMPRESSION = "zstd"
+
+
+def results_path_for(output_dir, topic):
+    return os.path.join(output_dir, f"{topic.replace(' ', '_')}_sentiment_results.parquet")
+
+
+def _typed(df):
+    df = df.copy()
+    if "created" in df:
+        df["created"] = pd.to_datetime(df["created"], errors="coerce")
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    return df
+
+
+@timed("write_results", items=lambda args, result: len(args[0]))
+def write_results(df, path):
+    """
+    Write a scored frame as compressed Parquet with typed columns
+    (timestamps stay timestamps, type/subreddit are dictionary-encoded).
+    """
+    table = pa.Table.from_pandas(_typed(df), preserve_index=False)
+    with atomic_path(path) as tmp_path:
+        pq.write_table(table, tmp_path, compression=COMPRESSION)
+    return path
+
+
+def _widened(schema):
+    # A later chunk may have more subreddits than fit the first one's int8 dictionary indices
+    return pa.schema([
+        field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ], metadata=schema.metadata)
+
+
+class ResultsWriter:
+    """
+    Appends scored frames to one results file, a row group per frame, for
+    runs too large to hold as one frame. Use it as a context manager; the
+    file only appears under `path` once the block completes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._atomic = None
+        self._tmp_path = None
+        self._writer = None
+
+    def __enter__(self):
+        self._atomic = atomic_path(self.path)
+        self._tmp_path = self._atomic.__enter__()
+        return self
+
+    def write(self, df):
+        table = pa.Table.from_pandas(_typed(df), preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._tmp_path, _widened(table.schema), compression=COMPRESSION)
+        self._writer.write_table(table.cast(self._writer.schema))
+        self.rows += len(df)
+
+    def __exit__(self, *exc_info):
+        if self._writer is not None:
+            self._writer.close()
+        elif exc_info[0] is None:
+            pq.write_table(pa.table({}), self._tmp_path)
+        return self._atomic.__exit__(*exc_info)
+
+
+def iter_results(path, batch_size=100000, columns=None):
+    """A results file as frames of up to `batch_size` rows, decoded one at a time."""
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def read_results(path, columns=None):
+    """Read a results file back into a frame, memory-mapping it instead of copying it into buffers."""
+    return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def read_preview(path, rows=20, columns=None):
+    """The first `rows` rows, decoding only the first row group(s) needed."""
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    batches = parquet_file.iter_batches(batch_size=rows, columns=columns)
+    batch = next(batches, None)
+    if batch is None:
+        return pd.DataFrame(columns=columns or parquet_file.schema_arrow.names)
+    return batch.to_pandas()
+
+
+def export_csv(path, csv_path=None):
+    """
+    Convert a results file to CSV on demand. The CSV is written next to
+    the Parquet file and reused while it is newer than its source.
+    """
+    csv_path = csv_path or os.path.splitext(path)[0] + ".csv"
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) >= os.path.getmtime(path):
+        return csv_path
+    with atomic_path(csv_path) as tmp_path:
+        read_results(path).to_csv(tmp_path, index=False)
+    return csv_path
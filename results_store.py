@@ -0,0 +1,323 @@
+import os
+import re
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+import pandas as pd
+from metrics import timed
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    topic_key TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    mean_compound REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_topic ON runs (topic_key, created_at);
+
+CREATE TABLE IF NOT EXISTS items (
+    -- AUTOINCREMENT: ids are never reused, which the incremental FTS indexing relies on
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    topic_key TEXT NOT NULL,
+    item_id TEXT,
+    type TEXT,
+    subreddit TEXT,
+    created TEXT,
+    -- NULL when the item has no usable date, so day range filters exclude it
+    day TEXT,
+    text TEXT,
+    url TEXT,
+    vader_compound REAL,
+    textblob_polarity REAL,
+    textblob_subjectivity REAL,
+    combined_compound REAL
+);
+CREATE INDEX IF NOT EXISTS idx_items_run ON items (run_id);
+CREATE INDEX IF NOT EXISTS idx_items_topic_day ON items (topic_key, day);
+CREATE INDEX IF NOT EXISTS idx_items_topic_subreddit_day ON items (topic_key, subreddit, day);
+
+-- One row per (run, subreddit, type, day), maintained on insert so
+-- aggregate queries never scan `items`
+CREATE TABLE IF NOT EXISTS daily_aggregates (
+    topic_key TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    type TEXT NOT NULL,
+    day TEXT,
+    n INTEGER NOT NULL,
+    sum_compound REAL NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    PRIMARY KEY (topic_key, day, subreddit, type, run_id)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_day ON daily_aggregates (day);
+
+-- Full-text index over items.text. It is filled incrementally by
+-- `index_pending()` (normally from a SearchIndexer thread), so saving a run
+-- never waits for tokenization; `indexed_through` is the last items.id indexed.
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(text, content='items', content_rowid='id');
+CREATE TABLE IF NOT EXISTS fts_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    indexed_through INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO fts_state (id, indexed_through) VALUES (1, 0);
+"""
+
+ITEM_COLUMNS = ["item_id", "type", "subreddit", "created", "day", "text", "url",
+                "vader_compound", "textblob_polarity", "textblob_subjectivity", "combined_compound"]
+
+GROUP_COLUMNS = {
+    "subreddit": "subreddit",
+    "type": "type",
+    "day": "day",
+    "topic": "topic_key",
+    "run": "run_id",
+    None: "'all'",
+}
+
+# Same thresholds as the report and charts
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+
+def topic_key(topic):
+    return topic.strip().lower()
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching items containing every word."""
+    words = re.findall(r"\w+", text, flags=re.UNICODE)
+    return " ".join(f'"{word}"' for word in words)
+
+
+class ResultsStore:
+    """
+    SQLite store of every scored item, keyed by run. Writes also maintain
+    `daily_aggregates`, so `aggregate()` answers filtered summaries (e.g.
+    mean sentiment by subreddit over a date range) from a small indexed
+    table regardless of how many items are stored.
+
+    Each run is stored separately: an item seen by two runs of the same
+    topic counts twice unless the query is restricted with `run_id`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        # Set whenever new items are saved, to wake a SearchIndexer
+        self.pending = threading.Event()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @timed("store_results", items=lambda args, result: len(args[3]))
+    def save_run(self, run_id, topic, sentiment_df, created_at=None):
+        """Store a run's scored items and fold them into the daily aggregates."""
+        key = topic_key(topic)
+        created = pd.to_datetime(sentiment_df["created"], errors="coerce")
+        frame = pd.DataFrame({
+            "item_id": sentiment_df["id"].astype(str),
+            "type": sentiment_df["type"].fillna("unknown").astype(str),
+            "subreddit": sentiment_df["subreddit"].fillna("unknown").astype(str),
+            "created": created.dt.strftime("%Y-%m-%dT%H:%M:%S"),
+            "day": created.dt.strftime("%Y-%m-%d"),
+            "text": sentiment_df["text"],
+            "url": sentiment_df.get("url"),
+            "vader_compound": sentiment_df["vader_compound"],
+            "textblob_polarity": sentiment_df["textblob_polarity"],
+            "textblob_subjectivity": sentiment_df["textblob_subjectivity"],
+            "combined_compound": sentiment_df["combined_compound"],
+        })
+        frame = frame.astype(object).where(frame.notna(), None)
+
+        compound = sentiment_df["combined_compound"]
+        daily = pd.DataFrame({
+            "subreddit": frame["subreddit"],
+            "type": frame["type"],
+            "day": frame["day"],
+            "compound": compound.values,
+            "positive": (compound >= POSITIVE_THRESHOLD).astype(int).values,
+            "negative": (compound <= NEGATIVE_THRESHOLD).astype(int).values,
+        }).groupby(["subreddit", "type", "day"], as_index=False, dropna=False).agg(
+            n=("compound", "size"), sum_compound=("compound", "sum"),
+            positive=("positive", "sum"), negative=("negative", "sum"))
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, topic, topic_key, created_at, items, mean_compound) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, topic, key, created_at or datetime.now().isoformat(timespec="seconds"),
+                 len(sentiment_df), float(compound.mean()) if len(compound) else None))
+            # External-content FTS rows must be removed with the text they were indexed with
+            conn.execute(
+                "INSERT INTO items_fts (items_fts, rowid, text) SELECT 'delete', id, text FROM items "
+                "WHERE run_id = ? AND id <= (SELECT indexed_through FROM fts_state) AND text IS NOT NULL",
+                (run_id,))
+            conn.execute("DELETE FROM items WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM daily_aggregates WHERE run_id = ?", (run_id,))
+            conn.executemany(
+                f"INSERT INTO items (run_id, topic_key, {', '.join(ITEM_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(ITEM_COLUMNS))})",
+                ((run_id, key, *row) for row in frame[ITEM_COLUMNS].itertuples(index=False, name=None)))
+            conn.executemany(
+                "INSERT INTO daily_aggregates (topic_key, run_id, subreddit, type, day, n, sum_compound, positive, negative) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((key, run_id, r.subreddit, r.type, None if pd.isna(r.day) else r.day, int(r.n), float(r.sum_compound), int(r.positive), int(r.negative))
+                 for r in daily.itertuples(index=False)))
+        self.pending.set()
+        return run_id
+
+    def index_pending(self, batch_size=20000):
+        """Add up to `batch_size` not-yet-indexed items to the FTS index; returns how many."""
+        conn = self._connect()
+        # Take the write lock before reading the watermark so two indexers
+        # (e.g. the web app and a CLI run) never index the same rows twice
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (through,) = conn.execute("SELECT indexed_through FROM fts_state").fetchone()
+            last, count = conn.execute(
+                "SELECT MAX(id), COUNT(*) FROM (SELECT id FROM items WHERE id > ? ORDER BY id LIMIT ?)",
+                (through, batch_size)).fetchone()
+            if count:
+                conn.execute(
+                    "INSERT INTO items_fts (rowid, text) SELECT id, text FROM items "
+                    "WHERE id > ? AND id <= ? AND text IS NOT NULL", (through, last))
+                conn.execute("UPDATE fts_state SET indexed_through = ?", (last,))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return count
+
+    def unindexed_count(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM items WHERE id > (SELECT indexed_through FROM fts_state)").fetchone()[0]
+
+    def search(self, text, topic=None, run_id=None, limit=20, offset=0):
+        """
+        Items whose text contains every word of `text`, best bm25 match
+        first, with their sentiment scores. Returns (rows, has_more).
+        Items saved since the last `index_pending()` are not searchable yet.
+        """
+        query = fts_query(text)
+        if not query:
+            return [], False
+        where, params = ["items_fts MATCH ?"], [query]
+        if topic:
+            where.append("items.topic_key = ?")
+            params.append(topic_key(topic))
+        if run_id:
+            where.append("items.run_id = ?")
+            params.append(run_id)
+        rows = self._connect().execute(
+            f"SELECT items.run_id, items.topic_key AS topic, {', '.join('items.' + c for c in ITEM_COLUMNS)}, "
+            f"bm25(items_fts) AS rank FROM items_fts JOIN items ON items.id = items_fts.rowid "
+            f"WHERE {' AND '.join(where)} ORDER BY rank LIMIT ? OFFSET ?",
+            params + [limit + 1, offset]).fetchall()
+        return [dict(row) for row in rows[:limit]], len(rows) > limit
+
+    def aggregate(self, topic=None, group_by="subreddit", start=None, end=None, subreddit=None, type=None,
+                  run_id=None):
+        """
+        Item counts, mean combined compound and positive/negative/neutral
+        shares grouped by `group_by` ('subreddit', 'type', 'day', 'topic',
+        'run' or None). `start`/`end` are inclusive YYYY-MM-DD days; items
+        without a date only count when neither is given.
+        """
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"Cannot group by {group_by!r}; choose one of {sorted(k for k in GROUP_COLUMNS if k)}")
+        column = GROUP_COLUMNS[group_by]
+        where, params = [], []
+        for clause, value in [("topic_key = ?", topic_key(topic) if topic else None),
+                              ("day >= ?", start), ("day <= ?", end),
+                              ("subreddit = ?", subreddit), ("type = ?", type), ("run_id = ?", run_id)]:
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        sql = (f"SELECT {column} AS grp, SUM(n) AS items, SUM(sum_compound) AS total, "
+               f"SUM(positive) AS positive, SUM(negative) AS negative FROM daily_aggregates"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''} GROUP BY grp ORDER BY grp")
+        rows = self._connect().execute(sql, params).fetchall()
+        return [{
+            "group": row["grp"],
+            "items": row["items"],
+            "mean_compound": round(row["total"] / row["items"], 4),
+            "positive_percentage": round(row["positive"] / row["items"] * 100, 1),
+            "negative_percentage": round(row["negative"] / row["items"] * 100, 1),
+            "neutral_percentage": round((row["items"] - row["positive"] - row["negative"]) / row["items"] * 100, 1),
+        } for row in rows]
+
+    def runs(self, topic=None, limit=50):
+        """Most recent runs first."""
+        if topic:
+            rows = self._connect().execute(
+                "SELECT * FROM runs WHERE topic_key = ? ORDER BY created_at DESC LIMIT ?", (topic_key(topic), limit))
+        else:
+            rows = self._connect().execute("SELECT * FROM runs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [dict(row) for row in rows.fetchall()]
+
+    def items(self, run_id, limit=100, offset=0):
+        rows = self._connect().execute(
+            f"SELECT {', '.join(ITEM_COLUMNS)} FROM items WHERE run_id = ? ORDER BY id LIMIT ? OFFSET ?",
+            (run_id, limit, offset))
+        return [dict(row) for row in rows.fetchall()]
+
+
+class SearchIndexer:
+    """
+    Background thread that keeps the store's full-text index caught up,
+    indexing in batches whenever new items are saved (or every
+    `interval_seconds` as a fallback).
+    """
+
+    def __init__(self, store, interval_seconds=30, batch_size=20000):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.store.pending.wait(self.interval_seconds)
+            self.store.pending.clear()
+            try:
+                while not self._stop.is_set() and self.store.index_pending(self.batch_size):
+                    pass
+            except Exception as e:
+                logging.error(f"Search indexing failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="search-indexer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.store.pending.set()
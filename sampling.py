@@ -0,0 +1,128 @@
+import random
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from metrics import registry
+from streaming_stats import categorize, CATEGORIES
+
+sampled_items = registry.counter(
+    "sentinent_sampled_items_total", "Collected items left out of scoring by sampling mode."
+)
+
+# Attributes of CollectedData carried over to the sample
+_COLLECTION_ATTRIBUTES = {"text_cleaned": False, "partial": False, "reason": None, "seconds": None}
+
+
+class Sample(list):
+    """
+    The sampled items, in collection order. `population` maps each stratum
+    to how many collected items it had; the collection attributes
+    (`partial`, `reason`, ...) are those of the full collection.
+    """
+
+    def __init__(self, items, population, strata):
+        super().__init__(items)
+        self.population = population
+        self.strata = strata
+
+    @property
+    def population_size(self):
+        return sum(self.population.values())
+
+
+def _allocate(population, size):
+    # Proportional allocation by largest remainder, with at least two items
+    # per stratum (where it has them) so every stratum's variance is defined
+    total = sum(population.values())
+    quotas = {key: size * count / total for key, count in population.items()}
+    allocation = {key: int(quota) for key, quota in quotas.items()}
+    spare = size - sum(allocation.values())
+    for key in sorted(quotas, key=lambda k: quotas[k] - allocation[k], reverse=True)[:spare]:
+        allocation[key] += 1
+    return {key: min(population[key], max(allocation[key], 2)) for key in population}
+
+
+class Sampler:
+    """
+    Picks at most `size` of the collected items to score. With `strata`
+    (item fields such as subreddit and type) the sample is split between
+    strata in proportion to their size and drawn within each by reservoir
+    sampling; with none it is a plain reservoir sample. Collections no
+    larger than `size` are returned unchanged.
+    """
+
+    def __init__(self, size, strata=("subreddit", "type"), seed=None):
+        self.size = size
+        self.strata = tuple(strata)
+        self.seed = seed
+
+    def _key(self, item):
+        return tuple(item.get(field) for field in self.strata)
+
+    def sample(self, items):
+        if len(items) <= self.size:
+            return items
+        rng = random.Random(self.seed)
+        keys = [self._key(item) for item in items]
+        population = dict(pd.Series(keys, dtype=object).value_counts(sort=False))
+        allocation = _allocate(population, self.size)
+        # Algorithm R per stratum, in one pass over the collection
+        reservoirs = {key: [] for key in population}
+        seen = dict.fromkeys(population, 0)
+        for index, key in enumerate(keys):
+            seen[key] += 1
+            reservoir = reservoirs[key]
+            if len(reservoir) < allocation[key]:
+                reservoir.append(index)
+            else:
+                slot = rng.randrange(seen[key])
+                if slot < allocation[key]:
+                    reservoir[slot] = index
+        chosen = sorted(index for reservoir in reservoirs.values() for index in reservoir)
+        sample = Sample([items[i] for i in chosen], population, self.strata)
+        for name, default in _COLLECTION_ATTRIBUTES.items():
+            setattr(sample, name, getattr(items, name, default))
+        sampled_items.inc(len(items) - len(sample))
+        return sample
+
+
+def _stratified(values, keys, population, z):
+    # Stratified estimate of a mean, with the finite population correction
+    frame = pd.DataFrame({"key": keys, "value": values})
+    stats = frame.groupby("key", sort=False)["value"].agg(["count", "mean", "var"])
+    covered = sum(population.get(key, 0) for key in stats.index)
+    estimate, variance = 0.0, 0.0
+    for key, row in stats.iterrows():
+        stratum_size = population.get(key, row["count"])
+        weight = stratum_size / covered
+        estimate += weight * row["mean"]
+        if row["count"] > 1:
+            variance += weight ** 2 * (1 - row["count"] / stratum_size) * row["var"] / row["count"]
+    margin = z * np.sqrt(max(variance, 0.0))
+    return {"estimate": float(estimate), "low": float(estimate - margin), "high": float(estimate + margin)}
+
+
+def estimate(df, sample, confidence=0.95):
+    """
+    Population estimates from the scored sample `df`: the share of
+    positive, negative and neutral items (in percent) and the mean
+    combined_compound, each with a `confidence` interval. Returns None when
+    `sample` was not sampled.
+    """
+    if not isinstance(sample, Sample) or df.empty:
+        return None
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    keys = list(zip(*(df[field] for field in sample.strata))) if sample.strata else [()] * len(df)
+    scores = df["combined_compound"].to_numpy(dtype=float)
+    categories = categorize(scores)
+    estimates = {
+        "population": sample.population_size,
+        "sample": len(df),
+        "strata": list(sample.strata),
+        "confidence": confidence,
+        "mean_combined_compound": _stratified(scores, keys, sample.population, z),
+    }
+    for category in CATEGORIES:
+        share = _stratified((categories == category) * 100.0, keys, sample.population, z)
+        estimates[f"{category.lower()}_percentage"] = share
+    return estimates
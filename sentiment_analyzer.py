@@ -2,12 +2,14 @@ import nltk
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from textblob import TextBlob
 import pandas as pd
+from metrics import timed, result_len
 
 class SentimentAnalyzer:
     def __init__(self):
         nltk.download("vader_lexicon", quiet=True)
         self.sia = SentimentIntensityAnalyzer()
 
+    @timed("analyze", items=result_len)
     def analyze(self, data):
         sentiment_results = []
         for item in data:
@@ -0,0 +1,124 @@
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from metrics import registry
+
+coalesced_requests = registry.counter(
+    "sentinent_coalesced_requests_total",
+    "Requests by how they were served: leader (ran the work), joined (waited on an in-flight run) or fresh (recent result)."
+)
+
+
+def _drop_expired(fresh):
+    # Every stale result, not just the one asked for: each holds a whole
+    # run's results, and a topic asked for once is never looked up again
+    now = time.monotonic()
+    for key in [key for key, (expires, _) in fresh.items() if expires <= now]:
+        del fresh[key]
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs `func`; callers arriving while it runs
+    block on the same future and receive the same result (or exception).
+    Successful results stay servable for `freshness_seconds` after they
+    complete; failures are never cached.
+    """
+
+    def __init__(self, freshness_seconds=300, name="default"):
+        self.freshness_seconds = freshness_seconds
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._fresh = {}
+
+    def do(self, key, func):
+        """Return (result, outcome) where outcome is 'leader', 'joined' or 'fresh'."""
+        with self._lock:
+            _drop_expired(self._fresh)
+            cached = self._fresh.get(key)
+            if cached is not None:
+                coalesced_requests.inc(flight=self.name, outcome="fresh")
+                return cached[1], "fresh"
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            coalesced_requests.inc(flight=self.name, outcome="joined")
+            return future.result(), "joined"
+
+        coalesced_requests.inc(flight=self.name, outcome="leader")
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if self.freshness_seconds > 0:
+                self._fresh[key] = (time.monotonic() + self.freshness_seconds, result)
+        future.set_result(result)
+        return result, "leader"
+
+    def forget(self, key):
+        """Drop a fresh result so the next call recomputes it."""
+        with self._lock:
+            self._fresh.pop(key, None)
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop: callers that join an
+    in-flight key await the leader's task instead of blocking a thread.
+    A joiner that is cancelled (e.g. its client disconnected) does not
+    cancel the shared run.
+    """
+
+    def __init__(self, freshness_seconds=300, name="default"):
+        self.freshness_seconds = freshness_seconds
+        self.name = name
+        self._inflight = {}
+        self._fresh = {}
+
+    async def do(self, key, func):
+        """Await `func()` once per key; returns (result, outcome) like SingleFlight.do."""
+        _drop_expired(self._fresh)
+        cached = self._fresh.get(key)
+        if cached is not None:
+            coalesced_requests.inc(flight=self.name, outcome="fresh")
+            return cached[1], "fresh"
+        task = self._inflight.get(key)
+        if task is not None:
+            coalesced_requests.inc(flight=self.name, outcome="joined")
+            return await asyncio.shield(task), "joined"
+
+        coalesced_requests.inc(flight=self.name, outcome="leader")
+        task = self._inflight[key] = asyncio.ensure_future(func())
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            if task.done():
+                del self._inflight[key]
+            else:
+                # The leader's request went away; let the run finish for the joiners
+                task.add_done_callback(lambda done: self._abandoned(key, done))
+        if self.freshness_seconds > 0:
+            self._fresh[key] = (time.monotonic() + self.freshness_seconds, result)
+        return result, "leader"
+
+    def _abandoned(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Abandoned run for {key!r} failed: {task.exception()}")
+
+    def forget(self, key):
+        self._fresh.pop(key, None)
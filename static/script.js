@@ -60,6 +60,10 @@ document.addEventListener('DOMContentLoaded', function() {
     // Image modal functionality for visualizations
     const vizImages = document.querySelectorAll('.viz-image');
     vizImages.forEach(img => {
+        // Images that open their own popup (results.html) keep it
+        if (img.onclick) {
+            return;
+        }
         img.addEventListener('click', function() {
             openImageModal(this.src, this.alt);
         });
@@ -220,6 +224,27 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Interactive charts drawn from the run's pre-aggregated chart data
+    const chartData = document.getElementById('chartData');
+    if (chartData) {
+        renderInteractiveCharts(chartData.dataset.url);
+    }
+    
+    // Live progress while an analysis runs (index.html)
+    const progressForm = document.querySelector('form[data-progress-url]');
+    if (progressForm) {
+        progressForm.addEventListener('submit', function() {
+            const topic = this.querySelector('input[name="topic"]').value.trim();
+            if (!topic) {
+                return;
+            }
+            // The page stays up until the results arrive; a second submit would only queue again
+            const submitBtn = this.querySelector('button[type="submit"]');
+            setTimeout(() => { submitBtn.disabled = true; }, 0);
+            watchAnalysisProgress(this.dataset.progressUrl, topic, document.getElementById('analysisProgress'));
+        });
+    }
+    
     // Add copy to clipboard functionality for any code blocks
     const codeBlocks = document.querySelectorAll('pre code');
     codeBlocks.forEach(block => {
@@ -254,3 +279,139 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+const CHART_LAYOUT = {
+    paper_bgcolor: 'rgba(0,0,0,0)',
+    plot_bgcolor: 'rgba(0,0,0,0)',
+    font: { color: '#e0e0e0', family: 'Roboto, sans-serif', size: 11 },
+    margin: { t: 10, r: 10, b: 40, l: 45 },
+    legend: { orientation: 'h', y: -0.2 },
+    xaxis: { gridcolor: 'rgba(255,255,255,0.08)' },
+    yaxis: { gridcolor: 'rgba(255,255,255,0.08)' }
+};
+const CATEGORY_COLORS = { Positive: '#2ecc71', Negative: '#e74c3c', Neutral: '#3498db' };
+
+function chartFigures(data) {
+    // One entry per data-chart slot in results.html: [traces, layout overrides]
+    const edges = data.histogram.edges;
+    const centers = edges.slice(0, -1).map((edge, i) => (edge + edges[i + 1]) / 2);
+    const categories = Object.keys(data.categories);
+    const subreddits = data.subreddits;
+    return {
+        distribution: [
+            Object.entries(data.histogram.series).map(([type, counts]) => ({
+                type: 'bar', name: type, x: centers, y: counts
+            })),
+            { barmode: 'stack', bargap: 0, xaxis: { title: { text: 'Combined compound score' } }, yaxis: { title: { text: 'Count' } } }
+        ],
+        categories: [
+            [{
+                type: 'pie', hole: 0.4, labels: categories, values: categories.map(c => data.categories[c]),
+                marker: { colors: categories.map(c => CATEGORY_COLORS[c]) }
+            }],
+            {}
+        ],
+        subreddit: [
+            [...new Set(subreddits.map(row => row.type))].map(type => {
+                const rows = subreddits.filter(row => row.type === type);
+                // Box statistics are computed server-side, so pass them as precomputed quartiles
+                return {
+                    type: 'box', name: type, x: rows.map(r => r.subreddit),
+                    q1: rows.map(r => r.q1), median: rows.map(r => r.median), q3: rows.map(r => r.q3),
+                    lowerfence: rows.map(r => r.min), upperfence: rows.map(r => r.max), mean: rows.map(r => r.mean)
+                };
+            }),
+            { boxmode: 'group', yaxis: { title: { text: 'Combined compound score' } } }
+        ],
+        trend: [
+            Object.entries(data.trend.series).map(([type, series]) => ({
+                type: 'scatter', mode: 'lines+markers', name: type, x: series.dates, y: series.mean,
+                customdata: series.count, hovertemplate: '%{x}: %{y:.3f} (%{customdata} items)<extra>' + type + '</extra>'
+            })),
+            { yaxis: { title: { text: 'Mean score' } } }
+        ],
+        type: [
+            [{ type: 'bar', x: data.by_type.types, y: data.by_type.mean, customdata: data.by_type.count,
+               hovertemplate: '%{x}: %{y:.3f} (%{customdata} items)<extra></extra>' }],
+            { yaxis: { title: { text: 'Mean score' } } }
+        ],
+        terms: [
+            [{ type: 'bar', orientation: 'h', x: data.terms.slice(0, 25).map(t => t[1]).reverse(),
+               y: data.terms.slice(0, 25).map(t => t[0]).reverse() }],
+            { margin: { t: 10, r: 10, b: 30, l: 90 } }
+        ],
+        heatmap: [
+            [{ type: 'heatmap', x: data.correlation.columns, y: data.correlation.columns, z: data.correlation.matrix,
+               colorscale: 'RdBu', reversescale: true, zmin: -1, zmax: 1 }],
+            { margin: { t: 10, r: 10, b: 90, l: 110 } }
+        ]
+    };
+}
+
+function renderInteractiveCharts(url) {
+    const slots = document.querySelectorAll('.interactive-chart');
+    const showError = message => slots.forEach(slot => {
+        slot.innerHTML = '<p class="empty-section">' + message + '</p>';
+    });
+    fetch(url, { credentials: 'same-origin' })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.json();
+        })
+        .then(data => {
+            if (typeof Plotly === 'undefined') {
+                showError('Interactive charts are unavailable; see the static images below.');
+                return;
+            }
+            const figures = chartFigures(data);
+            slots.forEach(slot => {
+                const [traces, layout] = figures[slot.dataset.chart];
+                const merged = Object.assign({}, CHART_LAYOUT, layout, {
+                    xaxis: Object.assign({}, CHART_LAYOUT.xaxis, layout.xaxis),
+                    yaxis: Object.assign({}, CHART_LAYOUT.yaxis, layout.yaxis)
+                });
+                Plotly.newPlot(slot, traces, merged, { responsive: true, displaylogo: false });
+            });
+        })
+        .catch(error => showError('Could not load chart data (' + error.message + ').'));
+}
+
+function watchAnalysisProgress(url, topic, panel) {
+    // The server ends each stream after a while (or at once when busy);
+    // EventSource reconnects with Last-Event-ID and picks up where it left off
+    if (!window.EventSource || !panel) {
+        return;
+    }
+    const stageText = panel.querySelector('.progress-stage');
+    const countsText = panel.querySelector('.progress-counts');
+    panel.hidden = false;
+    const source = new EventSource(url + '?topic=' + encodeURIComponent(topic));
+    source.addEventListener('stage', event => {
+        const stage = JSON.parse(event.data);
+        if (stage.status === 'started') {
+            stageText.textContent = stage.label + '…';
+        } else if (stage.status === 'failed') {
+            stageText.textContent = stage.label + ' failed';
+        }
+    });
+    source.addEventListener('progress', event => {
+        const progress = JSON.parse(event.data);
+        const parts = [];
+        if (progress.collected !== undefined) {
+            parts.push(progress.collected + ' items collected');
+        }
+        if (progress.to_score !== undefined) {
+            parts.push((progress.scored || 0) + ' of ' + progress.to_score + ' scored');
+        }
+        if (progress.scored_mean !== undefined) {
+            parts.push('mean sentiment so far ' + progress.scored_mean.toFixed(3));
+        }
+        countsText.textContent = parts.join(' · ');
+    });
+    source.addEventListener('done', event => {
+        const done = JSON.parse(event.data);
+        stageText.textContent = done.ok ? 'Preparing results…' : done.error;
+        source.close();
+    });
+}
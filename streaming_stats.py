@@ -0,0 +1,345 @@
+import random
+import numpy as np
+import pandas as pd
+
+# The sentiment metrics summarised in the report and correlated in the heatmap
+METRIC_COLUMNS = ["vader_neg", "vader_neu", "vader_pos", "vader_compound", "textblob_polarity", "combined_compound"]
+# Same cut-offs as the charts (chart_data.POSITIVE_THRESHOLD / NEGATIVE_THRESHOLD)
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+CATEGORIES = ["Positive", "Negative", "Neutral"]
+TOP_COLUMNS = ["text", "combined_compound", "type", "subreddit"]
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+class RunningMoments:
+    """
+    Count, mean, variance, min and max of a stream of numbers (Welford),
+    updated a batch at a time and mergeable with Chan et al.'s pairwise
+    formula, so workers can summarise their share and combine the results.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, minimum=np.inf, maximum=-np.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = minimum
+        self.max = maximum
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.merge(RunningMoments(len(values), values.mean(), float(((values - values.mean()) ** 2).sum()),
+                                      values.min(), values.max()))
+        return self
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1, as pandas); NaN below two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch: a stack of compactors, where level h holds items of
+    weight 2**h and a full level keeps every other item of its sorted
+    contents (from a random offset) one level up. Memory stays around
+    3 * k items however long the stream; the rank error of a quantile is
+    about 1.7 / k (about 1% at the default k=200). The first `exact_limit`
+    values are kept as they are, so quantiles of a typical run are exact
+    (interpolated like pandas) and only larger streams are compacted.
+    """
+
+    def __init__(self, k=200, seed=None, exact_limit=100000):
+        self.k = k
+        self.exact_limit = exact_limit
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = random.Random(seed)
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    def _capacity(self, level):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - level))))
+
+    def _compress(self):
+        if self.exact and self.count <= self.exact_limit:
+            return
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # An odd item out stays at this level so no weight is lost
+            keep = items[-1:] if len(items) % 2 else items[:0]
+            pairs = items[:len(items) - len(keep)]
+            promoted = pairs[self._rng.randint(0, 1)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Capacities shrink as the stack grows, so recheck from the bottom
+            level = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        if not self.count:
+            return np.full(len(qs), np.nan)
+        if self.exact:
+            return np.quantile(self.levels[0], qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        ranks = np.asarray(qs) * cumulative[-1]
+        return items[np.minimum(np.searchsorted(cumulative, ranks, side="left"), len(items) - 1)]
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    @property
+    def retained(self):
+        return sum(len(items) for items in self.levels)
+
+
+class TopK:
+    """
+    The `k` rows with the largest (or smallest) `column`, kept from a stream
+    of frames. Ties go to the row seen first, as with nlargest/nsmallest.
+    """
+
+    def __init__(self, k, column, columns, largest=True):
+        self.k = k
+        self.column = column
+        self.columns = columns
+        self.largest = largest
+        self.seen = 0
+        self.rows = pd.DataFrame(columns=columns + ["_seq"])
+
+    def _keep(self, rows):
+        rows = rows.sort_values([self.column, "_seq"], ascending=[not self.largest, True], kind="stable")
+        self.rows = rows.head(self.k).reset_index(drop=True)
+
+    def update(self, df):
+        if len(df):
+            keys = df[self.column].to_numpy(dtype=float)
+            candidates = np.flatnonzero(~np.isnan(keys))
+            if len(candidates) > self.k:
+                # Only rows that could make the cut are copied out of the batch
+                kth = -self.k if self.largest else self.k - 1
+                cut = np.partition(keys[candidates], kth)[kth]
+                candidates = np.flatnonzero(keys >= cut if self.largest else keys <= cut)
+            batch = df.iloc[candidates][self.columns].assign(_seq=candidates + self.seen)
+            self._keep(batch if self.rows.empty else pd.concat([self.rows, batch], ignore_index=True))
+            self.seen += len(df)
+        return self
+
+    def merge(self, other):
+        # The other stream's rows count as seen after this one's
+        if not other.rows.empty:
+            rows = other.rows.assign(_seq=other.rows["_seq"] + self.seen)
+            self._keep(rows if self.rows.empty else pd.concat([self.rows, rows], ignore_index=True))
+        self.seen += other.seen
+        return self
+
+    def frame(self):
+        return self.rows[self.columns].reset_index(drop=True)
+
+
+class RunningCovariance:
+    """Streaming co-moment matrix of `columns`; rows with a missing value are skipped."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.count = 0
+        self.mean = np.zeros(len(columns))
+        self.comoment = np.zeros((len(columns), len(columns)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values):
+            mean = values.mean(axis=0)
+            centred = values - mean
+            self._combine(len(values), mean, centred.T @ centred)
+        return self
+
+    def _combine(self, count, mean, comoment):
+        total = self.count + count
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean, other.comoment)
+        return self
+
+    def covariance(self):
+        return pd.DataFrame(self.comoment / (self.count - 1) if self.count > 1 else np.nan,
+                            index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = np.sqrt(np.diag(self.comoment))
+            matrix = self.comoment / np.outer(scale, scale)
+        np.fill_diagonal(matrix, np.where(scale > 0, 1.0, np.nan))
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+
+class GroupedMoments:
+    """RunningMoments of a value per group key (content type, subreddit, ...)."""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.groups = {}
+
+    def update(self, keys, values):
+        stats = pd.DataFrame({"key": keys, "value": values}).dropna().groupby("key", observed=True)["value"]
+        table = stats.agg(["count", "mean", "var", "min", "max"])
+        for key, row in table.iterrows():
+            m2 = row["var"] * (row["count"] - 1) if row["count"] > 1 else 0.0
+            self.groups.setdefault(key, RunningMoments()).merge(
+                RunningMoments(int(row["count"]), row["mean"], m2, row["min"], row["max"])
+            )
+        return self
+
+    def merge(self, other):
+        for key, moments in other.groups.items():
+            self.groups.setdefault(key, RunningMoments()).merge(moments)
+        return self
+
+    def table(self):
+        """mean / count / std per group, like groupby(...).agg(['mean', 'count', 'std'])."""
+        keys = sorted(self.groups)
+        return pd.DataFrame({
+            "mean": [self.groups[k].mean for k in keys],
+            "count": [self.groups[k].count for k in keys],
+            "std": [self.groups[k].std for k in keys],
+        }, index=pd.Index(keys, name=self.name))
+
+
+def categorize(scores):
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores >= POSITIVE_THRESHOLD, scores <= NEGATIVE_THRESHOLD], CATEGORIES[:2], CATEGORIES[2])
+
+
+class SentimentSketch:
+    """
+    Everything the summary report reads from the scored items, kept as
+    mergeable sketches: per-metric moments and quantiles, the metric
+    covariance, sentiment by category, content type and subreddit, and the
+    most positive and negative rows. Feed it frames with update() (a batch
+    at a time, e.g. while reading a dataset larger than memory), combine
+    per-worker sketches with merge(), and hand the result to
+    ReportGenerator.generate_summary_report(sketch=...).
+    """
+
+    def __init__(self, columns=None, k=200, top=5, seed=None, exact_limit=100000):
+        self.columns = list(columns or METRIC_COLUMNS)
+        self.count = 0
+        self.moments = {c: RunningMoments() for c in self.columns}
+        self.quantiles = {c: QuantileSketch(k, seed=seed, exact_limit=exact_limit) for c in self.columns}
+        self.covariance = RunningCovariance(self.columns)
+        self.by_category = GroupedMoments("sentiment_category")
+        self.by_type = GroupedMoments("type")
+        self.by_subreddit = GroupedMoments("subreddit")
+        self.most_positive = TopK(top, "combined_compound", TOP_COLUMNS, largest=True)
+        self.most_negative = TopK(top, "combined_compound", TOP_COLUMNS, largest=False)
+
+    @classmethod
+    def from_frame(cls, df, batch_size=100000, **kwargs):
+        sketch = cls(**kwargs)
+        for start in range(0, len(df), batch_size):
+            sketch.update(df.iloc[start:start + batch_size])
+        return sketch
+
+    def update(self, df):
+        if not len(df):
+            return self
+        self.count += len(df)
+        for column in self.columns:
+            values = df[column].to_numpy(dtype=float)
+            self.moments[column].update(values)
+            self.quantiles[column].update(values)
+        self.covariance.update(df[self.columns].to_numpy(dtype=float))
+        scores = df["combined_compound"].to_numpy(dtype=float)
+        self.by_category.update(categorize(scores), scores)
+        self.by_type.update(df["type"].to_numpy(), scores)
+        self.by_subreddit.update(df["subreddit"].to_numpy(), scores)
+        self.most_positive.update(df)
+        self.most_negative.update(df)
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        for column in self.columns:
+            self.moments[column].merge(other.moments[column])
+            self.quantiles[column].merge(other.quantiles[column])
+        self.covariance.merge(other.covariance)
+        self.by_category.merge(other.by_category)
+        self.by_type.merge(other.by_type)
+        self.by_subreddit.merge(other.by_subreddit)
+        self.most_positive.merge(other.most_positive)
+        self.most_negative.merge(other.most_negative)
+        return self
+
+    def describe(self):
+        """The metrics' describe() table; quantiles are approximate once a column outgrows its sketch."""
+        table = {}
+        for column in self.columns:
+            m = self.moments[column]
+            q25, q50, q75 = self.quantiles[column].quantiles([0.25, 0.5, 0.75])
+            table[column] = [float(m.count), m.mean if m.count else np.nan, m.std,
+                             m.min if m.count else np.nan, q25, q50, q75, m.max if m.count else np.nan]
+        return pd.DataFrame(table, index=DESCRIBE_INDEX)
+
+    def category_stats(self):
+        """Counts, shares and mean score of positive, negative and neutral items."""
+        stats = {"total_count": self.count}
+        for category in CATEGORIES:
+            moments = self.by_category.groups.get(category, RunningMoments())
+            name = category.lower()
+            stats[f"{name}_count"] = moments.count
+            stats[f"{name}_percentage"] = moments.count / self.count * 100 if self.count else 0.0
+            stats[f"avg_{name}_score"] = moments.mean if moments.count else 0
+        return stats
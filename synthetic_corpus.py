@@ -0,0 +1,101 @@
+"""
+Seeded synthetic Reddit text and scored frames, shared by the unit tests
+and the benchmarks.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+POSITIVE_WORDS = ["love", "great", "amazing", "excellent", "happy", "fantastic", "awesome", "enjoy", "brilliant", "helpful"]
+NEGATIVE_WORDS = ["hate", "terrible", "awful", "bugs", "broken", "disappointing", "annoying", "worst", "angry", "useless"]
+NEUTRAL_WORDS = [
+    "python", "release", "update", "version", "community", "thread", "question", "today", "library", "people",
+    "code", "project", "data", "model", "game", "market", "policy", "weather", "team", "article",
+]
+FILLER_WORDS = ["the", "a", "is", "this", "that", "and", "it", "was", "really", "of", "to", "for", "with", "just"]
+SUBREDDITS = ["python", "programming", "technology", "news", "worldnews", "datascience", "gaming", "AskReddit"]
+
+
+class SyntheticCorpus:
+    """Seeded generator of Reddit-like sentences with a controllable sentiment mix."""
+
+    def __init__(self, seed=42, positive=0.4, negative=0.3, min_words=6, max_words=40):
+        self.rng = random.Random(seed)
+        self.positive = positive
+        self.negative = negative
+        self.min_words = min_words
+        self.max_words = max_words
+
+    def sentence(self):
+        roll = self.rng.random()
+        if roll < self.positive:
+            charged = POSITIVE_WORDS
+        elif roll < self.positive + self.negative:
+            charged = NEGATIVE_WORDS
+        else:
+            charged = NEUTRAL_WORDS
+        length = self.rng.randint(self.min_words, self.max_words)
+        words = []
+        for _ in range(length):
+            pick = self.rng.random()
+            if pick < 0.15:
+                words.append(self.rng.choice(charged))
+            elif pick < 0.55:
+                words.append(self.rng.choice(NEUTRAL_WORDS))
+            else:
+                words.append(self.rng.choice(FILLER_WORDS))
+        return " ".join(words).capitalize() + self.rng.choice([".", "!", "?", "..."])
+
+    def iter_items(self, n, start=datetime(2024, 1, 1)):
+        """Like items(), one at a time, for corpora too large to build as a list."""
+        for i in range(n):
+            yield {
+                'id': str(uuid.UUID(int=self.rng.getrandbits(128))),
+                'type': 'post' if i % 10 == 0 else 'comment',
+                'text': self.sentence(),
+                'created': start + timedelta(minutes=self.rng.randint(0, 60 * 24 * 30)),
+                'subreddit': self.rng.choice(SUBREDDITS),
+                'url': f"https://reddit.com/r/bench/{i // 10}",
+            }
+
+    def items(self, n, start=datetime(2024, 1, 1)):
+        """`n` items in the schema produced by RedditDataCollector.collect_data."""
+        return list(self.iter_items(n, start))
+
+
+def scored_frame(n, seed=42):
+    """
+    A frame shaped like SentimentAnalyzer output with random scores, so chart
+    and report benchmarks don't have to pay for scoring first.
+    """
+    return with_random_scores(pd.DataFrame(SyntheticCorpus(seed=seed).items(n)), np.random.default_rng(seed))
+
+
+def with_random_scores(df, rng):
+    """Add SentimentAnalyzer's score columns to a frame of items, drawn from `rng`."""
+    n = len(df)
+    vader_compound = np.clip(rng.normal(0.1, 0.5, n), -1, 1)
+    textblob_polarity = np.clip(vader_compound * 0.6 + rng.normal(0, 0.2, n), -1, 1)
+    vader_pos = rng.uniform(0, 0.6, n)
+    vader_neg = rng.uniform(0, 0.4, n)
+    df["vader_neg"] = vader_neg
+    df["vader_neu"] = np.clip(1 - vader_pos - vader_neg, 0, 1)
+    df["vader_pos"] = vader_pos
+    df["vader_compound"] = vader_compound
+    df["textblob_polarity"] = textblob_polarity
+    df["textblob_subjectivity"] = rng.uniform(0, 1, n)
+    df["combined_compound"] = (vader_compound + textblob_polarity) / 2
+    df["confidence"] = df["combined_compound"].abs()
+    return df
+
+
+class RandomScorer:
+    """Stands in for SentimentAnalyzer where only the volume of scored rows matters."""
+
+    def __init__(self, seed=42):
+        self.rng = np.random.default_rng(seed)
+
+    def analyze(self, data):
+        return with_random_scores(pd.DataFrame(data), self.rng)
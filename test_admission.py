@@ -0,0 +1,183 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from admission import AdmissionController, Overloaded
+from rate_limit import TokenBucket, RequestScheduler
+from deadline import Deadline, DeadlineExceeded
+from fake_clock import FakeClock
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+        self.assertEqual([bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(bucket.wait_time(), 0.5)
+        clock.now = 0.5
+        self.assertTrue(bucket.try_acquire())
+        clock.now = 100
+        self.assertTrue(bucket.is_full())
+
+
+class RateLimited(Exception):
+    pass
+
+
+class TestRequestScheduler(unittest.TestCase):
+
+    def _scheduler(self, **kwargs):
+        retry_after = lambda e: 0.05 if isinstance(e, RateLimited) else None
+        return RequestScheduler(TokenBucket(rate=1000, capacity=10), retry_after, **kwargs)
+
+    def test_rate_limited_calls_are_retried_after_a_pause(self):
+        responses = [RateLimited(), RateLimited(), "ok"]
+
+        def request():
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        started = time.monotonic()
+        self.assertEqual(self._scheduler().call(None, request), "ok")
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+    def test_gives_up_after_max_retries_and_passes_other_errors_through(self):
+        scheduler = self._scheduler(max_retries=1)
+        with self.assertRaises(RateLimited):
+            scheduler.call(None, lambda: (_ for _ in ()).throw(RateLimited()))
+        with self.assertRaises(ValueError):
+            scheduler.call(None, int, "x")
+
+    def test_waiting_for_a_slot_respects_the_deadline(self):
+        scheduler = RequestScheduler(TokenBucket(rate=1, capacity=1), lambda e: None)
+        self.assertEqual(scheduler.call(Deadline(0.2), abs, -1), 1)
+        with self.assertRaises(DeadlineExceeded):
+            scheduler.call(Deadline(0.2), abs, -1)
+
+
+class TestAdmissionController(unittest.TestCase):
+
+    def test_user_rate_limit(self):
+        controller = AdmissionController(user_rate_per_minute=1, user_burst=2)
+        controller.check_user("a@example.com")
+        controller.check_user("a@example.com")
+        with self.assertRaises(Overloaded) as ctx:
+            controller.check_user("a@example.com")
+        self.assertEqual(ctx.exception.reason, "user_rate")
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        controller.check_user("b@example.com")
+
+    def test_queue_is_bounded(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        release = threading.Event()
+
+        def hold():
+            with controller.slot():
+                release.wait(5)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            running = pool.submit(hold)
+            time.sleep(0.1)
+            queued = pool.submit(hold)
+            time.sleep(0.1)
+            self.assertEqual((controller.active, controller.waiting), (1, 1))
+            started = time.perf_counter()
+            with self.assertRaises(Overloaded) as ctx:
+                with controller.slot():
+                    pass
+            self.assertEqual(ctx.exception.reason, "queue_full")
+            self.assertLess(time.perf_counter() - started, 0.1)
+            release.set()
+            running.result()
+            queued.result()
+        self.assertEqual((controller.active, controller.waiting), (0, 0))
+
+    def test_queue_timeout(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.1)
+        with controller.slot():
+            with self.assertRaises(Overloaded) as ctx:
+                with controller.slot():
+                    pass
+        self.assertEqual(ctx.exception.reason, "queue_timeout")
+
+
+class TestAnalyzeOverload(unittest.TestCase):
+    """Floods /analyze with slow fake pipelines and checks /login stays responsive."""
+
+    @classmethod
+    def setUpClass(cls):
+        for name in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT", "REDDIT_USERNAME",
+                     "REDDIT_PASSWORD", "SMTP_USERNAME", "SMTP_PASSWORD", "PIXABAY_API_KEY"):
+            os.environ.setdefault(name, "test")
+        # app creates users.db and ../output relative to the working directory
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.tmp, "work"))
+        os.chdir(os.path.join(cls.tmp, "work"))
+        import app
+        cls.app_module = app
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.tmp)
+
+    def _client(self, email):
+        client = self.app_module.app.test_client()
+        with client.session_transaction() as sess:
+            sess["email"] = email
+        return client
+
+    def _slow_analysis(self, topic, profiler=None, progress=None):
+        time.sleep(0.5)
+        return dict(topic=topic, report_content="done", csv_data=[], csv_columns=[])
+
+    def test_overload_is_rejected_fast_and_login_stays_responsive(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5, user_burst=5, name="test")
+        with patch.object(self.app_module, "analysis_admission", controller), \
+                patch.object(self.app_module, "_run_analysis", self._slow_analysis):
+
+            def submit(i):
+                started = time.perf_counter()
+                response = self._client(f"user{i}@example.com").post("/analyze", data={"topic": f"topic {i}"})
+                return response.status_code, response.headers.get("Retry-After"), time.perf_counter() - started
+
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                futures = [pool.submit(submit, i) for i in range(6)]
+                time.sleep(0.1)
+                login = self.app_module.app.test_client()
+                started = time.perf_counter()
+                for _ in range(5):
+                    self.assertEqual(login.get("/login").status_code, 200)
+                login_seconds = time.perf_counter() - started
+                results = [f.result() for f in futures]
+
+        statuses = sorted(status for status, _, _ in results)
+        self.assertEqual(statuses, [200, 200, 429, 429, 429, 429])
+        for status, retry_after, seconds in results:
+            if status == 429:
+                self.assertIsNotNone(retry_after)
+                self.assertLess(seconds, 0.4)
+        self.assertLess(login_seconds, 0.5)
+
+    def test_user_over_budget_gets_429(self):
+        controller = AdmissionController(max_concurrent=4, user_rate_per_minute=1, user_burst=1, name="test")
+        with patch.object(self.app_module, "analysis_admission", controller), \
+                patch.object(self.app_module, "_run_analysis", lambda topic, profiler=None, progress=None: dict(
+                    topic=topic, report_content="done", csv_data=[], csv_columns=[])):
+            client = self._client("busy@example.com")
+            self.assertEqual(client.post("/analyze", data={"topic": "first"}).status_code, 200)
+            response = client.post("/analyze", data={"topic": "second"})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(b"too quickly", response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
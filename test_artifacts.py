@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from artifacts import atomic_path, atomic_write, RunDirectory, write_manifest, read_manifest, ArtifactJanitor
+
+
+class TestAtomicWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_file_appears_only_on_success(self):
+        path = os.path.join(self.dir, "report.md")
+        with self.assertRaises(RuntimeError):
+            with atomic_write(path, "w", encoding="utf-8") as f:
+                f.write("half a report")
+                raise RuntimeError("render failed")
+        self.assertEqual(os.listdir(self.dir), [])
+
+        with atomic_write(path, "w", encoding="utf-8") as f:
+            f.write("full report")
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "full report")
+        self.assertEqual(os.listdir(self.dir), ["report.md"])
+
+    def test_temp_path_keeps_extension(self):
+        with atomic_path(os.path.join(self.dir, "chart.png")) as tmp:
+            self.assertTrue(tmp.endswith(".png"))
+            open(tmp, "wb").close()
+
+    def test_manifest_lists_existing_artifacts(self):
+        run = RunDirectory.create(self.dir, "Some Topic!")
+        csv = run.file("data.csv")
+        with open(csv, "w") as f:
+            f.write("a,b\n1,2\n")
+        write_manifest(run.path, "Some Topic!", {"csv_path": csv, "plots": {"trend": csv, "type": None}, "topic_image": None},
+                       items=1)
+        manifest = read_manifest(run.path)
+        self.assertEqual(manifest["run_id"], run.run_id)
+        self.assertEqual(manifest["items"], 1)
+        self.assertEqual(sorted(manifest["artifacts"]), ["csv_path", "plots.trend"])
+        self.assertEqual(manifest["artifacts"]["csv_path"], {"file": "data.csv", "bytes": 8})
+
+
+class TestArtifactJanitor(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _run(self, name, size, age, complete=True):
+        path = os.path.join(self.dir, name)
+        os.makedirs(path)
+        with open(os.path.join(path, "blob"), "wb") as f:
+            f.write(b"x" * size)
+        if complete:
+            with open(os.path.join(path, "manifest.json"), "w") as f:
+                json.dump({}, f)
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def test_expired_runs_are_removed(self):
+        old = self._run("old", 10, age=3600)
+        new = self._run("new", 10, age=10)
+        removed = ArtifactJanitor(self.dir, max_age_seconds=600).sweep()
+        self.assertEqual(removed, [old])
+        self.assertTrue(os.path.exists(new))
+
+    def test_size_quota_evicts_oldest_complete_runs(self):
+        in_progress = self._run("in_progress", 1000, age=300, complete=False)
+        oldest = self._run("oldest", 1000, age=200)
+        middle = self._run("middle", 1000, age=100)
+        newest = self._run("newest", 1000, age=10)
+        removed = ArtifactJanitor(self.dir, max_age_seconds=3600, max_total_bytes=2500).sweep()
+        self.assertEqual(removed, [oldest, middle])
+        self.assertTrue(os.path.exists(in_progress))
+        self.assertTrue(os.path.exists(newest))
+
+
+if __name__ == "__main__":
+    unittest.main()
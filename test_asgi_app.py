@@ -0,0 +1,180 @@
+import os
+import shutil
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from sentiment_analyzer import SentimentAnalyzer
+from visualization_generator import VisualizationGenerator
+from report_generator import ReportGenerator
+from async_pipeline import AsyncAnalysisRunner
+from single_flight import AsyncSingleFlight
+from admission import AdmissionController
+
+ITEMS = [
+    {"id": "1", "type": "post", "text": "I love Python, it's the best language!", "subreddit": "python", "created": "2023-01-01", "url": ""},
+    {"id": "2", "type": "comment", "text": "I hate bugs, they are so annoying.", "subreddit": "programming", "created": "2023-01-02", "url": ""},
+]
+
+
+class FakeImageSearch:
+    def __init__(self):
+        self.calls = 0
+
+    def search_and_download_image(self, topic, output_dir=None):
+        raise AssertionError("the ASGI path fetches the image asynchronously")
+
+    async def search_and_download_image_async(self, topic, output_dir=None, client=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return None
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_run(self):
+        flight = AsyncSingleFlight(freshness_seconds=60)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "report"
+
+        async def main():
+            first = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+            return first, await flight.do("k", work)
+
+        results, fresh = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(outcome for _, outcome in results), ["joined"] * 4 + ["leader"])
+        self.assertEqual(fresh, ("report", "fresh"))
+
+    def test_expired_results_of_other_keys_are_dropped(self):
+        flight = AsyncSingleFlight(freshness_seconds=0.05)
+
+        async def work():
+            return "report"
+
+        async def main():
+            await flight.do("a", work)
+            await asyncio.sleep(0.1)
+            await flight.do("b", work)
+
+        asyncio.run(main())
+        self.assertEqual(list(flight._fresh), ["b"])
+
+
+class TestAsgiApp(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        for name in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT", "REDDIT_USERNAME",
+                     "REDDIT_PASSWORD", "SMTP_USERNAME", "SMTP_PASSWORD", "PIXABAY_API_KEY"):
+            os.environ.setdefault(name, "test")
+        # Config creates ../output relative to the working directory
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.tmp, "work"))
+        os.chdir(os.path.join(cls.tmp, "work"))
+        import asgi_app
+        cls.asgi = asgi_app
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.tmp)
+
+    def setUp(self):
+        config = self.asgi.config
+        self.patches = [patch.object(config, name, value) for name, value in [
+            ("RUNS_DIR", os.path.join(self.tmp, "runs")),
+            ("PIPELINE_USE_PROCESSES", False),
+            ("PIPELINE_MAX_WORKERS", 2),
+            ("RENDER_CHART_PNGS", False),
+            ("ANALYSIS_TIME_BUDGET_SECONDS", 0),
+            ("API_TOKEN", "secret"),
+        ]] + [
+            patch.object(self.asgi, "analysis_flight", AsyncSingleFlight(freshness_seconds=60)),
+            patch.object(self.asgi, "client_limits", AdmissionController(user_rate_per_minute=60, user_burst=10)),
+        ]
+        for p in self.patches:
+            p.start()
+        self.collector = MagicMock()
+        self.collector.collect_data.side_effect = lambda *a, **kw: [dict(item) for item in ITEMS]
+        self.image_search = FakeImageSearch()
+        self.asgi.app.state.runner = AsyncAnalysisRunner(
+            self.collector, SentimentAnalyzer(), VisualizationGenerator(),
+            ReportGenerator(output_dir=self.tmp), self.image_search, config
+        )
+        self.headers = {"Authorization": "Bearer secret"}
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_analysis_runs_and_is_shared(self):
+        with TestClient(self.asgi.app) as client:
+            self.assertEqual(client.post("/api/analyze", json={"topic": "Python"}).status_code, 401)
+            response = client.post("/api/analyze", json={"topic": "Python"}, headers=self.headers)
+            self.assertEqual(response.status_code, 200, response.text)
+            summary = response.json()
+            self.assertEqual((summary["items"], summary["served_as"]), (2, "leader"))
+            self.assertIn("data", summary["timings"])
+            self.assertEqual(self.image_search.calls, 1)
+
+            charts = client.get(summary["charts"], headers=self.headers)
+            self.assertEqual(charts.json()["items"], 2)
+            again = client.post("/api/analyze", json={"topic": " python"}, headers=self.headers).json()
+            self.assertEqual((again["run_id"], again["served_as"]), (summary["run_id"], "fresh"))
+
+            events = client.get("/api/progress", params={"topic": "Python"}, headers=self.headers).text
+            self.assertIn("event: stage", events)
+            self.assertIn("event: done", events)
+
+    def test_no_data_is_a_404(self):
+        self.collector.collect_data.side_effect = None
+        self.collector.collect_data.return_value = []
+        with TestClient(self.asgi.app) as client:
+            response = client.post("/api/analyze", json={"topic": "Nothing"}, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_notification_is_sent_in_the_background(self):
+        sent = []
+
+        async def fake_send(config, message):
+            sent.append(message)
+
+        with patch.object(self.asgi, "send_email_async", fake_send), TestClient(self.asgi.app) as client:
+            response = client.post("/api/analyze", json={"topic": "Rust", "notify_email": "a@example.com"},
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sent[0]["To"], "a@example.com")
+        self.assertIn("Items analysed: 2", sent[0].get_content())
+
+    def test_notification_needs_a_token_or_allowed_address(self):
+        sent = []
+
+        async def fake_send(config, message):
+            sent.append(message)
+
+        config = self.asgi.config
+        with patch.object(self.asgi, "send_email_async", fake_send), patch.object(config, "API_TOKEN", None), \
+                patch.object(config, "NOTIFY_EMAIL_ALLOWLIST", {"ops@example.com"}), \
+                patch.object(self.asgi, "client_limits", AdmissionController(user_rate_per_minute=1, user_burst=3)), \
+                TestClient(self.asgi.app) as client:
+            refused = client.post("/api/analyze", json={"topic": "Go", "notify_email": "victim@example.com"})
+            self.assertEqual(refused.status_code, 403)
+            invalid = client.post("/api/analyze", json={"topic": "Go", "notify_email": "a@b.com\r\nBcc: x@y.com"})
+            self.assertEqual(invalid.status_code, 422)
+            allowed = client.post("/api/analyze", json={"topic": "Go", "notify_email": "OPS@example.com"})
+            self.assertEqual(allowed.status_code, 200, allowed.text)
+            # The run and its email used two of the three tokens, so a second email is refused
+            again = client.post("/api/analyze", json={"topic": "Go", "notify_email": "ops@example.com"})
+            self.assertEqual(again.status_code, 429)
+        self.assertEqual([message["To"] for message in sent], ["OPS@example.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from artifacts import RunDirectory
+from batch import BatchRunner, read_topics
+from sentiment_analyzer import SentimentAnalyzer
+from visualization_generator import VisualizationGenerator
+from report_generator import ReportGenerator
+from fake_reddit import FakeReddit, make_collector
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.config = SimpleNamespace(
+            OUTPUT_DIR=self.output_dir,
+            RUNS_DIR=os.path.join(self.output_dir, "runs"),
+            PIPELINE_MAX_WORKERS=2,
+            PIPELINE_USE_PROCESSES=False,
+            RENDER_CHART_PNGS=True,
+            ANALYSIS_TIME_BUDGET_SECONDS=0,
+            COLLECTION_BUDGET_SHARE=0.6,
+            DEDUP_ENABLED=True,
+            DEDUP_THRESHOLD=0.7,
+            DEDUP_DROP_DUPLICATES=False,
+            SAMPLE_SIZE=0,
+            SAMPLE_STRATA=["subreddit", "type"],
+            SAMPLE_CONFIDENCE=0.95,
+            DEFAULT_SUBREDDIT="all",
+            DEFAULT_POST_LIMIT=3,
+            DEFAULT_COMMENT_LIMIT=3,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_read_topics(self):
+        path = os.path.join(self.output_dir, "topics.txt")
+        with open(path, "w") as f:
+            f.write("Python\n\n# nightly list\nRust\npython\n  Go  \n")
+        self.assertEqual(read_topics(path), ["Python", "Rust", "Go"])
+
+    def test_batch_shares_components_and_writes_index(self):
+        collector = make_collector(FakeReddit(num_submissions=3, comments_per_submission=3))
+        image_search = MagicMock()
+        image_search.search_and_download_image.return_value = None
+        runner = BatchRunner(collector, SentimentAnalyzer(), VisualizationGenerator(),
+                             ReportGenerator(output_dir=self.output_dir), image_search, self.config, parallelism=2)
+        summary = runner.run(["Alpha", "Beta", "Gamma"])
+
+        self.assertEqual(summary["succeeded"], 3)
+        self.assertEqual([e["topic"] for e in summary["results"]], ["Alpha", "Beta", "Gamma"])
+        self.assertEqual(summary["results"][0]["items"], 3 * (1 + 3))
+        self.assertGreater(summary["topics_per_minute"], 0)
+        for entry in summary["results"]:
+            self.assertTrue(os.path.exists(entry["report"]))
+            self.assertTrue(os.path.exists(os.path.join(entry["run_dir"], "manifest.json")))
+        self.assertEqual(len({entry["run_dir"] for entry in summary["results"]}), 3)
+
+        json_path, md_path = runner.write_index(summary)
+        with open(json_path) as f:
+            self.assertEqual(json.load(f)["topics"], 3)
+        with open(md_path) as f:
+            self.assertIn("Beta_sentiment_report.md", f.read())
+
+    def test_failed_topic_does_not_stop_batch(self):
+        collector = MagicMock()
+        collector.collect_data.side_effect = lambda topic, **kwargs: [] if topic == "Empty" else [
+            {"id": "1", "type": "post", "text": "I love this", "subreddit": "x", "created": "2024-01-01", "url": ""},
+        ]
+        image_search = MagicMock()
+        image_search.search_and_download_image.return_value = None
+        runner = BatchRunner(collector, SentimentAnalyzer(), VisualizationGenerator(),
+                             ReportGenerator(output_dir=self.output_dir), image_search, self.config, parallelism=2)
+        summary = runner.run(["Empty", "Full"])
+        statuses = {e["topic"]: e["status"] for e in summary["results"]}
+        self.assertEqual(statuses, {"Empty": "no_data", "Full": "ok"})
+
+    def test_unexpected_topic_error_keeps_other_results(self):
+        create = RunDirectory.create
+
+        def create_run_dir(runs_dir, topic):
+            if topic == "Broken":
+                raise PermissionError("runs directory is read-only")
+            return create(runs_dir, topic)
+
+        collector = make_collector(FakeReddit(num_submissions=2, comments_per_submission=1))
+        image_search = MagicMock()
+        image_search.search_and_download_image.return_value = None
+        runner = BatchRunner(collector, SentimentAnalyzer(), VisualizationGenerator(),
+                             ReportGenerator(output_dir=self.output_dir), image_search, self.config, parallelism=2)
+        with patch("batch.RunDirectory.create", side_effect=create_run_dir):
+            summary = runner.run(["Alpha", "Broken", "Gamma"])
+
+        self.assertEqual([e["status"] for e in summary["results"]], ["ok", "error", "ok"])
+        self.assertEqual(summary["results"][1]["error"], "runs directory is read-only")
+        self.assertEqual(summary["succeeded"], 2)
+        _, md_path = runner.write_index(summary)
+        with open(md_path) as f:
+            self.assertIn("| Broken | error |", f.read())
+
+if __name__ == "__main__":
+    unittest.main()
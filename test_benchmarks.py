@@ -0,0 +1,48 @@
+import unittest
+import time
+from fake_reddit import FakeReddit, make_collector
+from synthetic_corpus import SyntheticCorpus, scored_frame
+from benchmarks.run import run_benchmarks, compare
+
+
+class TestFakeReddit(unittest.TestCase):
+
+    def test_collector_runs_against_fake_reddit(self):
+        reddit = FakeReddit(num_submissions=5, comments_per_submission=3)
+        data = make_collector(reddit).collect_data("anything", post_limit=5, comment_limit=2)
+        self.assertEqual(len(data), 5 * (1 + 2))
+        self.assertEqual(sum(1 for d in data if d["type"] == "post"), 5)
+        # One search page plus one comment fetch per submission
+        self.assertEqual(reddit.requests, 1 + 5)
+
+    def test_latency_is_simulated(self):
+        reddit = FakeReddit(num_submissions=3, comments_per_submission=1, latency=0.02)
+        started = time.perf_counter()
+        make_collector(reddit).collect_data("anything", post_limit=3, comment_limit=1)
+        self.assertGreaterEqual(time.perf_counter() - started, 4 * 0.02)
+
+
+class TestCorpus(unittest.TestCase):
+
+    def test_corpus_is_deterministic(self):
+        self.assertEqual(SyntheticCorpus(seed=1).items(3)[0]["text"], SyntheticCorpus(seed=1).items(3)[0]["text"])
+
+    def test_scored_frame_has_analyzer_columns(self):
+        df = scored_frame(50)
+        self.assertEqual(len(df), 50)
+        for column in ["vader_compound", "textblob_polarity", "combined_compound", "confidence"]:
+            self.assertIn(column, df.columns)
+
+
+class TestBenchmarkRunner(unittest.TestCase):
+
+    def test_run_and_compare(self):
+        report = run_benchmarks(["collect_data", "generate_summary_report"], [50])
+        self.assertEqual(len(report["results"]), 2)
+        slower = {**report, "results": [{**r, "seconds": r["seconds"] * 2} for r in report["results"]]}
+        rows = compare(report, slower)
+        self.assertTrue(all(row[5] for row in rows))
+        self.assertFalse(any(row[5] for row in compare(report, report)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from synthetic_corpus import scored_frame
+from chart_data import build_chart_data, write_chart_data, chart_data_path_for, ChartSketch
+from artifacts import write_manifest
+
+
+class TestChartData(unittest.TestCase):
+
+    def setUp(self):
+        self.df = scored_frame(500)
+
+    def test_aggregates_cover_every_row(self):
+        data = build_chart_data(self.df, bins=20)
+        self.assertEqual(data["items"], 500)
+        self.assertEqual(len(data["histogram"]["edges"]), 21)
+        self.assertEqual(sum(sum(counts) for counts in data["histogram"]["series"].values()), 500)
+        self.assertEqual(sum(data["categories"].values()), 500)
+        self.assertEqual(sum(data["by_type"]["count"]), 500)
+        self.assertEqual(sum(sum(s["count"]) for s in data["trend"]["series"].values()), 500)
+
+    def test_subreddit_box_statistics(self):
+        data = build_chart_data(self.df, top_subreddits=2)
+        busiest = list(self.df["subreddit"].value_counts().index[:2])
+        self.assertEqual([row["subreddit"] for row in data["subreddits"][::2]], busiest)
+        row = data["subreddits"][0]
+        scores = self.df[(self.df["subreddit"] == row["subreddit"]) & (self.df["type"] == row["type"])]["combined_compound"]
+        self.assertEqual(row["count"], len(scores))
+        self.assertAlmostEqual(row["median"], scores.median(), places=4)
+        self.assertLessEqual(row["min"], row["q1"])
+        self.assertLessEqual(row["q3"], row["max"])
+
+    def test_correlation_and_terms(self):
+        data = build_chart_data(self.df)
+        columns = data["correlation"]["columns"]
+        self.assertIn("combined_compound", columns)
+        self.assertEqual(data["correlation"]["matrix"][0][0], 1.0)
+        words = [word for word, _ in data["terms"]]
+        self.assertTrue(words)
+        self.assertNotIn("the", words)
+
+    def test_sketch_matches_in_memory_chart_data(self):
+        # Chunks summarised separately and merged, as an out-of-core run does
+        sketches = [ChartSketch().update(self.df.iloc[start:start + 70]) for start in range(0, 500, 70)]
+        for sketch in sketches[1:]:
+            sketches[0].merge(sketch)
+        expected = json.loads(json.dumps(build_chart_data(self.df)))
+        self.assertEqual(json.loads(json.dumps(sketches[0].data())), expected)
+
+    def test_sketch_thins_its_word_sample(self):
+        df = scored_frame(3000)
+        with patch("chart_data.TERMS_SAMPLE", 100):
+            sketch = ChartSketch()
+            for start in range(0, 3000, 250):
+                sketch.update(df.iloc[start:start + 250])
+        self.assertGreater(sketch.terms_step, 1)
+        self.assertLessEqual(sketch.terms_sampled, 200)
+        top = {word for word, _ in build_chart_data(df)["terms"][:5]}
+        self.assertTrue(top & {word for word, _ in sketch.data()["terms"][:10]})
+
+    def test_single_row_is_valid_json(self):
+        df = pd.DataFrame([{"id": "1", "type": "post", "text": "Great release", "subreddit": "python",
+                            "created": "2024-01-01", "vader_neg": 0.0, "vader_neu": 0.4, "vader_pos": 0.6,
+                            "vader_compound": 0.6, "textblob_polarity": 0.8, "combined_compound": 0.7}])
+        tmp = tempfile.mkdtemp()
+        try:
+            path = write_chart_data(df, chart_data_path_for(tmp, "Test Topic"))
+            self.assertTrue(path.endswith("Test_Topic_chart_data.json"))
+            with open(path, encoding="utf-8") as f:
+                data = json.loads(f.read(), parse_constant=self.fail)
+            self.assertIsNone(data["correlation"]["matrix"][0][1])
+            self.assertEqual(data["trend"]["dates"], ["2024-01-01"])
+        finally:
+            shutil.rmtree(tmp)
+
+
+class TestChartDataEndpoint(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        for name in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT", "REDDIT_USERNAME",
+                     "REDDIT_PASSWORD", "SMTP_USERNAME", "SMTP_PASSWORD", "PIXABAY_API_KEY"):
+            os.environ.setdefault(name, "test")
+        # app creates users.db and ../output relative to the working directory
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.tmp, "work"))
+        os.chdir(os.path.join(cls.tmp, "work"))
+        import app
+        cls.app_module = app
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.tmp)
+
+    def setUp(self):
+        self.runs_dir = os.path.join(self.tmp, "runs")
+        run_path = os.path.join(self.runs_dir, "run1")
+        os.makedirs(run_path, exist_ok=True)
+        chart_path = write_chart_data(scored_frame(100), chart_data_path_for(run_path, "Test Topic"))
+        write_manifest(run_path, "Test Topic", {"chart_data": chart_path})
+        self.client = self.app_module.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["email"] = "user@example.com"
+
+    def test_serves_a_runs_chart_data(self):
+        with patch.object(self.app_module.config, "RUNS_DIR", self.runs_dir):
+            response = self.client.get("/api/runs/run1/charts")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json["items"], 100)
+            self.assertIn("max-age", response.headers["Cache-Control"])
+            self.assertEqual(self.client.get("/api/runs/missing/charts").status_code, 404)
+            self.assertEqual(self.client.get("/api/runs/..%2F..%2Fetc/charts").status_code, 404)
+
+    def test_results_page_uses_interactive_charts(self):
+        with self.app_module.app.test_request_context():
+            html = self.app_module.render_template("results.html", topic="Test Topic", chart_run_id="run1",
+                                                   distribution_image="runs/run1/a.png", csv_data=[], csv_columns=[])
+        self.assertIn('data-url="/api/runs/run1/charts"', html)
+        self.assertIn('data-chart="heatmap"', html)
+        self.assertIn("Static images", html)
+        self.assertRegex(html, r'src="/static/script\.js\?v=[0-9a-f]{12}"')
+
+    def test_fingerprinted_assets_are_cached_for_good(self):
+        with self.app_module.app.test_request_context():
+            url = self.app_module.url_for("static", filename="script.js")
+        pinned = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(pinned.headers["Content-Encoding"], "gzip")
+        self.assertIn("immutable", pinned.headers["Cache-Control"])
+        unpinned = self.client.get("/static/script.js")
+        self.assertIn("no-cache", unpinned.headers["Cache-Control"])
+        revalidated = self.client.get("/static/script.js", headers={"If-None-Match": unpinned.headers["ETag"]})
+        self.assertEqual(revalidated.status_code, 304)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from synthetic_corpus import SyntheticCorpus
+from chart_data import build_chart_data
+from chunked import ChunkedAnalysis, chunks
+from pipeline import NoDataError
+from report_generator import ReportGenerator
+from results_io import read_results
+from sentiment_analyzer import SentimentAnalyzer
+
+
+class TestChunkedAnalysis(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analyzer = SentimentAnalyzer()
+        cls.items = SyntheticCorpus(seed=3).items(300)
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def _analysis(self, **kwargs):
+        return ChunkedAnalysis(self.analyzer, ReportGenerator(output_dir=self.dir), chunk_size=64, seed=0, **kwargs)
+
+    def test_chunks_are_drawn_lazily(self):
+        source = iter(range(10))
+        batches = chunks(source, 4)
+        self.assertEqual(next(batches), [0, 1, 2, 3])
+        self.assertEqual(next(source), 4)
+        self.assertEqual(list(batches), [[5, 6, 7, 8], [9]])
+
+    def test_run_matches_in_memory_analysis(self):
+        result = self._analysis().run(iter(self.items), "Chunked Topic", self.dir)
+        expected = pd.DataFrame(self.analyzer.analyze(self.items))
+        df = read_results(result["results_path"])
+        self.assertEqual(result["items"], 300)
+        self.assertEqual(list(df["id"]), list(expected["id"]))
+        pd.testing.assert_series_equal(df["combined_compound"], expected["combined_compound"])
+
+        with open(result["chart_data"], encoding="utf-8") as f:
+            self.assertEqual(json.load(f), json.loads(json.dumps(build_chart_data(expected))))
+        with open(result["report"], encoding="utf-8") as f:
+            self.assertIn("examines 300 pieces of content", f.read())
+        with open(result["manifest"], encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["items"], 300)
+        self.assertEqual(set(manifest["artifacts"]), {"results_path", "chart_data", "report"})
+
+    def test_pool_keeps_input_order(self):
+        pool = ProcessPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        result = self._analysis(process_pool=pool, max_in_flight=2).run(self.items, "Pooled", self.dir)
+        self.assertEqual(list(read_results(result["results_path"])["id"]), [item["id"] for item in self.items])
+
+    def test_summarize_stored_results(self):
+        scored = self._analysis().run(self.items, "Stored", self.dir)
+        other = os.path.join(self.dir, "again")
+        os.makedirs(other)
+        result = self._analysis().summarize(scored["results_path"], "Stored", other)
+        self.assertEqual(result["items"], 300)
+        with open(result["chart_data"], encoding="utf-8") as f, open(scored["chart_data"], encoding="utf-8") as g:
+            self.assertEqual(json.load(f), json.load(g))
+
+    def test_no_items_is_no_data(self):
+        with self.assertRaises(NoDataError):
+            self._analysis().run([], "Empty", self.dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
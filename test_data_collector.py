@@ -1,6 +1,9 @@
 import unittest
+import time
 from unittest.mock import MagicMock, patch
 from data_collector import RedditDataCollector
+from deadline import Deadline
+from fake_reddit import FakeReddit, make_collector
 from datetime import datetime
 
 class TestRedditDataCollector(unittest.TestCase):
@@ -39,6 +42,17 @@ class TestRedditDataCollector(unittest.TestCase):
         self.assertEqual(data[1]["type"], "comment")
         self.assertEqual(data[1]["text"], "Test Comment Body")
 
+    def test_collect_data_cleans_text(self):
+        submission = MagicMock(title="Test Post\nTitle", selftext="Test Post Selftext", created_utc=0, url="u")
+        comment = MagicMock(body="  Test Comment\r\n\r\nBody ", created_utc=0)
+        submission.comments.list.return_value = [comment]
+        self.mock_reddit.subreddit.return_value.search.return_value = [submission]
+
+        data = self.collector.collect_data("test_topic", post_limit=1, comment_limit=1)
+
+        self.assertEqual([d["text"] for d in data], ["Test Post Title Test Post Selftext", "Test Comment Body"])
+        self.assertTrue(data.text_cleaned)
+
     def test_collect_data_no_data(self):
         self.mock_reddit.subreddit.return_value.search.return_value = []
         data = self.collector.collect_data("non_existent_topic")
@@ -49,6 +63,70 @@ class TestRedditDataCollector(unittest.TestCase):
         data = self.collector.collect_data("test_topic")
         self.assertEqual(len(data), 0)
 
+    def test_time_budget_returns_partial_data(self):
+        # Each comment tree takes 50ms to fetch, so 20 posts need about a second
+        self.collector.reddit = FakeReddit(num_submissions=20, comments_per_submission=3, latency=0.05)
+        started = time.monotonic()
+        data = self.collector.collect_data("test_topic", post_limit=20, comment_limit=3, time_budget=0.3)
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertTrue(data.partial)
+        self.assertEqual(data.reason, "time budget reached")
+        self.assertGreater(len(data), 0)
+        self.assertLess(len(data), 80)
+
+    def test_unbounded_collection_is_complete(self):
+        self.collector.reddit = FakeReddit(num_submissions=3, comments_per_submission=2)
+        data = self.collector.collect_data("test_topic", post_limit=3, comment_limit=2, deadline=Deadline())
+        self.assertEqual(len(data), 9)
+        self.assertFalse(data.partial)
+
+    def test_subreddits_are_fetched_concurrently_and_merged_in_order(self):
+        reddit = FakeReddit(num_submissions=3, comments_per_submission=1, latency=0.05)
+        collector = make_collector(reddit)
+        started = time.monotonic()
+        data = collector.collect_data("test_topic", subreddit_name="python, news,rust", post_limit=3, comment_limit=1)
+        # One search page and three comment trees per subreddit, 0.2s each when fetched one after another
+        self.assertLess(time.monotonic() - started, 0.45)
+        self.assertEqual(len(data), 3 * 6)
+        self.assertEqual([d["subreddit"] for d in data if d["type"] == "post"], ["python"] * 3 + ["news"] * 3 + ["rust"] * 3)
+        self.assertFalse(data.partial)
+
+    def test_rate_limited_requests_are_retried(self):
+        # The server allows 20 requests/s in bursts of 2; 4 subreddits need 16
+        reddit = FakeReddit(num_submissions=3, comments_per_submission=1, server_rate=20, server_burst=2)
+        data = make_collector(reddit).collect_data("test_topic", subreddit_name=["a", "b", "c", "d"],
+                                                   post_limit=3, comment_limit=1)
+        self.assertEqual(len(data), 4 * 6)
+        self.assertGreater(reddit.rejected, 0)
+        self.assertEqual(reddit.requests, 16)
+
+    def test_failed_subreddit_marks_the_merge_partial(self):
+        good = FakeReddit(num_submissions=2, comments_per_submission=1)
+
+        def subreddit(name):
+            if name == "broken":
+                raise Exception("403 Forbidden")
+            return good.subreddit(name)
+
+        self.mock_reddit.subreddit.side_effect = subreddit
+        data = self.collector.collect_data("test_topic", subreddit_name=["python", "broken"], post_limit=2, comment_limit=1)
+        self.assertEqual(len(data), 4)
+        self.assertTrue(data.partial)
+        self.assertEqual(data.reason, "r/broken: collection failed: 403 Forbidden")
+
+    def test_errors_after_some_data_keep_it(self):
+        submission = MagicMock(title="t", selftext="s", created_utc=0, url="u")
+        submission.comments.list.return_value = []
+
+        def search(*args, **kwargs):
+            yield submission
+            raise Exception("API Error")
+
+        self.mock_reddit.subreddit.return_value.search.side_effect = search
+        data = self.collector.collect_data("test_topic")
+        self.assertEqual(len(data), 1)
+        self.assertTrue(data.partial)
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,39 @@
+import time
+import unittest
+from deadline import Deadline, DeadlineExceeded, call_with_deadline
+from fake_clock import FakeClock
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_unbounded_deadline_never_expires(self):
+        deadline = Deadline()
+        self.assertFalse(deadline.bounded)
+        self.assertEqual(deadline.remaining(), float("inf"))
+        self.assertFalse(deadline.expired())
+        self.assertFalse(deadline.share(0.5).bounded)
+
+    def test_remaining_and_share(self):
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        clock.now += 4
+        self.assertEqual(deadline.elapsed(), 4)
+        self.assertEqual(deadline.remaining(), 6)
+        self.assertEqual(deadline.share(0.5).remaining(), 3)
+        self.assertTrue(deadline.expired(margin=6))
+        clock.now += 10
+        self.assertEqual(deadline.remaining(), 0)
+        self.assertTrue(deadline.expired())
+
+    def test_call_with_deadline(self):
+        self.assertEqual(call_with_deadline(Deadline(1), sum, [1, 2]), 3)
+        with self.assertRaises(ZeroDivisionError):
+            call_with_deadline(Deadline(1), lambda: 1 / 0)
+        started = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            call_with_deadline(Deadline(0.05), time.sleep, 1)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
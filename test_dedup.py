@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import MagicMock
+from dedup import normalize, Deduplicator, score_unique
+
+LONG = "The new release finally fixes the memory leak that made the editor crash every few hours on large projects"
+
+
+class TestDeduplicator(unittest.TestCase):
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  Check THIS out!!  https://x.com/a?b=1 "), "check this out")
+        self.assertEqual(normalize(None), "")
+
+    def test_exact_and_near_duplicates(self):
+        texts = [
+            LONG,
+            "Totally unrelated comment about the weather in the city today and tomorrow",
+            "  " + LONG.replace(" ", "\n", 3) + " ",       # exact up to whitespace
+            LONG.upper() + "!!!",                       # near: same words, louder
+            LONG.replace("few hours", "couple hours"),  # near duplicate
+            "ok",
+            "OK.",
+        ]
+        result = Deduplicator(threshold=0.5).find(texts)
+        self.assertEqual(result.representative, [0, 1, 0, 0, 0, 5, 6])
+        self.assertEqual(result.scored_as, [0, 1, 0, 3, 4, 5, 6])
+        self.assertEqual((result.exact, result.near), (1, 2))
+        self.assertEqual(result.unique_indices, [0, 1, 5, 6])
+        self.assertAlmostEqual(result.ratio, 3 / 7)
+
+    def test_case_punctuation_and_empty_texts_stay_apart(self):
+        texts = [":)", ":(", "I LOVE IT!!!", "i love it", "", "", "https://x.com/a", "!!!"]
+        result = Deduplicator().find(texts)
+        self.assertEqual(result.duplicates, 0)
+        self.assertEqual(result.scored_indices, list(range(len(texts))))
+
+    def test_distinct_texts_are_kept(self):
+        texts = [f"comment number {i} talks about topic {i * 7} with its own distinct words {i * 13}" for i in range(50)]
+        result = Deduplicator().find(texts)
+        self.assertEqual(result.duplicates, 0)
+
+    def test_scores_are_fanned_out(self):
+        data = [
+            {"id": "a", "type": "post", "text": LONG, "subreddit": "python", "created": "2024-01-01", "url": "u1"},
+            {"id": "b", "type": "comment", "text": LONG, "subreddit": "news", "created": "2024-01-02", "url": "u2"},
+            {"id": "c", "type": "comment", "text": "", "subreddit": "news", "created": "2024-01-02", "url": "u2"},
+        ]
+        analyzer = MagicMock()
+        analyzer.analyze.side_effect = lambda items: [
+            {**item, "combined_compound": 0.5} for item in items if item["text"]
+        ]
+        rows, _, _ = score_unique(analyzer, data, Deduplicator().find([d["text"] for d in data]))
+        self.assertEqual([item["id"] for item in analyzer.analyze.call_args[0][0]], ["a", "c"])
+        self.assertEqual([(r["id"], r["subreddit"], r["duplicate_of"], r["combined_compound"]) for r in rows],
+                         [("a", "python", None, 0.5), ("b", "news", "a", 0.5)])
+
+    def test_near_duplicates_keep_their_own_scores(self):
+        review = LONG + " and the support team was helpful and quick to answer"
+        texts = [review, review.replace("was helpful", "was not helpful"), review + "!!!"]
+        data = [{"id": str(i), "type": "comment", "text": text, "subreddit": "s", "created": None, "url": "u"}
+                for i, text in enumerate(texts)]
+        analyzer = MagicMock()
+        analyzer.analyze.side_effect = lambda items: [
+            {**item, "combined_compound": -0.5 if " not " in item["text"] else len(item["text"])} for item in items
+        ]
+        dedup = Deduplicator(threshold=0.5).find(texts)
+        self.assertEqual(dedup.near, 2)
+        rows, _, saved = score_unique(analyzer, data, dedup)
+        self.assertEqual([(r["duplicate_of"], r["combined_compound"]) for r in rows],
+                         [(None, len(texts[0])), ("0", -0.5), ("0", len(texts[2]))])
+        self.assertEqual(saved, 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
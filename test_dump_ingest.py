@@ -0,0 +1,104 @@
+import os
+import json
+import gzip
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow as pa
+from dump_ingest import DumpFilter, DumpReader, blocks, decode_block, to_item
+
+SUBMISSION = {"id": "abc", "title": "Python 3.13 is out", "selftext": "[removed]", "subreddit": "Python",
+              "created_utc": 1704067200, "url": "https://python.org", "permalink": "/r/Python/comments/abc/"}
+COMMENT = {"id": "c1", "body": "I  love the new python REPL", "subreddit": "programming", "created_utc": "1704070800",
+           "link_id": "t3_abc", "author": "someone"}
+
+
+def _records(n):
+    for i in range(n):
+        yield {"id": f"c{i}", "body": f"comment {i} about {'pythonic' if i % 3 else 'python'} code",
+               "subreddit": "python" if i % 2 else "learnpython", "created_utc": 1704067200 + i}
+
+
+class TestDumpIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def _dump(self, name, records, extra=b""):
+        data = b"".join(json.dumps(record).encode() + b"\n" for record in records) + extra
+        path = os.path.join(self.dir, name)
+        if name.endswith(".gz"):
+            with gzip.open(path, "wb") as f:
+                f.write(data)
+        elif name.endswith(".zst"):
+            with pa.output_stream(path, compression="zstd") as f:
+                f.write(data)
+        else:
+            with open(path, "wb") as f:
+                f.write(data)
+        return path
+
+    def test_records_map_to_collector_items(self):
+        post = to_item(SUBMISSION)
+        self.assertEqual((post["id"], post["type"], post["text"].strip()), ("abc", "post", "Python 3.13 is out"))
+        self.assertEqual(post["url"], "https://python.org")
+        comment = to_item(COMMENT)
+        self.assertEqual(comment["type"], "comment")
+        self.assertEqual(comment["url"], "https://www.reddit.com/comments/abc/_/c1")
+        self.assertEqual(comment["created"].timestamp(), 1704070800)
+        self.assertEqual(set(comment), {"id", "type", "text", "created", "subreddit", "url"})
+        self.assertIsNone(to_item({**COMMENT, "body": "[deleted]"}))
+
+    def test_filter_matches_whole_keywords(self):
+        block = b"\n".join(json.dumps(r).encode() for r in (SUBMISSION, COMMENT, {**COMMENT, "body": "pythonic"}))
+        block += b"\n{not json python}\n"
+        items, records, malformed = decode_block(DumpFilter(["python"]), block)
+        self.assertEqual([item["id"] for item in items], ["abc", "c1"])
+        self.assertEqual((records, malformed), (4, 1))
+        self.assertEqual(items[1]["text"], "I love the new python REPL")
+        items, _, _ = decode_block(DumpFilter(["python"], subreddits=["PROGRAMMING"]), block)
+        self.assertEqual([item["id"] for item in items], ["c1"])
+        # Without the raw-line prefilter the result is the same
+        unfiltered, _, _ = decode_block(DumpFilter(["python"], prefilter=False), block)
+        self.assertEqual(len(unfiltered), 2)
+
+    def test_escaped_slashes_and_blank_lines(self):
+        # json.dumps does not escape "/", but other dump writers may
+        block = b'{"id": "c1", "body": "moving to c\\/c++", "created_utc": 0}\n\n  \r\n'
+        block += json.dumps({**COMMENT, "body": "no match"}).encode() + b"\n\n"
+        dump_filter = DumpFilter(["c/c++"])
+        self.assertEqual(dump_filter.needles, [])
+        items, records, malformed = decode_block(dump_filter, block)
+        self.assertEqual([item["text"] for item in items], ["moving to c/c++"])
+        self.assertEqual((records, malformed), (2, 0))
+
+    def test_blocks_end_at_line_breaks(self):
+        path = self._dump("plain.ndjson", _records(50), extra=b'{"id": "last", "body": "python", "created_utc": 0}')
+        parts = list(blocks(path, block_bytes=100))
+        self.assertGreater(len(parts), 10)
+        self.assertTrue(all(part.endswith(b"\n") for part in parts[:-1]))
+        lines = b"".join(parts).split(b"\n")
+        self.assertEqual(len(lines), 51)
+        self.assertEqual(json.loads(lines[-1])["id"], "last")
+
+    def test_compressed_dumps_read_like_plain_ones(self):
+        dumps = [self._dump(name, _records(300)) for name in ("a.ndjson", "b.ndjson.gz", "c.ndjson.zst")]
+        reader = DumpReader(DumpFilter(["python"]), block_bytes=1000)
+        ids = [item["id"] for item in reader.items(dumps)]
+        self.assertEqual(ids, [f"c{i}" for i in range(0, 300, 3)] * 3)
+        self.assertEqual(reader.stats["records"], 900)
+        self.assertEqual(reader.stats["matched"], 300)
+
+    def test_pool_keeps_file_order(self):
+        path = self._dump("big.ndjson.gz", _records(2000))
+        pool = ProcessPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        reader = DumpReader(DumpFilter(["python"], subreddits=["python"]), process_pool=pool, block_bytes=4096)
+        ids = [item["id"] for item in reader.items([path])]
+        self.assertEqual(ids, [f"c{i}" for i in range(2000) if i % 2 and not i % 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
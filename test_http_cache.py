@@ -0,0 +1,88 @@
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from http_cache import ONE_YEAR, content_etag, send_cached, variant, brotli
+
+
+class TestSendCached(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.body = json.dumps([{"subreddit": f"r{i % 7}", "compound": i / 1000} for i in range(500)]).encode()
+        with open(os.path.join(self.tmp, "chart.json"), "wb") as f:
+            f.write(self.body)
+        with open(os.path.join(self.tmp, "plot.png"), "wb") as f:
+            f.write(b"\x89PNG" + os.urandom(4096))
+        app = Flask(__name__)
+
+        @app.route("/files/<path:filename>")
+        def files(filename):
+            return send_cached(self.tmp, filename, max_age=ONE_YEAR, immutable=True)
+
+        @app.route("/fresh/<path:filename>")
+        def fresh(filename):
+            return send_cached(self.tmp, filename)
+
+        self.client = app.test_client()
+
+    def test_etag_follows_content(self):
+        path = os.path.join(self.tmp, "chart.json")
+        etag = content_etag(path)
+        with open(path, "ab") as f:
+            f.write(b" ")
+        self.assertNotEqual(content_etag(path), etag)
+
+    def test_gzip_variant_is_chosen_by_accept_encoding(self):
+        response = self.client.get("/files/chart.json", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(gzip.decompress(response.data), self.body)
+        self.assertLess(len(response.data), len(self.body) / 3)
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertIn(f"max-age={ONE_YEAR}", response.headers["Cache-Control"])
+
+        plain = self.client.get("/files/chart.json")
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(plain.data, self.body)
+        self.assertNotEqual(plain.headers["ETag"], response.headers["ETag"])
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        response = self.client.get("/files/chart.json", headers={"Accept-Encoding": "gzip, deflate, br"})
+        self.assertEqual(response.headers["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.data), self.body)
+
+    def test_images_are_sent_as_is(self):
+        response = self.client.get("/files/plot.png", headers={"Accept-Encoding": "gzip, br"})
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, "plot.png.gz")))
+
+    def test_revalidation_returns_not_modified(self):
+        first = self.client.get("/fresh/chart.json", headers={"Accept-Encoding": "gzip"})
+        self.assertIn("no-cache", first.headers["Cache-Control"])
+        again = self.client.get("/fresh/chart.json", headers={"Accept-Encoding": "gzip",
+                                                             "If-None-Match": first.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+        self.assertEqual(self.client.get("/fresh/missing.json").status_code, 404)
+        self.assertEqual(self.client.get("/fresh/..%2Fetc%2Fpasswd").status_code, 404)
+
+    def test_variant_is_rewritten_when_the_file_changes(self):
+        path = os.path.join(self.tmp, "chart.json")
+        cache = os.path.join(self.tmp, "cache")
+        first = variant(path, "gzip", variant_dir=cache)
+        with open(path, "wb") as f:
+            f.write(self.body[::-1])
+        second = variant(path, "gzip", variant_dir=cache)
+        self.assertNotEqual(first, second)
+        with open(second, "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), self.body[::-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+from job_queue import JobQueue
+from worker import Worker
+from fake_clock import FakeClock
+
+
+def _drain(path, worker_id, done_path):
+    # Claim and finish jobs until the queue is empty, logging each job run
+    queue = JobQueue(path)
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            return
+        with open(done_path, "a", encoding="utf-8") as f:
+            f.write(f"{job['id']}\n")
+        queue.complete(job["id"], worker_id, {"by": worker_id})
+
+
+def _crash_mid_job(path, claimed):
+    # Take a job, then die without completing or failing it
+    queue = JobQueue(path, lease_seconds=2)
+    queue.claim("doomed")
+    claimed.set()
+    os._exit(1)
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, "queue.db")
+
+    def test_a_job_is_claimed_once_and_completed(self):
+        queue = JobQueue(self.path)
+        job_id = queue.enqueue("analyze", {"topic": "python"})
+        job = queue.claim("a")
+        self.assertEqual((job["id"], job["payload"], job["attempts"]), (job_id, {"topic": "python"}, 1))
+        self.assertIsNone(queue.claim("b"))
+        self.assertFalse(queue.complete(job_id, "b", {"run_id": "x"}))
+        self.assertTrue(queue.complete(job_id, "a", {"run_id": "x"}))
+        done = queue.wait(job_id, timeout=0)
+        self.assertEqual((done["status"], done["result"]), ("done", {"run_id": "x"}))
+        self.assertEqual(queue.counts(), {"done": 1})
+
+    def test_same_key_shares_an_unfinished_job(self):
+        queue = JobQueue(self.path)
+        first = queue.enqueue("analyze", {"topic": "python"}, key="python")
+        self.assertEqual(queue.enqueue("analyze", {"topic": "python"}, key="python"), first)
+        self.assertNotEqual(queue.enqueue("analyze", {"topic": "rust"}, key="rust"), first)
+        queue.claim("a")
+        self.assertEqual(queue.enqueue("analyze", {"topic": "python"}, key="python"), first)
+        queue.fail(first, "a", "boom")
+        self.assertNotEqual(queue.enqueue("analyze", {"topic": "python"}, key="python"), first)
+
+    def test_expired_lease_is_taken_over_and_stale_outcome_dropped(self):
+        clock = FakeClock(1000.0)
+        queue = JobQueue(self.path, lease_seconds=10, max_attempts=2, clock=clock)
+        job_id = queue.enqueue("analyze", {})
+        queue.claim("a")
+        clock.now += 8
+        self.assertTrue(queue.heartbeat(job_id, "a"))
+        clock.now += 8
+        self.assertIsNone(queue.claim("b"))
+        clock.now += 3
+        job = queue.claim("b")
+        self.assertEqual((job["worker"], job["attempts"]), ("b", 2))
+        self.assertFalse(queue.heartbeat(job_id, "a"))
+        self.assertFalse(queue.complete(job_id, "a", {"by": "a"}))
+        # The second lease also runs out: out of attempts, the job fails
+        clock.now += 11
+        self.assertIsNone(queue.claim("c"))
+        job = queue.get(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("lease expired", job["error"])
+
+    def test_concurrent_workers_run_each_job_exactly_once(self):
+        queue = JobQueue(self.path)
+        job_ids = [queue.enqueue("analyze", {"n": n}) for n in range(60)]
+        done_path = os.path.join(self.tmp, "done.log")
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=_drain, args=(self.path, f"w{i}", done_path)) for i in range(4)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+        with open(done_path, encoding="utf-8") as f:
+            runs = [int(line) for line in f]
+        self.assertEqual(sorted(runs), job_ids)
+        self.assertEqual(queue.counts(), {"done": 60})
+
+    def test_job_of_a_crashed_worker_is_finished_by_another(self):
+        job_id = JobQueue(self.path).enqueue("analyze", {"topic": "python"})
+        context = multiprocessing.get_context("spawn")
+        claimed = context.Event()
+        process = context.Process(target=_crash_mid_job, args=(self.path, claimed))
+        process.start()
+        process.join(60)
+        self.assertTrue(claimed.is_set())
+        self.assertEqual(process.exitcode, 1)
+
+        queue = JobQueue(self.path, lease_seconds=2)
+        worker = Worker(queue, {"analyze": lambda payload: {"topic": payload["topic"]}}, worker_id="survivor")
+        self.assertFalse(worker.run_once())
+        time.sleep(2.1)
+        self.assertTrue(worker.run_once())
+        job = queue.get(job_id)
+        self.assertEqual((job["status"], job["worker"], job["attempts"]), ("done", "survivor", 2))
+        self.assertEqual(job["result"], {"topic": "python"})
+        self.assertEqual([w["worker"] for w in queue.workers()], ["survivor"])
+
+    def test_worker_fails_the_job_when_its_handler_raises(self):
+        queue = JobQueue(self.path)
+        job_id = queue.enqueue("analyze", {"topic": "nothing"})
+
+        def handler(payload):
+            raise RuntimeError(f"No data found for topic '{payload['topic']}'.")
+
+        self.assertTrue(Worker(queue, {"analyze": handler}).run_once())
+        job = queue.get(job_id)
+        self.assertEqual((job["status"], job["error"]), ("failed", "No data found for topic 'nothing'."))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import time
+from metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_timer_records_wall_cpu_and_items(self):
+        with self.registry.timer("collect_data") as t:
+            time.sleep(0.05)
+            t.items = 12
+        summary = self.registry.summary()["collect_data"]
+        self.assertEqual(summary["calls"], 1)
+        self.assertEqual(summary["items"], 12)
+        self.assertGreaterEqual(summary["wall_seconds"], 0.05)
+        self.assertLess(summary["cpu_seconds"], summary["wall_seconds"])
+
+    def test_decorator_counts_items_and_errors(self):
+        @self.registry.timed("analyze", items=lambda args, result: len(result))
+        def analyze(data):
+            if not data:
+                raise ValueError("empty")
+            return data
+
+        analyze([1, 2, 3])
+        with self.assertRaises(ValueError):
+            analyze([])
+        summary = self.registry.summary()["analyze"]
+        self.assertEqual(summary["calls"], 2)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["items"], 3)
+
+    def test_prometheus_text(self):
+        self.registry.counter("sentinent_requests_total", "Requests.").inc(route="/analyze")
+        self.registry.record_stage("analyze", 0.2, 0.1, items=5)
+        text = self.registry.to_prometheus()
+        self.assertIn("# TYPE sentinent_requests_total counter", text)
+        self.assertIn('sentinent_requests_total{route="/analyze"} 1', text)
+        self.assertIn('sentinent_stage_wall_seconds_bucket{stage="analyze",le="0.25"} 1', text)
+        self.assertIn('sentinent_stage_wall_seconds_bucket{stage="analyze",le="+Inf"} 1', text)
+        self.assertIn('sentinent_stage_items_total{stage="analyze"} 5', text)
+
+    def test_snapshot_merge(self):
+        other = MetricsRegistry()
+        other.record_stage("plot_sentiment_heatmap", 1.5, 1.4, items=10)
+        self.registry.record_stage("plot_sentiment_heatmap", 0.5, 0.4, items=10)
+        self.registry.merge(other.snapshot())
+        summary = self.registry.summary()["plot_sentiment_heatmap"]
+        self.assertEqual(summary["calls"], 2)
+        self.assertEqual(summary["items"], 20)
+        self.assertAlmostEqual(summary["wall_seconds"], 2.0)
+        self.assertAlmostEqual(summary["wall_seconds_max"], 1.5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from pipeline import Pipeline, PipelineError, NoDataError, build_analysis_pipeline
+from sentiment_analyzer import SentimentAnalyzer
+from visualization_generator import VisualizationGenerator
+from report_generator import ReportGenerator
+from results_store import ResultsStore
+from metrics import registry, timed
+from data_collector import CollectedData
+from deadline import DeadlineExceeded
+from progress import Progress
+
+
+def square(x):
+    return x * x
+
+
+@timed("timed_square")
+def timed_square(x):
+    return x * x
+
+
+def fail():
+    raise RuntimeError("boom")
+
+
+def spread(cpu_map, items):
+    return sorted(cpu_map(square, items))
+
+
+class RecordingProgress(Progress):
+    def __init__(self):
+        self.stages = []
+        self.values = {}
+
+    def stage(self, name, label, status, seconds=None):
+        self.stages.append((name, status))
+
+    def add(self, **counts):
+        for name, amount in counts.items():
+            self.values[name] = self.values.get(name, 0) + amount
+
+    def update(self, **values):
+        self.values.update(values)
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_stages_receive_their_inputs(self):
+        pipeline = Pipeline(max_workers=2, use_processes=False)
+        pipeline.add_stage("double", lambda x: x * 2, inputs=("x",))
+        pipeline.add_stage("total", lambda x, double: x + double, inputs=("x", "double"))
+        result = pipeline.run(x=3)
+        self.assertEqual(result["double"], 6)
+        self.assertEqual(result["total"], 9)
+        self.assertIn("total", result.timings)
+
+    def test_independent_stages_overlap(self):
+        pipeline = Pipeline(max_workers=2, use_processes=False)
+        pipeline.add_stage("a", lambda: time.sleep(0.3) or "a")
+        pipeline.add_stage("b", lambda: time.sleep(0.3) or "b")
+        started = time.perf_counter()
+        pipeline.run()
+        self.assertLess(time.perf_counter() - started, 0.55)
+
+    def test_cpu_stage_runs_in_process_pool(self):
+        pipeline = Pipeline(max_workers=2, use_processes=True)
+        pipeline.add_stage("squared", square, inputs=("x",), kind="cpu")
+        self.assertEqual(pipeline.run(x=7)["squared"], 49)
+
+    def test_cpu_map_spreads_chunks_over_processes(self):
+        for use_processes in (True, False):
+            pipeline = Pipeline(max_workers=2, use_processes=use_processes)
+            pipeline.add_stage("squares", spread, inputs=("cpu_map", "items"))
+            self.assertEqual(pipeline.run(items=[1, 2, 3])["squares"], [(0, 1), (1, 4), (2, 9)])
+
+    def test_process_stage_metrics_are_merged(self):
+        registry.reset()
+        pipeline = Pipeline(max_workers=2, use_processes=True)
+        pipeline.add_stage("squared", timed_square, inputs=("x",), kind="cpu")
+        pipeline.run(x=3)
+        self.assertEqual(registry.summary()["timed_square"]["calls"], 1)
+
+    def test_optional_failure_does_not_block(self):
+        pipeline = Pipeline(max_workers=2, use_processes=False)
+        pipeline.add_stage("image", fail, optional=True)
+        pipeline.add_stage("report", lambda image: f"image={image}", inputs=("image",))
+        result = pipeline.run()
+        self.assertIsNone(result["image"])
+        self.assertEqual(result["report"], "image=None")
+        self.assertIn("image", result.errors)
+
+    def test_required_failure_raises(self):
+        pipeline = Pipeline(max_workers=2, use_processes=False)
+        pipeline.add_stage("collect", fail, label="Data collection")
+        pipeline.add_stage("analyze", lambda collect: collect, inputs=("collect",))
+        with self.assertRaises(PipelineError) as ctx:
+            pipeline.run()
+        self.assertEqual(ctx.exception.stage, "collect")
+        self.assertEqual(str(ctx.exception), "Data collection error: boom")
+
+    def test_slow_optional_stage_is_abandoned_at_the_budget(self):
+        pipeline = Pipeline(max_workers=2, use_processes=False, time_budget=0.2)
+        pipeline.add_stage("image", lambda: time.sleep(1) or "image", optional=True)
+        pipeline.add_stage("report", lambda image, deadline: f"image={image}", inputs=("image", "deadline"))
+        started = time.perf_counter()
+        result = pipeline.run()
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertEqual(result["report"], "image=None")
+        self.assertIsInstance(result.errors["image"], DeadlineExceeded)
+
+    def test_unknown_input_rejected(self):
+        pipeline = Pipeline(use_processes=False)
+        pipeline.add_stage("a", lambda missing: missing, inputs=("missing",))
+        with self.assertRaises(ValueError):
+            pipeline.run()
+
+
+class TestAnalysisPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.config = SimpleNamespace(
+            OUTPUT_DIR=self.output_dir,
+            PIPELINE_MAX_WORKERS=2,
+            PIPELINE_USE_PROCESSES=False,
+            RENDER_CHART_PNGS=True,
+            ANALYSIS_TIME_BUDGET_SECONDS=0,
+            COLLECTION_BUDGET_SHARE=0.6,
+            DEDUP_ENABLED=True,
+            DEDUP_THRESHOLD=0.7,
+            DEDUP_DROP_DUPLICATES=False,
+            SAMPLE_SIZE=0,
+            SAMPLE_STRATA=["subreddit", "type"],
+            SAMPLE_CONFIDENCE=0.95,
+            DEFAULT_SUBREDDIT="all",
+            DEFAULT_POST_LIMIT=10,
+            DEFAULT_COMMENT_LIMIT=10,
+        )
+        self.collector = MagicMock()
+        self.collector.collect_data.return_value = [
+            {"id": "1", "type": "post", "text": "I love Python, it's the best language!", "subreddit": "python", "created": "2023-01-01", "url": ""},
+            {"id": "2", "type": "comment", "text": "I hate bugs, they are so annoying.", "subreddit": "programming", "created": "2023-01-02", "url": ""},
+            {"id": "3", "type": "comment", "text": "The sky is blue.", "subreddit": "python", "created": "2023-01-02", "url": ""},
+        ]
+        self.image_search = MagicMock()
+        self.image_search.search_and_download_image.side_effect = Exception("Pixabay down")
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def _build(self):
+        return build_analysis_pipeline(
+            self.collector, SentimentAnalyzer(), VisualizationGenerator(),
+            ReportGenerator(output_dir=self.output_dir), self.image_search, self.config
+        )
+
+    def test_full_run_survives_image_failure(self):
+        result = self._build().run(topic="Test Topic", output_dir=self.output_dir)
+        self.assertTrue(os.path.exists(result["report"]))
+        self.assertEqual(os.path.dirname(result["manifest"]), self.output_dir)
+        self.assertTrue(os.path.exists(result["results_path"]))
+        self.assertIsNone(result["topic_image"])
+        self.assertEqual(len(result["sentiment_df"]), 3)
+        self.assertTrue(result["chart_data"].endswith("_chart_data.json"))
+
+    def test_png_charts_are_optional(self):
+        self.config.RENDER_CHART_PNGS = False
+        result = self._build().run(topic="Test Topic", output_dir=self.output_dir)
+        self.assertIsNone(result.get("plots"))
+        self.assertTrue(os.path.exists(result["report"]))
+        with open(result["manifest"], encoding="utf-8") as f:
+            artifacts = json.load(f)["artifacts"]
+        self.assertIn("chart_data", artifacts)
+        self.assertFalse(any(name.endswith(".png") for name in os.listdir(self.output_dir)))
+
+    def test_results_are_stored(self):
+        store = ResultsStore(os.path.join(self.output_dir, "results.db"))
+        pipeline = build_analysis_pipeline(
+            self.collector, SentimentAnalyzer(), VisualizationGenerator(),
+            ReportGenerator(output_dir=self.output_dir), self.image_search, self.config, results_store=store
+        )
+        run_dir = os.path.join(self.output_dir, "run1")
+        os.makedirs(run_dir)
+        result = pipeline.run(topic="Test Topic", output_dir=run_dir)
+        self.assertEqual(result["run_id"], "run1")
+        self.assertEqual(store.aggregate(topic="test topic", group_by=None)[0]["items"], 3)
+        store.close()
+
+    def test_duplicates_are_scored_once(self):
+        items = self.collector.collect_data.return_value
+        items.append({**items[0], "id": "4", "subreddit": "programming"})
+        result = self._build().run(topic="Test Topic", output_dir=self.output_dir)
+        df = result["sentiment_df"]
+        self.assertEqual(len(df), 4)
+        self.assertEqual(df.loc[df["id"] == "4", "duplicate_of"].iloc[0], "1")
+        self.assertEqual(result["dedup_stats"]["exact_duplicates"], 1)
+        with open(result["report"], encoding="utf-8") as f:
+            self.assertIn("Duplicate Ratio", f.read())
+
+        self.config.DEDUP_DROP_DUPLICATES = True
+        self.assertEqual(len(self._build().run(topic="Test Topic", output_dir=self.output_dir)["sentiment_df"]), 3)
+
+    def test_partial_collection_is_reported(self):
+        data = CollectedData(self.collector.collect_data.return_value)
+        data.mark_partial("deadline", "time budget reached")
+        data.seconds = 12.5
+        self.collector.collect_data.return_value = data
+        self.config.ANALYSIS_TIME_BUDGET_SECONDS = 30
+        result = self._build().run(topic="Test Topic", output_dir=self.output_dir)
+        self.assertTrue(result["collection"]["partial"])
+        self.assertLessEqual(self.collector.collect_data.call_args.kwargs["deadline"].seconds, 30 * 0.6)
+        with open(result["report"], encoding="utf-8") as f:
+            self.assertIn("Partial results:** data collection stopped early (time budget reached) "
+                          "after gathering 3 items in 12.5s", f.read())
+
+    def test_sampling_mode_scores_a_sample(self):
+        items = self.collector.collect_data.return_value
+        items.extend({**items[i % 3], "id": str(i), "text": f"Comment number {i} about Python"} for i in range(4, 40))
+        self.config.SAMPLE_SIZE = 10
+        result = self._build().run(topic="Test Topic", output_dir=self.output_dir)
+        self.assertEqual(len(result["sentiment_df"]), 10)
+        self.assertEqual((result["collection"]["items"], result["collection"]["sampled"]), (39, 10))
+        self.assertEqual(result["sampling"]["population"], 39)
+        with open(result["report"], encoding="utf-8") as f:
+            report = f.read()
+        self.assertIn("Sampled:** 10 of 39 collected items were scored (stratified by subreddit, type)", report)
+        self.assertIn("### 1.6 Sampling Estimates", report)
+
+    def test_progress_is_reported(self):
+        progress = RecordingProgress()
+        self._build().run(topic="Test Topic", output_dir=self.output_dir, progress=progress)
+        self.assertEqual(progress.stages[0], ("data", "started"))
+        self.assertIn(("manifest", "finished"), progress.stages)
+        self.assertEqual(progress.values["scored"], 3)
+        self.assertEqual(progress.values["to_score"], 3)
+        self.assertIn("scored_mean", progress.values)
+        self.assertIs(self.collector.collect_data.call_args.kwargs["progress"], progress)
+
+    def test_no_data(self):
+        self.collector.collect_data.return_value = []
+        with self.assertRaises(PipelineError) as ctx:
+            self._build().run(topic="Nothing", output_dir=self.output_dir)
+        self.assertIsInstance(ctx.exception.error, NoDataError)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pstats
+import time
+import threading
+import tracemalloc
+from pipeline import Pipeline
+from profiling import StageProfiler, profile_dir_for
+
+
+def build_list(n):
+    return [str(i) * 10 for i in range(n)]
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_writes_profiles_per_stage(self):
+        profiler = StageProfiler(self.output_dir, top_n=5)
+        pipeline = Pipeline(max_workers=4, use_processes=True, profiler=profiler)
+        pipeline.add_stage("items", build_list, inputs=("n",), kind="cpu")
+        pipeline.add_stage("count", lambda items: len(items), inputs=("items",))
+        result = pipeline.run(n=20000)
+        self.assertEqual(result["count"], 20000)
+
+        for stage in ("items", "count"):
+            stats = pstats.Stats(os.path.join(self.output_dir, f"{stage}.pstats"))
+            self.assertGreater(stats.total_calls, 0)
+            snapshot = tracemalloc.Snapshot.load(os.path.join(self.output_dir, f"{stage}.tracemalloc"))
+            self.assertIsNotNone(snapshot)
+        self.assertGreater(profiler.summaries["items"]["peak_traced_bytes"], 0)
+        report = profiler.format_report()
+        self.assertIn("Stage 'items'", report)
+        self.assertIn("build_list", report)
+
+    def test_concurrent_profiled_runs(self):
+        # A second profiled run finishing a stage while the first is still
+        # in one must not stop the first one's tracing
+        first_running = threading.Event()
+        results, errors = {}, []
+
+        def slow_stage():
+            first_running.set()
+            time.sleep(0.3)
+            return build_list(5000)
+
+        def run(name, func):
+            try:
+                profiler = StageProfiler(profile_dir_for(os.path.join(self.output_dir, name)))
+                results[name] = profiler.run_stage("items", func)
+            except Exception as e:
+                errors.append(e)
+
+        first = threading.Thread(target=run, args=("first", slow_stage))
+        first.start()
+        first_running.wait(timeout=5)
+        second = threading.Thread(target=run, args=("second", lambda: build_list(10)))
+        second.start()
+        for thread in (first, second):
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(set(results), {"first", "second"})
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, "first", "profiles", "items.tracemalloc")))
+
+if __name__ == "__main__":
+    unittest.main()
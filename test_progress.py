@@ -0,0 +1,146 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from progress import ProgressBroker, ProgressReporter, ProgressChannel, StreamLimiter, event_stream
+from fake_clock import FakeClock
+
+
+def parse(body):
+    """(event, data) pairs from an event-stream body."""
+    events = []
+    for frame in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestProgress(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = ProgressBroker(history=50, linger_seconds=60)
+
+    def test_counter_changes_are_coalesced(self):
+        clock = FakeClock()
+        reporter = ProgressReporter(self.broker.reporter("k").channel, interval=1.0, clock=clock)
+        for _ in range(100):
+            reporter.add(collected=1)
+        clock.now = 2.0
+        reporter.add(collected=1)
+        reporter.update(scored_mean=0.25)
+        # A stage change flushes the pending counters first
+        reporter.stage("sentiment_df", "Sentiment analysis", "started")
+        reporter.finish()
+        frames, _, closed = reporter.channel.events_after(0)
+        self.assertTrue(closed)
+        self.assertEqual(parse("".join(frames)), [
+            ("progress", {"collected": 1}),
+            ("progress", {"collected": 101}),
+            ("progress", {"collected": 101, "scored_mean": 0.25}),
+            ("stage", {"stage": "sentiment_df", "label": "Sentiment analysis", "status": "started"}),
+            ("done", {"ok": True, "error": None}),
+        ])
+
+    def test_waiting_for_new_events(self):
+        reporter = self.broker.reporter("k")
+        reporter.stage("data", "Data collection", "started")
+        frames, last_id, _ = reporter.channel.events_after(0)
+        self.assertEqual(len(frames), 1)
+        threading.Timer(0.05, reporter.finish, kwargs={"error": "No data"}).start()
+        frames, _, closed = reporter.channel.events_after(last_id, timeout=5)
+        self.assertTrue(closed)
+        self.assertEqual(parse("".join(frames)), [("done", {"ok": False, "error": "No data"})])
+
+    def test_new_run_replaces_channel_with_later_ids(self):
+        first = self.broker.reporter("k")
+        first.stage("data", "Data collection", "started")
+        _, first_last, _ = first.channel.events_after(0)
+        second = self.broker.reporter("k")
+        second.stage("data", "Data collection", "started")
+        self.assertIs(self.broker.channel("k"), second.channel)
+        self.assertEqual(len(second.channel.events_after(first_last)[0]), 1)
+
+    def test_finished_channels_expire(self):
+        broker = ProgressBroker(linger_seconds=0)
+        broker.reporter("k").finish()
+        self.assertIsNone(broker.channel("k"))
+
+    def test_history_is_bounded(self):
+        channel = ProgressChannel(iter(range(1, 1000)), history=5)
+        for i in range(20):
+            channel.publish("progress", {"collected": i})
+        frames, last_id, _ = channel.events_after(0)
+        self.assertEqual([data["collected"] for _, data in parse("".join(frames))], [15, 16, 17, 18, 19])
+        self.assertEqual(last_id, 20)
+
+    def test_watchers_beyond_the_cap_poll(self):
+        reporter = self.broker.reporter("k")
+        reporter.stage("data", "Data collection", "started")
+        body = "".join(event_stream(reporter.channel, 0, StreamLimiter(0), retry_ms=1500))
+        self.assertTrue(body.startswith("retry: 1500\n\n"))
+        self.assertEqual(parse(body), [("stage", {"stage": "data", "label": "Data collection", "status": "started"})])
+
+    def test_held_stream_follows_the_run(self):
+        reporter = self.broker.reporter("k")
+        limiter = StreamLimiter(1)
+        threading.Timer(0.05, reporter.finish).start()
+        body = "".join(event_stream(reporter.channel, 0, limiter, hold_seconds=5))
+        self.assertEqual(parse(body), [("done", {"ok": True, "error": None})])
+        # The slot was given back
+        self.assertTrue(limiter.acquire())
+
+    def test_unknown_run_only_sets_the_retry(self):
+        self.assertEqual("".join(event_stream(None, 0, StreamLimiter(1), retry_ms=1000)), "retry: 1000\n\n")
+
+
+class TestProgressEndpoint(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        for name in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT", "REDDIT_USERNAME",
+                     "REDDIT_PASSWORD", "SMTP_USERNAME", "SMTP_PASSWORD", "PIXABAY_API_KEY"):
+            os.environ.setdefault(name, "test")
+        # app creates users.db and ../output relative to the working directory
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.tmp, "work"))
+        os.chdir(os.path.join(cls.tmp, "work"))
+        import app
+        cls.app_module = app
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.tmp)
+
+    def setUp(self):
+        self.client = self.app_module.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["email"] = "user@example.com"
+
+    def test_streams_a_runs_events(self):
+        reporter = self.app_module.progress_broker.reporter(self.app_module.progress_key("Python "))
+        reporter.stage("data", "Data collection", "started")
+        reporter.update(collected=40)
+        reporter.finish()
+        response = self.client.get("/api/progress?topic=python")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertEqual([event for event, _ in parse(response.get_data(as_text=True))],
+                         ["stage", "progress", "done"])
+
+        # Resuming after the first event skips it
+        frames, _, _ = reporter.channel.events_after(0)
+        first_id = frames[0].split("\n", 1)[0].split(": ")[1]
+        response = self.client.get("/api/progress?topic=python", headers={"Last-Event-ID": first_id})
+        self.assertEqual([event for event, _ in parse(response.get_data(as_text=True))], ["progress", "done"])
+
+    def test_requires_a_topic(self):
+        self.assertEqual(self.client.get("/api/progress").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import shutil
+import tempfile
+import unittest
+from functools import partial
+from synthetic_corpus import scored_frame
+from pipeline import _render, _timed_call_in_process
+from renderer import renderer_pool, warm_up_seconds
+from visualization_generator import VisualizationGenerator
+
+
+class TestRendererPool(unittest.TestCase):
+
+    def test_warm_pool_renders_charts(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        pool = renderer_pool(2)
+        self.addCleanup(pool.shutdown)
+        stage = partial(_render, VisualizationGenerator(), "plot_sentiment_heatmap")
+        kwargs = {"output_dir": output_dir, "sentiment_df": scored_frame(200), "topic": "warm"}
+        paths = [pool.submit(_timed_call_in_process, stage, kwargs).result()[0] for _ in range(3)]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        # Both processes were started and warmed up front, whatever ran on them
+        self.assertEqual(len(pool._processes), 2)
+        self.assertGreaterEqual(warm_up_seconds.get()["count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
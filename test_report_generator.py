@@ -41,5 +41,13 @@ class TestReportGenerator(unittest.TestCase):
         self.assertTrue(os.path.exists(report_file))
         self.assertTrue(report_file.endswith("_sentiment_report.md"))
 
+    def test_text_is_cleaned_unless_already_clean(self):
+        paths = (self.dummy_plot_path, self.dummy_wordcloud_path, self.dummy_sentiment_counts_path)
+        self.test_df.loc[0, "text"] = "Python\n  is great"
+        self.reporter.generate_summary_report(self.test_df, "Test Report", *paths, text_cleaned=True)
+        self.assertEqual(self.test_df.loc[0, "text"], "Python\n  is great")
+        self.reporter.generate_summary_report(self.test_df, "Test Report", *paths)
+        self.assertEqual(self.test_df.loc[0, "text"], "Python is great")
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from synthetic_corpus import scored_frame
+from results_io import (
+    results_path_for, write_results, read_results, read_preview, export_csv, ResultsWriter, iter_results
+)
+
+
+class TestResultsIO(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.df = scored_frame(300)
+        self.path = write_results(self.df, results_path_for(self.dir, "Test Topic"))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip_keeps_types(self):
+        self.assertTrue(self.path.endswith("Test_Topic_sentiment_results.parquet"))
+        df = read_results(self.path)
+        self.assertEqual(len(df), 300)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["created"]))
+        self.assertIsInstance(df["subreddit"].dtype, pd.CategoricalDtype)
+        pd.testing.assert_series_equal(df["combined_compound"], self.df["combined_compound"])
+        self.assertEqual(list(df["text"]), list(self.df["text"]))
+
+    def test_string_dates_are_parsed(self):
+        df = pd.DataFrame({"id": ["1"], "type": ["post"], "subreddit": ["python"], "created": ["2023-01-02"],
+                           "text": ["hello"], "combined_compound": [0.5]})
+        path = write_results(df, os.path.join(self.dir, "strings.parquet"))
+        self.assertEqual(read_results(path)["created"][0], pd.Timestamp("2023-01-02"))
+
+    def test_preview_reads_only_requested_rows(self):
+        preview = read_preview(self.path, rows=20)
+        self.assertEqual(len(preview), 20)
+        self.assertEqual(list(preview["id"]), list(self.df["id"][:20]))
+        self.assertEqual(list(read_preview(self.path, rows=5, columns=["id", "text"]).columns), ["id", "text"])
+
+    def test_writer_appends_chunks(self):
+        path = os.path.join(self.dir, "chunked.parquet")
+        # The second chunk has more subreddits than the first one's dictionary indices could hold
+        wide = scored_frame(200).assign(subreddit=[f"sub{i}" for i in range(200)])
+        with ResultsWriter(path) as writer:
+            writer.write(self.df)
+            writer.write(wide)
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(writer.rows, 500)
+        df = read_results(path)
+        self.assertEqual(list(df["subreddit"].astype(str)),
+                         list(self.df["subreddit"]) + list(wide["subreddit"]))
+        self.assertEqual([len(chunk) for chunk in iter_results(path, batch_size=150)], [150, 150, 150, 50])
+
+    def test_csv_export_is_cached(self):
+        csv_path = export_csv(self.path)
+        self.assertEqual(len(pd.read_csv(csv_path)), 300)
+        mtime = os.path.getmtime(csv_path)
+        self.assertEqual(export_csv(self.path), csv_path)
+        self.assertEqual(os.path.getmtime(csv_path), mtime)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from synthetic_corpus import scored_frame
+from results_store import ResultsStore, SearchIndexer
+
+
+class TestResultsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = ResultsStore(os.path.join(self.dir, "results.db"))
+        self.df = scored_frame(500)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def test_aggregate_by_subreddit_matches_pandas(self):
+        self.store.save_run("run1", "Python", self.df)
+        rows = {r["group"]: r for r in self.store.aggregate(topic="python", group_by="subreddit")}
+        expected = self.df.groupby("subreddit")["combined_compound"].agg(["size", "mean"])
+        self.assertEqual(set(rows), set(expected.index))
+        for subreddit, (size, mean) in expected.iterrows():
+            self.assertEqual(rows[subreddit]["items"], size)
+            self.assertAlmostEqual(rows[subreddit]["mean_compound"], mean, places=4)
+
+    def test_date_range_and_run_filters(self):
+        self.store.save_run("run1", "Python", self.df)
+        self.store.save_run("run2", "Python", self.df.iloc[:100])
+        days = sorted(r["group"] for r in self.store.aggregate(topic="Python", group_by="day"))
+        start, end = days[1], days[2]
+        in_range = self.store.aggregate(topic="Python", group_by=None, start=start, end=end, run_id="run1")
+        created = self.df["created"].dt.strftime("%Y-%m-%d")
+        self.assertEqual(in_range[0]["items"], int(((created >= start) & (created <= end)).sum()))
+        self.assertEqual([(r["group"], r["items"]) for r in self.store.aggregate(topic="python", group_by="run")],
+                         [("run1", 500), ("run2", 100)])
+        self.assertEqual({r["run_id"] for r in self.store.runs("python")}, {"run1", "run2"})
+
+    def test_undated_items_fall_outside_date_ranges(self):
+        df = self.df.copy()
+        df.loc[df.index[:20], "created"] = None
+        self.store.save_run("run1", "Python", df)
+        days = self.store.aggregate(topic="Python", group_by="day")
+        self.assertEqual([(r["group"], r["items"]) for r in days if r["group"] is None], [(None, 20)])
+        first = min(r["group"] for r in days if r["group"] is not None)
+        self.assertEqual(self.store.aggregate(group_by=None)[0]["items"], 500)
+        self.assertEqual(self.store.aggregate(group_by=None, start=first)[0]["items"], 480)
+        self.assertIsNone(self.store.items("run1", limit=1)[0]["day"])
+
+    def test_resaving_a_run_replaces_it(self):
+        self.store.save_run("run1", "Python", self.df)
+        self.store.save_run("run1", "Python", self.df.iloc[:10])
+        self.assertEqual(self.store.aggregate(group_by=None)[0]["items"], 10)
+        self.assertEqual(len(self.store.items("run1", limit=100)), 10)
+
+    def test_search_is_incremental_and_ranked(self):
+        self.store.save_run("run1", "Python", self.df.iloc[:200])
+        self.assertEqual(self.store.search("python")[0], [])
+        self.assertEqual(self.store.index_pending(batch_size=150), 150)
+        self.assertEqual(self.store.index_pending(batch_size=150), 50)
+        self.assertEqual(self.store.unindexed_count(), 0)
+
+        rows, has_more = self.store.search("broken release", limit=5)
+        expected = self.df.iloc[:200]["text"].str.lower().str.contains("broken") & \
+            self.df.iloc[:200]["text"].str.lower().str.contains("release")
+        self.assertEqual(len(rows), min(5, int(expected.sum())))
+        self.assertEqual(has_more, int(expected.sum()) > 5)
+        self.assertTrue(all("broken" in r["text"].lower() and "release" in r["text"].lower() for r in rows))
+        self.assertEqual([r["rank"] for r in rows], sorted(r["rank"] for r in rows))
+        self.assertIn("combined_compound", rows[0])
+
+        page2, _ = self.store.search("broken release", limit=5, offset=5)
+        self.assertFalse({r["item_id"] for r in rows} & {r["item_id"] for r in page2})
+
+    def test_resaved_run_is_removed_from_search(self):
+        self.store.save_run("run1", "Python", self.df.iloc[:50])
+        self.store.index_pending()
+        self.store.save_run("run1", "Python", self.df.iloc[50:60])
+        self.store.index_pending()
+        ids = {r["item_id"] for r in self.store.search("the", limit=100)[0]}
+        self.assertTrue(ids <= set(self.df.iloc[50:60]["id"]))
+
+    def test_search_ignores_query_syntax(self):
+        self.store.save_run("run1", "Python", self.df.iloc[:20])
+        self.store.index_pending()
+        self.assertIsInstance(self.store.search('python" OR NEAR(')[0], list)
+        self.assertEqual(self.store.search("!!!"), ([], False))
+
+    def test_background_indexer_catches_up(self):
+        indexer = SearchIndexer(self.store, interval_seconds=5).start()
+        try:
+            self.store.save_run("run1", "Python", self.df.iloc[:100])
+            deadline = time.monotonic() + 5
+            while self.store.unindexed_count() and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            indexer.stop()
+        self.assertEqual(self.store.unindexed_count(), 0)
+
+    def test_invalid_group(self):
+        with self.assertRaises(ValueError):
+            self.store.aggregate(group_by="text")
+
+
+if __name__ == "__main__":
+    unittest.main()
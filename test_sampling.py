@@ -0,0 +1,56 @@
+import unittest
+from collections import Counter
+import pandas as pd
+from synthetic_corpus import scored_frame
+from sampling import Sampler, Sample, estimate
+
+
+class TestSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.df = scored_frame(20000)
+        self.items = self.df.to_dict("records")
+
+    def test_small_collections_are_not_sampled(self):
+        items = self.items[:50]
+        self.assertIs(Sampler(100).sample(items), items)
+        self.assertIsNone(estimate(self.df.iloc[:50], items))
+
+    def test_strata_are_sampled_in_proportion(self):
+        sample = Sampler(2000, seed=1).sample(self.items)
+        self.assertIsInstance(sample, Sample)
+        self.assertEqual(sample.population_size, 20000)
+        self.assertLessEqual(abs(len(sample) - 2000), len(sample.population))
+        counts = Counter((item["subreddit"], item["type"]) for item in sample)
+        for key, size in sample.population.items():
+            self.assertLessEqual(abs(counts[key] - size / 10), 2, key)
+        # Collection order is kept
+        ids = [item["id"] for item in self.items]
+        positions = [ids.index(item["id"]) for item in sample[:50]]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_reservoir_sample_is_uniform(self):
+        items = [{"id": i} for i in range(100)]
+        picks = Counter(item["id"] for seed in range(400) for item in Sampler(10, strata=(), seed=seed).sample(items))
+        self.assertEqual(sum(picks.values()), 4000)
+        # Each item is expected 40 times; allow generous slack
+        self.assertLess(max(picks.values()), 70)
+        self.assertGreater(min(picks.values()), 15)
+
+    def test_confidence_intervals_cover_the_full_result(self):
+        truth = self.df["combined_compound"].mean()
+        truth_positive = (self.df["combined_compound"] >= 0.05).mean() * 100
+        covered = 0
+        for seed in range(40):
+            sample = Sampler(1000, seed=seed).sample(self.items)
+            result = estimate(pd.DataFrame(list(sample)), sample)
+            self.assertEqual((result["population"], result["sample"]), (20000, len(sample)))
+            mean, positive = result["mean_combined_compound"], result["positive_percentage"]
+            self.assertLess(mean["high"] - mean["low"], 0.1)
+            covered += mean["low"] <= truth <= mean["high"] and positive["low"] <= truth_positive <= positive["high"]
+        # Both 95% intervals hold in nearly every run
+        self.assertGreaterEqual(covered, 34)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight(freshness_seconds=0)
+        calls = []
+        release = threading.Event()
+
+        def work():
+            calls.append(1)
+            release.wait(2)
+            return {"report": "shared"}
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(flight.do, ("python",), work) for _ in range(5)]
+            time.sleep(0.2)
+            release.set()
+            results = [f.result() for f in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r[0] is results[0][0] for r in results))
+        self.assertEqual(sorted(r[1] for r in results), ["joined"] * 4 + ["leader"])
+
+    def test_fresh_result_is_reused_until_it_expires(self):
+        flight = SingleFlight(freshness_seconds=0.2)
+        counter = iter(range(10))
+        self.assertEqual(flight.do("k", lambda: next(counter)), (0, "leader"))
+        self.assertEqual(flight.do("k", lambda: next(counter)), (0, "fresh"))
+        time.sleep(0.25)
+        self.assertEqual(flight.do("k", lambda: next(counter)), (1, "leader"))
+
+    def test_expired_results_of_other_keys_are_dropped(self):
+        flight = SingleFlight(freshness_seconds=0.2)
+        for key in ("a", "b", "c"):
+            flight.do(key, lambda: 0)
+        time.sleep(0.25)
+        flight.do("d", lambda: "d")
+        self.assertEqual(list(flight._fresh), ["d"])
+
+    def test_failures_propagate_and_are_not_cached(self):
+        flight = SingleFlight(freshness_seconds=60)
+        release = threading.Event()
+
+        def failing():
+            release.wait(2)
+            raise ValueError("reddit down")
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(flight.do, "k", failing) for _ in range(3)]
+            time.sleep(0.2)
+            release.set()
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result()
+        self.assertEqual(flight.do("k", lambda: "ok"), ("ok", "leader"))
+
+    def test_different_keys_run_independently(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("a", lambda: 1)[0], 1)
+        self.assertEqual(flight.do("b", lambda: 2)[0], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from synthetic_corpus import scored_frame
+from streaming_stats import (
+    SentimentSketch, QuantileSketch, RunningMoments, METRIC_COLUMNS, TOP_COLUMNS
+)
+from report_generator import ReportGenerator
+
+
+def _merged(df, parts, **kwargs):
+    # Contiguous shares, as workers reading a file would get them
+    bounds = np.linspace(0, len(df), parts + 1).astype(int)
+    sketches = [SentimentSketch(seed=i, **kwargs).update(df.iloc[start:end])
+                for i, (start, end) in enumerate(zip(bounds, bounds[1:]))]
+    for sketch in sketches[1:]:
+        sketches[0].merge(sketch)
+    return sketches[0]
+
+
+class TestStreamingStats(unittest.TestCase):
+
+    def test_moments_merge_matches_pandas(self):
+        values = np.random.default_rng(1).normal(0.2, 0.5, 10001)
+        moments = RunningMoments()
+        for part in np.array_split(values, 7):
+            moments.merge(RunningMoments().update(part))
+        series = pd.Series(values)
+        self.assertEqual(moments.count, len(values))
+        self.assertAlmostEqual(moments.mean, series.mean(), places=12)
+        self.assertAlmostEqual(moments.variance, series.var(), places=12)
+        self.assertEqual((moments.min, moments.max), (series.min(), series.max()))
+        self.assertTrue(np.isnan(RunningMoments().update([1.0]).variance))
+
+    def test_quantile_rank_error_is_bounded(self):
+        values = np.random.default_rng(2).normal(size=200000)
+        sketch = QuantileSketch(k=200, seed=0, exact_limit=0)
+        for part in np.array_split(values, 40):
+            sketch.update(part)
+        self.assertFalse(sketch.exact)
+        self.assertLess(sketch.retained, 1000)
+        ordered = np.sort(values)
+        for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+            rank = np.searchsorted(ordered, sketch.quantile(q)) / len(values)
+            self.assertLess(abs(rank - q), 0.015, q)
+
+    def test_small_streams_match_pandas_exactly(self):
+        df = scored_frame(3000)
+        sketch = _merged(df, 3)
+        pd.testing.assert_frame_equal(sketch.describe(), df[METRIC_COLUMNS].describe(), rtol=1e-9)
+        pd.testing.assert_frame_equal(sketch.covariance.correlation(), df[METRIC_COLUMNS].corr(), rtol=1e-9)
+        expected = df.groupby("subreddit")["combined_compound"].agg(["mean", "count", "std"])
+        pd.testing.assert_frame_equal(sketch.by_subreddit.table(), expected, check_dtype=False, rtol=1e-9)
+        pd.testing.assert_frame_equal(sketch.most_positive.frame(),
+                                      df.nlargest(5, "combined_compound")[TOP_COLUMNS].reset_index(drop=True))
+        pd.testing.assert_frame_equal(sketch.most_negative.frame(),
+                                      df.nsmallest(5, "combined_compound")[TOP_COLUMNS].reset_index(drop=True))
+
+    def test_large_streams_are_approximate_within_bounds(self):
+        df = scored_frame(100000)
+        sketch = _merged(df, 4, exact_limit=0)
+        exact = df[METRIC_COLUMNS].describe()
+        approx = sketch.describe()
+        for row in ("count", "mean", "std", "min", "max"):
+            np.testing.assert_allclose(approx.loc[row], exact.loc[row], rtol=1e-9)
+        for column in METRIC_COLUMNS:
+            ordered = np.sort(df[column].to_numpy())
+            for label, q in (("25%", 0.25), ("50%", 0.5), ("75%", 0.75)):
+                rank = np.searchsorted(ordered, approx.loc[label, column]) / len(ordered)
+                self.assertLess(abs(rank - q), 0.015, (column, label))
+        np.testing.assert_allclose(sketch.covariance.correlation(), df[METRIC_COLUMNS].corr(), atol=1e-9)
+        self.assertEqual(sketch.category_stats()["total_count"], 100000)
+        self.assertEqual(sketch.most_positive.frame()["combined_compound"].tolist(),
+                         df["combined_compound"].nlargest(5).tolist())
+
+    def test_report_runs_from_a_sketch_alone(self):
+        df = scored_frame(2000)
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        reporter = ReportGenerator(output_dir=output_dir)
+        from_frame = reporter.generate_summary_report(df.copy(), "Frame", None, None, None, text_cleaned=True)
+        from_sketch = reporter.generate_summary_report(None, "Sketch", None, None, None, sketch=_merged(df, 4))
+        with open(from_frame, encoding="utf-8") as a, open(from_sketch, encoding="utf-8") as b:
+            self.assertEqual(a.read().replace("Frame", "Sketch"), b.read())
+        self.assertTrue(os.path.basename(from_sketch).startswith("Sketch"))
+
+
+if __name__ == "__main__":
+    unittest.main()
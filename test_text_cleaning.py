@@ -0,0 +1,23 @@
+import unittest
+from text_cleaning import clean_text, clean_texts
+
+
+class TestTextCleaning(unittest.TestCase):
+
+    def test_whitespace_is_collapsed(self):
+        self.assertEqual(clean_text("  Line one\n\nline\ttwo \r\n"), "Line one line two")
+        self.assertEqual(clean_text("café au lait　"), "café au lait")
+
+    def test_invalid_utf8_and_non_strings(self):
+        self.assertEqual(clean_text("bad\ud800 text"), "bad text")
+        self.assertEqual(clean_text(None), "")
+        self.assertEqual(clean_text(float("nan")), "")
+
+    def test_batch_matches_single_item_cleaning(self):
+        texts = ["  a\n b ", "", "   ", None, "café ok", "x\ud83dy", "plain text"]
+        self.assertEqual(clean_texts(texts), [clean_text(text) for text in texts])
+        self.assertEqual(clean_texts([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
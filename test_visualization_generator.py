@@ -1,7 +1,10 @@
 import unittest
 import pandas as pd
 import os
-from visualization_generator import VisualizationGenerator
+import shutil
+import tempfile
+import matplotlib.image as mpimg
+from visualization_generator import VisualizationGenerator, templates
 
 class TestVisualizationGenerator(unittest.TestCase):
 
@@ -36,6 +39,21 @@ class TestVisualizationGenerator(unittest.TestCase):
         self.assertTrue(os.path.exists(filename))
         self.assertTrue(filename.endswith("_wordcloud.png"))
 
+    def test_reused_templates_draw_like_fresh_figures(self):
+        fresh_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, fresh_dir)
+        fresh = VisualizationGenerator(reuse_figures=False)
+        other = self.test_df.assign(combined_compound=self.test_df["combined_compound"] * -0.5)
+        for method in ("plot_sentiment_heatmap", "plot_sentiment_counts", "plot_sentiment_distribution_pie"):
+            # Whatever was drawn on the template before must leave no trace
+            getattr(self.viz_gen, method)(other.copy(), "Other", output_path=self.output_dir)
+            reused = getattr(self.viz_gen, method)(self.test_df.copy(), "TestTopic", output_path=self.output_dir)
+            expected = getattr(fresh, method)(self.test_df.copy(), "TestTopic", output_path=fresh_dir)
+            self.assertTrue((mpimg.imread(reused) == mpimg.imread(expected)).all(), method)
+        figure, axes = templates.get("heatmap")
+        self.assertIs(templates.get("heatmap")[0], figure)
+        self.assertEqual(figure.axes, axes)
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -1,13 +1,84 @@
-import matplotlib.pyplot as plt
+import threading
+from matplotlib.figure import Figure
 import seaborn as sns
 from wordcloud import WordCloud
 import pandas as pd
 import os
+from metrics import timed, arg_len
+from artifacts import atomic_path
+
+# Figure layout per chart: size, and for charts drawn with a colorbar the
+# rectangles of the plot and colorbar axes
+FIGURE_LAYOUTS = {
+    "distribution": {"figsize": (12, 6)},
+    "subreddit": {"figsize": (12, 6)},
+    "trend": {"figsize": (12, 6)},
+    "type": {"figsize": (8, 6)},
+    "heatmap": {"figsize": (10, 8), "axes": [(0.1, 0.1, 0.68, 0.8), (0.82, 0.18, 0.03, 0.64)]},
+    "pie": {"figsize": (10, 8)},
+    "counts": {"figsize": (8, 6)},
+}
+
+
+class FigureTemplates:
+    """
+    One pre-laid-out figure per chart kind and thread, reused for every
+    chart of that kind: drawing a chart clears its axes instead of building
+    a new figure (and resolving its fonts and styles) each time. Figures
+    are created with matplotlib.figure.Figure rather than pyplot, so they
+    hold no global state and are never closed.
+    """
+
+    def __init__(self, layouts=FIGURE_LAYOUTS):
+        self.layouts = layouts
+        self._local = threading.local()
+
+    def build(self, kind):
+        layout = self.layouts[kind]
+        fig = Figure(figsize=layout["figsize"])
+        axes = [fig.add_axes(rect) for rect in layout["axes"]] if "axes" in layout else [fig.add_subplot()]
+        return fig, axes
+
+    def get(self, kind):
+        """The (figure, axes list) for `kind`, cleared and ready to draw on."""
+        figures = self._local.__dict__.setdefault("figures", {})
+        if kind not in figures:
+            figures[kind] = self.build(kind)
+            return figures[kind]
+        fig, axes = figures[kind]
+        for extra in fig.axes:
+            if extra not in axes:
+                extra.remove()
+        for ax in axes:
+            ax.clear()
+        fig.legends.clear()
+        fig.texts.clear()
+        return fig, axes
+
+    def wordcloud(self, **options):
+        # WordCloud loads its font on construction; generate() starts afresh each time
+        clouds = self._local.__dict__.setdefault("wordclouds", {})
+        key = tuple(sorted(options.items()))
+        if key not in clouds:
+            clouds[key] = WordCloud(**options)
+        return clouds[key]
+
+
+templates = FigureTemplates()
+
 
 class VisualizationGenerator:
-    def __init__(self):
-        pass
+    def __init__(self, reuse_figures=True):
+        # reuse_figures=False draws every chart on a new figure, as before templates
+        self.reuse_figures = reuse_figures
+
+    def _figure(self, kind):
+        return templates.get(kind) if self.reuse_figures else templates.build(kind)
+
+    def _wordcloud(self, **options):
+        return templates.wordcloud(**options) if self.reuse_figures else WordCloud(**options)
 
+    @timed("plot_sentiment_analysis", items=arg_len(1))
     def plot_sentiment_analysis(self, df, topic, output_path="."):
         """
         Generate individual sentiment analysis plots and save them as separate files.
@@ -17,46 +88,46 @@ class VisualizationGenerator:
         plot_filenames = {}
 
         # Plot 1: Distribution of Compound Sentiment Scores
-        plt.figure(figsize=(12, 6))
-        sns.histplot(data=df, x='combined_compound', hue='type', multiple='stack', palette='viridis')
-        plt.title('Distribution of Combined Sentiment Scores', fontsize=16)
-        plt.xlabel('Combined Compound Score', fontsize=12)
-        plt.ylabel('Count', fontsize=12)
-        plt.legend(title='Content Type')
+        fig, (ax,) = self._figure("distribution")
+        sns.histplot(data=df, x='combined_compound', hue='type', multiple='stack', palette='viridis', ax=ax)
+        ax.set_title('Distribution of Combined Sentiment Scores', fontsize=16)
+        ax.set_xlabel('Combined Compound Score', fontsize=12)
+        ax.set_ylabel('Count', fontsize=12)
+        ax.legend(title='Content Type')
         filename_dist = f'{output_path}/{topic_clean}_sentiment_distribution.png'
-        plt.savefig(filename_dist, dpi=300, bbox_inches='tight')
-        plt.close()
+        with atomic_path(filename_dist) as tmp_path:
+            fig.savefig(tmp_path, dpi=300, bbox_inches='tight')
         plot_filenames['distribution'] = filename_dist
         print(f"Distribution plot saved as '{filename_dist}'")
 
         # Plot 2: Sentiment by Subreddit
-        plt.figure(figsize=(12, 6))
-        sns.boxplot(data=df, x='subreddit', y='combined_compound', hue='type', palette='plasma')
-        plt.title('Sentiment Scores by Subreddit', fontsize=16)
-        plt.xlabel('Subreddit', fontsize=12)
-        plt.ylabel('Combined Compound Score', fontsize=12)
-        plt.tick_params(axis='x', rotation=45)
-        plt.legend(title='Content Type')
+        fig, (ax,) = self._figure("subreddit")
+        sns.boxplot(data=df, x='subreddit', y='combined_compound', hue='type', palette='plasma', ax=ax)
+        ax.set_title('Sentiment Scores by Subreddit', fontsize=16)
+        ax.set_xlabel('Subreddit', fontsize=12)
+        ax.set_ylabel('Combined Compound Score', fontsize=12)
+        ax.tick_params(axis='x', rotation=45)
+        ax.legend(title='Content Type')
         filename_subreddit = f'{output_path}/{topic_clean}_sentiment_subreddit.png'
-        plt.savefig(filename_subreddit, dpi=300, bbox_inches='tight')
-        plt.close()
+        with atomic_path(filename_subreddit) as tmp_path:
+            fig.savefig(tmp_path, dpi=300, bbox_inches='tight')
         plot_filenames['subreddit'] = filename_subreddit
         print(f"Subreddit plot saved as '{filename_subreddit}'")
 
         # Plot 3: Sentiment Trend Over Time
         try:
             df['date'] = pd.to_datetime(df['created'], errors='coerce').dt.date
-            plt.figure(figsize=(12, 6))
-            sns.lineplot(data=df, x='date', y='combined_compound', hue='type', marker='o', palette='magma')
-            plt.title('Sentiment Trend Over Time', fontsize=16)
-            plt.xlabel('Date', fontsize=12)
-            plt.ylabel('Combined Compound Score', fontsize=12)
-            plt.tick_params(axis='x', rotation=45)
-            plt.legend(title='Content Type')
-            plt.grid(True, linestyle='--', alpha=0.6)
+            fig, (ax,) = self._figure("trend")
+            sns.lineplot(data=df, x='date', y='combined_compound', hue='type', marker='o', palette='magma', ax=ax)
+            ax.set_title('Sentiment Trend Over Time', fontsize=16)
+            ax.set_xlabel('Date', fontsize=12)
+            ax.set_ylabel('Combined Compound Score', fontsize=12)
+            ax.tick_params(axis='x', rotation=45)
+            ax.legend(title='Content Type')
+            ax.grid(True, linestyle='--', alpha=0.6)
             filename_trend = f'{output_path}/{topic_clean}_sentiment_trend.png'
-            plt.savefig(filename_trend, dpi=300, bbox_inches='tight')
-            plt.close()
+            with atomic_path(filename_trend) as tmp_path:
+                fig.savefig(tmp_path, dpi=300, bbox_inches='tight')
             plot_filenames['trend'] = filename_trend
             print(f"Trend plot saved as '{filename_trend}'")
         except Exception as e:
@@ -65,36 +136,38 @@ class VisualizationGenerator:
 
         # Plot 4: Sentiment Distribution by Type (Post vs. Comment)
         sentiment_by_type = df.groupby('type')['combined_compound'].mean().reset_index()
-        plt.figure(figsize=(8, 6))
-        sns.barplot(data=sentiment_by_type, x='type', y='combined_compound', palette='coolwarm')
-        plt.title('Average Sentiment by Content Type', fontsize=16)
-        plt.xlabel('Content Type', fontsize=12)
-        plt.ylabel('Average Combined Compound Score', fontsize=12)
+        fig, (ax,) = self._figure("type")
+        sns.barplot(data=sentiment_by_type, x='type', y='combined_compound', palette='coolwarm', ax=ax)
+        ax.set_title('Average Sentiment by Content Type', fontsize=16)
+        ax.set_xlabel('Content Type', fontsize=12)
+        ax.set_ylabel('Average Combined Compound Score', fontsize=12)
         filename_type = f'{output_path}/{topic_clean}_sentiment_type.png'
-        plt.savefig(filename_type, dpi=300, bbox_inches='tight')
-        plt.close()
+        with atomic_path(filename_type) as tmp_path:
+            fig.savefig(tmp_path, dpi=300, bbox_inches='tight')
         plot_filenames['type'] = filename_type
         print(f"Type plot saved as '{filename_type}'")
 
         return plot_filenames
 
+    @timed("plot_sentiment_heatmap", items=arg_len(1))
     def plot_sentiment_heatmap(self, df, topic, output_path="."):
         """Generate a heatmap showing sentiment correlation between different metrics"""
         sentiment_cols = ['vader_neg', 'vader_neu', 'vader_pos', 'vader_compound', 'textblob_polarity', 'combined_compound']
         correlation_matrix = df[sentiment_cols].corr()
         
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(correlation_matrix, annot=True, cmap='RdBu_r', center=0, 
-                   square=True, linewidths=0.5, cbar_kws={"shrink": .8})
-        plt.title(f'Sentiment Metrics Correlation Heatmap for {topic}', fontsize=16)
-        plt.tight_layout()
-        
+        # The colorbar has its own axes in the template, so it never resizes the plot
+        fig, (ax, cbar_ax) = self._figure("heatmap")
+        sns.heatmap(correlation_matrix, annot=True, cmap='RdBu_r', center=0,
+                   square=True, linewidths=0.5, ax=ax, cbar_ax=cbar_ax)
+        ax.set_title(f'Sentiment Metrics Correlation Heatmap for {topic}', fontsize=16)
+
         filename = f'{output_path}/{topic.replace(" ", "_")}_sentiment_heatmap.png'
-        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        with atomic_path(filename) as tmp_path:
+            fig.savefig(tmp_path, dpi=300, bbox_inches='tight')
         print(f"Sentiment heatmap saved as '{filename}'")
-        plt.close()
         return filename
 
+    @timed("plot_sentiment_distribution_pie", items=arg_len(1))
     def plot_sentiment_distribution_pie(self, df, topic, output_path="."):
         """Generate a pie chart showing the distribution of positive, negative, and neutral sentiments"""
         def categorize_sentiment(score):
@@ -111,29 +184,32 @@ class VisualizationGenerator:
         # Ensure all three categories are present for consistent coloring and explode
         sentiment_counts = sentiment_counts.reindex(["Positive", "Negative", "Neutral"], fill_value=0)
 
-        plt.figure(figsize=(10, 8))
+        fig, (ax,) = self._figure("pie")
         colors = ['#2ecc71', '#e74c3c', '#3498db']  # Green, Red, Blue
         explode = [0.05] * len(sentiment_counts)
         
-        plt.pie(sentiment_counts.values, labels=sentiment_counts.index, autopct='%1.1f%%', 
-                colors=colors, startangle=90, explode=explode)
-        plt.title(f'Sentiment Distribution for {topic}', fontsize=16)
-        plt.axis('equal')
+        ax.pie(sentiment_counts.values, labels=sentiment_counts.index, autopct='%1.1f%%', 
+               colors=colors, startangle=90, explode=explode)
+        ax.set_title(f'Sentiment Distribution for {topic}', fontsize=16)
+        ax.axis('equal')
         
         filename = f'{output_path}/{topic.replace(" ", "_")}_sentiment_pie.png'
-        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        with atomic_path(filename) as tmp_path:
+            fig.savefig(tmp_path, dpi=300, bbox_inches='tight')
         print(f"Sentiment pie chart saved as '{filename}'")
-        plt.close()
         return filename
 
+    @timed("generate_wordcloud", items=arg_len(1))
     def generate_wordcloud(self, text_data, topic, output_path="."):
         all_words = ' '.join(text_data)
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(all_words)
+        wordcloud = self._wordcloud(width=800, height=400, background_color='white').generate(all_words)
         filename = f'{output_path}/{topic.replace(" ", "_")}_wordcloud.png'
-        wordcloud.to_file(filename)
+        with atomic_path(filename) as tmp_path:
+            wordcloud.to_file(tmp_path)
         print(f"Word cloud saved as '{filename}'")
         return filename
 
+    @timed("plot_sentiment_counts", items=arg_len(1))
     def plot_sentiment_counts(self, df, topic, output_path="."):
         def categorize_sentiment(score):
             if score >= 0.05:
@@ -146,15 +222,15 @@ class VisualizationGenerator:
         df["sentiment_category"] = df["combined_compound"].apply(categorize_sentiment)
         sentiment_counts = df["sentiment_category"].value_counts().reindex(["Positive", "Negative", "Neutral"])
 
-        plt.figure(figsize=(8, 6))
-        sns.barplot(x=sentiment_counts.index, y=sentiment_counts.values, palette=["green", "red", "blue"])
-        plt.title(f"Sentiment Distribution for {topic}", fontsize=16)
-        plt.xlabel("Sentiment", fontsize=12)
-        plt.ylabel("Count", fontsize=12)
-        plt.grid(axis="y", linestyle="--", alpha=0.7)
+        fig, (ax,) = self._figure("counts")
+        sns.barplot(x=sentiment_counts.index, y=sentiment_counts.values, palette=["green", "red", "blue"], ax=ax)
+        ax.set_title(f"Sentiment Distribution for {topic}", fontsize=16)
+        ax.set_xlabel("Sentiment", fontsize=12)
+        ax.set_ylabel("Count", fontsize=12)
+        ax.grid(axis="y", linestyle="--", alpha=0.7)
 
         filename = f"{output_path}/{topic.replace(' ', '_')}_sentiment_counts.png"
-        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        with atomic_path(filename) as tmp_path:
+            fig.savefig(tmp_path, dpi=300, bbox_inches='tight')
         print(f"Sentiment counts plot saved as '{filename}'")
-        plt.close()
         return filename
\ No newline at end of file
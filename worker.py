@@ -0,0 +1,177 @@
+"""
+Standalone analysis worker: `python worker.py`.
+
+Web hosts started with JOB_QUEUE_DB set queue their /analyze requests
+instead of running them in-process; any number of workers, on any host
+that shares JOB_QUEUE_DB and the runs directory (RUNS_DIR), pull the jobs
+and run the full pipeline. A worker holds a lease on its job and renews it
+while the job runs; if the worker dies, the lease expires and another
+worker takes the job over.
+"""
+import os
+import uuid
+import signal
+import socket
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pipeline import build_analysis_pipeline, PipelineError, NoDataError
+from artifacts import RunDirectory
+from job_queue import JobQueue
+from renderer import renderer_pool
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class Worker:
+    """
+    Claims jobs of the kinds in `handlers` (kind -> callable taking the job
+    payload and returning a JSON-serializable result) one at a time. While a
+    handler runs, a background thread renews the job's lease and the
+    worker's heartbeat every `heartbeat_seconds` (a third of the lease by
+    default). A handler's exception fails the job with its message.
+    """
+
+    def __init__(self, queue, handlers, worker_id=None, poll_seconds=1.0, heartbeat_seconds=None):
+        self.queue = queue
+        self.handlers = handlers
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds or queue.lease_seconds / 3
+
+    def _heartbeat(self, job_id, done):
+        while not done.wait(self.heartbeat_seconds):
+            self.queue.register_worker(self.worker_id, job_id)
+            if not self.queue.heartbeat(job_id, self.worker_id):
+                # Another worker has taken the job over; our outcome will be dropped
+                logging.warning(f"Worker {self.worker_id} lost the lease on job {job_id}")
+                return
+
+    def run_once(self):
+        """Run one job if one is waiting; returns whether a job was run."""
+        job = self.queue.claim(self.worker_id, kinds=list(self.handlers))
+        self.queue.register_worker(self.worker_id, job["id"] if job else None)
+        if job is None:
+            return False
+        logging.info(f"Worker {self.worker_id} running job {job['id']} ({job['kind']}, attempt {job['attempts']})")
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job["id"], done), daemon=True)
+        beat.start()
+        try:
+            result = self.handlers[job["kind"]](job["payload"])
+        except Exception as e:
+            logging.error(f"Job {job['id']} failed: {e}")
+            self.queue.fail(job["id"], self.worker_id, str(e))
+        else:
+            self.queue.complete(job["id"], self.worker_id, result)
+        finally:
+            done.set()
+            beat.join()
+        return True
+
+    def run(self, stop=None):
+        """Run jobs until `stop` is set, polling every `poll_seconds` while the queue is empty."""
+        stop = stop or threading.Event()
+        logging.info(f"Worker {self.worker_id} waiting for jobs ({', '.join(self.handlers)})")
+        while not stop.is_set():
+            if not self.run_once():
+                stop.wait(self.poll_seconds)
+
+
+class AnalysisJobs:
+    """
+    Handler for "analyze" jobs. Like BatchRunner, it builds the components
+    and pools once and shares them across every job this worker runs. Each
+    run is written to its own directory under RUNS_DIR, which the web hosts
+    read the artifacts from; the result names that directory.
+    """
+
+    def __init__(self, data_collector, sentiment_analyzer, viz_generator, report_generator, image_search, config,
+                 results_store=None):
+        self.components = (data_collector, sentiment_analyzer, viz_generator, report_generator, image_search)
+        self.config = config
+        self.results_store = results_store
+        workers = config.PIPELINE_MAX_WORKERS
+        self.thread_pool = ThreadPoolExecutor(max_workers=workers)
+        self.process_pool = renderer_pool(workers) if config.PIPELINE_USE_PROCESSES else None
+
+    def __call__(self, payload):
+        topic = payload["topic"]
+        pipeline = build_analysis_pipeline(*self.components, self.config, thread_pool=self.thread_pool,
+                                           process_pool=self.process_pool, results_store=self.results_store)
+        run_dir = RunDirectory.create(self.config.RUNS_DIR, topic)
+        try:
+            result = pipeline.run(topic=topic, output_dir=run_dir.path)
+        except PipelineError as e:
+            if isinstance(e.error, NoDataError):
+                raise RuntimeError(f"No data found for topic '{topic}'.") from e
+            raise
+        logging.info(f"Analysis of '{topic}' done. Stage timings: {result.format_timings()}")
+        return {
+            "run_id": run_dir.run_id,
+            "items": len(result["sentiment_df"]),
+            "timings": {name: round(seconds, 3) for name, seconds in result.timings.items()},
+        }
+
+    def close(self):
+        self.thread_pool.shutdown()
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued Sentinent analyses.")
+    parser.add_argument("--worker-id", help="Name shown in the queue's worker list (default: host-pid-random).")
+    parser.add_argument("--once", action="store_true", help="Run at most one job and exit.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from config import Config
+    from data_collector import RedditDataCollector, reddit_scheduler
+    from sentiment_analyzer import SentimentAnalyzer
+    from visualization_generator import VisualizationGenerator
+    from report_generator import ReportGenerator
+    from image_search_integration import ImageSearchIntegration
+    from results_store import ResultsStore
+
+    args = parse_args(argv)
+    config = Config()
+    if not config.JOB_QUEUE_DB:
+        logging.error("JOB_QUEUE_DB is not set; point it at the queue shared with the web hosts.")
+        return 1
+    data_collector = RedditDataCollector(
+        client_id=config.REDDIT_CLIENT_ID,
+        client_secret=config.REDDIT_CLIENT_SECRET,
+        user_agent=config.REDDIT_USER_AGENT,
+        username=config.REDDIT_USERNAME,
+        password=config.REDDIT_PASSWORD,
+        scheduler=reddit_scheduler(config.REDDIT_REQUESTS_PER_MINUTE, config.REDDIT_REQUEST_BURST),
+        max_concurrency=config.COLLECT_MAX_CONCURRENCY
+    )
+    jobs = AnalysisJobs(
+        data_collector, SentimentAnalyzer(), VisualizationGenerator(), ReportGenerator(output_dir=config.OUTPUT_DIR),
+        ImageSearchIntegration(output_dir=config.OUTPUT_DIR, api_key=config.PIXABAY_API_KEY,
+                               base_url=config.PIXABAY_API_URL),
+        config, results_store=ResultsStore(config.RESULTS_DB)
+    )
+    queue = JobQueue(config.JOB_QUEUE_DB, lease_seconds=config.JOB_LEASE_SECONDS, max_attempts=config.JOB_MAX_ATTEMPTS)
+    worker = Worker(queue, {"analyze": jobs}, worker_id=args.worker_id, poll_seconds=config.WORKER_POLL_SECONDS)
+
+    # Finish the current job on SIGTERM/Ctrl-C, then exit
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    try:
+        if args.once:
+            worker.run_once()
+        else:
+            worker.run(stop)
+    finally:
+        jobs.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())